@@ -0,0 +1,158 @@
+#!/usr/bin/env python3
+"""
+Bounded pool of Playwright browser contexts for the browser smoke tests.
+
+Checks are put on a queue and `--concurrency` workers, each owning one
+browser context, take them off one at a time and run each on a fresh page.
+Routes load N at a time instead of one after another, while every worker
+keeps its context's HTTP cache and cookies between the routes it visits.
+Outcomes come back in the order the checks were queued, whatever order they
+finished in, so reports stay stable from run to run.
+
+Checks wait for pages with wait_for_ready() instead of fixed sleeps or
+`networkidle`, which never settles on pages that poll or hold a websocket.
+A page is ready as soon as the app says so (`window.__appReady = true` or
+an element with a `data-ready` attribute), or else once no fetch/XHR is in
+flight and neither the DOM's content nor resource loading changed for a
+short settle window. Attribute changes are not counted, so CSS and
+framer-motion animations do not keep a page busy.
+
+    outcomes = await run_checks(browser, [Check("Homepage", check_homepage), ...], concurrency=4)
+"""
+
+import time
+import asyncio
+from collections import namedtuple
+from playwright.async_api import TimeoutError as PlaywrightTimeoutError
+
+BASE_URL = "http://localhost:9323"
+DEFAULT_CONCURRENCY = 4
+VIEWPORT = {'width': 1920, 'height': 1080}
+SETTLE_MS = 300
+READY_TIMEOUT_MS = 15000
+
+# Installed in every pooled context before any page script runs; tracks
+# in-flight requests and the last DOM or network activity
+READINESS_SCRIPT = """
+(() => {
+  const state = window.__pageReadiness = {inflight: 0, lastActivity: performance.now(), readyAt: null};
+  const touch = () => { state.lastActivity = performance.now(); };
+  const fetch = window.fetch;
+  if (fetch) {
+    window.fetch = function (...args) {
+      state.inflight += 1;
+      touch();
+      return fetch.apply(this, args).finally(() => { state.inflight -= 1; touch(); });
+    };
+  }
+  const send = XMLHttpRequest.prototype.send;
+  XMLHttpRequest.prototype.send = function (...args) {
+    state.inflight += 1;
+    touch();
+    this.addEventListener('loadend', () => { state.inflight -= 1; touch(); }, {once: true});
+    return send.apply(this, args);
+  };
+  new MutationObserver(touch).observe(document, {childList: true, subtree: true, characterData: true});
+  try {
+    new PerformanceObserver(touch).observe({type: 'resource', buffered: false});
+  } catch (e) {}
+})();
+"""
+
+# True once the app signals readiness, or everything was quiet for `settle`
+# ms since `since`; records when the page became ready
+READY_PREDICATE = """
+([since, settle]) => {
+  const state = window.__pageReadiness;
+  const now = performance.now();
+  const signalled = window.__appReady === true || !!document.querySelector('[data-ready]:not([data-ready="false"])');
+  const quiet = state && document.readyState !== 'loading' && state.inflight === 0
+    && now - Math.max(state.lastActivity, since) >= settle;
+  if ((signalled || quiet) && state && state.readyAt === null) {
+    state.readyAt = signalled ? now : Math.max(state.lastActivity, since);
+  }
+  return signalled || quiet;
+}
+"""
+
+# One queued check; `run(page)` is awaited on a new page of a pooled context
+Check = namedtuple("Check", ["name", "run"])
+
+# What a check returned, or the exception it raised instead (`value` is then None)
+CheckOutcome = namedtuple("CheckOutcome", ["name", "value", "error", "seconds"])
+
+
+class NotReadyError(Exception):
+    """A page did not become ready before its timeout."""
+
+
+async def run_checks(browser, checks, concurrency=DEFAULT_CONCURRENCY, context_options=None, on_done=None):
+    """Run `checks` on at most `concurrency` browser contexts; returns CheckOutcomes in queue order.
+
+    A check that raises fails alone: its exception is recorded and the
+    worker moves on to the next check. `on_done(outcome)`, if given, is
+    called as each check finishes, for progress output.
+    """
+    queue = asyncio.Queue()
+    for index, check in enumerate(checks):
+        queue.put_nowait((index, check))
+    outcomes = [None] * len(checks)
+
+    async def worker():
+        context = await browser.new_context(**(context_options or {"viewport": VIEWPORT}))
+        await context.add_init_script(READINESS_SCRIPT)
+        try:
+            while not queue.empty():
+                index, check = queue.get_nowait()
+                started = time.perf_counter()
+                page = await context.new_page()
+                try:
+                    value, error = await check.run(page), None
+                except Exception as e:
+                    value, error = None, e
+                finally:
+                    await page.close()
+                outcomes[index] = CheckOutcome(check.name, value, error, time.perf_counter() - started)
+                if on_done:
+                    on_done(outcomes[index])
+        finally:
+            await context.close()
+
+    await asyncio.gather(*(worker() for _ in range(max(1, min(concurrency, len(checks))))))
+    return outcomes
+
+
+async def wait_for_ready(page, timeout=READY_TIMEOUT_MS, settle=SETTLE_MS):
+    """Wait until the page is ready (see above); returns False if `timeout` ms passed first.
+
+    Quiet time only counts from this call on, so after a click the page
+    gets at least `settle` ms to react before it can count as ready. Pages
+    need READINESS_SCRIPT (pooled contexts have it); without it only the
+    app's own signal is seen.
+    """
+    since = await page.evaluate("() => performance.now()")
+    try:
+        await page.wait_for_function(READY_PREDICATE, arg=[since, settle], polling=50, timeout=timeout)
+        return True
+    except PlaywrightTimeoutError:
+        return False
+
+
+async def goto_ready(page, url, timeout=READY_TIMEOUT_MS, required=False):
+    """Navigate to `url` and wait for the page to be ready rather than for `load` or `networkidle`.
+
+    Returns whether the page became ready; with `required`, a page that did
+    not raises NotReadyError instead, as a timed out `networkidle` would.
+    """
+    await page.goto(url, wait_until='domcontentloaded', timeout=timeout)
+    ready = await wait_for_ready(page, timeout)
+    if required and not ready:
+        raise NotReadyError(f"{url} was not ready after {timeout} ms")
+    return ready
+
+
+def add_pool_arguments(parser):
+    """--concurrency and --base-url, shared by the browser test scripts."""
+    parser.add_argument("-c", "--concurrency", type=int, default=DEFAULT_CONCURRENCY,
+                        help=f"routes checked at once, one browser context each (default: {DEFAULT_CONCURRENCY})")
+    parser.add_argument("--base-url", default=BASE_URL, help=f"app under test (default: {BASE_URL})")
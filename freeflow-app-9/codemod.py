@@ -0,0 +1,585 @@
+#!/usr/bin/env python3
+"""
+Single-pass codemod engine for the app's TSX sources.
+
+Transforms are registered as rules on a RuleSet: a regex plus a replacement,
+either a `\\1` template or a callable that receives the rule's match. All
+rules of a set are compiled into one alternation, so a file is read once,
+scanned once and written once however many rules apply. Where two rules
+could match at the same offset the one registered first wins, and no rule
+ever sees another rule's output.
+
+Each alternative is `(?:pattern)()`: the empty marker group tells which rule
+matched, and because no alternative starts with a capturing group the regex
+engine can still skip ahead to the rules' first characters. Start patterns
+with a literal (use `(?=...)` and `\\g<0>` rather than wrapping the whole
+pattern in a group) to keep that fast path.
+
+Matches only count where they start in code: the first candidate in a file
+has it lexed once (tsx_lexer.py), and matches inside comments, strings,
+template text or JSX text are skipped. Token rules go further: their pattern
+only finds a candidate, such as `<button` or `toast.success(`, and their
+callable gets the match and the file's Scan and returns the edit to make,
+e.g. an attribute inserted before the end of the tag the lexer found. When
+a token rule passes on a candidate, the rules registered after it get to try
+the same position.
+
+Rule sets themselves live in codemod_rules.py. run_codemod() fans files out
+over a process pool; workers rebuild the rule sets by name, so nothing but
+paths and small results cross process boundaries (this also works with the
+`spawn` start method used on macOS):
+
+    python3 codemod.py --rules enhance,test-ids            # every page.tsx and component
+    python3 codemod.py -j 8 app/(app)/dashboard/*/page.tsx
+    python3 codemod.py --dry-run codemods.diff               # preview; see codemod_patch.py
+
+A manifest under .cache/ records, per file and rule-set combination, the
+fingerprint of the rules that last processed it with the file's size, mtime
+and content hash. Files whose stat still matches are skipped without being
+opened; touched files are hashed and only transformed if their content
+changed. Any change to a rule changes the fingerprint and re-processes
+everything.
+"""
+
+import os
+import re
+import time
+import sys
+import hashlib
+import sqlite3
+import argparse
+from collections import namedtuple
+from contextlib import contextmanager
+from concurrent.futures import ProcessPoolExecutor
+
+from codemod_patch import PATCH_FORMATS, PatchError, PatchWriter, apply_patch_set, make_diff, stderr_log
+from tsx_lexer import LEXER_VERSION, lex
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# What the codemods run over when no paths are given: every route page, and
+# every component source
+PAGE_ROOTS = ("app",)
+COMPONENT_ROOTS = ("components",)
+COMPONENT_EXTENSIONS = (".tsx", ".ts")
+SKIP_DIRS = {"node_modules", ".next", ".git", ".cache"}
+
+MANIFEST_FILE = os.path.join(ROOT_DIR, ".cache", "codemod_manifest.sqlite")
+MANIFEST_VERSION = "1"
+
+# `when`, if given, is called with the file path and decides whether the rule
+# applies. With `scan`, `replacement` is a token rule's callable (see RuleSet.token_rule).
+Rule = namedtuple("Rule", ["name", "pattern", "replacement", "flags", "when", "scan"])
+
+# Outcome of one file; `error` is None on success. `stamp` is the file's
+# (size, mtime_ns, sha256) after the run, and `cached` is True when the
+# manifest showed it was already processed by the same rules. `patch` is the
+# unified diff of a change, when asked for.
+FileResult = namedtuple("FileResult", ["path", "changed", "counts", "seconds", "error", "stamp", "cached", "patch"])
+
+INLINE_FLAGS = ((re.IGNORECASE, "i"), (re.MULTILINE, "m"), (re.DOTALL, "s"), (re.VERBOSE, "x"))
+BACKREFERENCE_RE = re.compile(r"\\[1-9]|\(\?P=")
+TEMPLATE_GROUP_RE = re.compile(r"\\(?:g<(\d+)>|(\d+))")
+
+
+class RuleMatch:
+    """One rule's part of a combined match, with groups numbered as in the rule's own pattern."""
+
+    def __init__(self, match, base):
+        self._match = match
+        self._base = base
+        self.string = match.string
+
+    def _index(self, index):
+        return self._base + index if index else 0
+
+    def group(self, index=0):
+        return self._match.group(self._index(index))
+
+    def start(self, index=0):
+        return self._match.start(self._index(index))
+
+    def end(self, index=0):
+        return self._match.end(self._index(index))
+
+
+class RuleSet:
+    """An ordered collection of rules applied together in one scan."""
+
+    def __init__(self, name, version="1"):
+        self.name = name
+        self.version = version
+        self.rules = []
+        self._compiled = {}
+
+    def add(self, name, pattern, replacement, flags=0, when=None, scan=False):
+        """Register a rule. Patterns may not use backreferences or named groups."""
+        compiled = re.compile(pattern, flags)
+        if compiled.groupindex or BACKREFERENCE_RE.search(pattern):
+            raise ValueError(f"rule {name}: named groups and backreferences are not supported")
+        self.rules.append(Rule(name, pattern, replacement, flags, when, scan))
+        self._compiled.clear()
+        return self
+
+    def rule(self, name, pattern, flags=0, when=None):
+        """Decorator form of add() for callable replacements."""
+        def register(func):
+            self.add(name, pattern, func, flags, when)
+            return func
+        return register
+
+    def token_rule(self, name, pattern, flags=0, when=None):
+        """Decorator for a rule that decides its edit from the lexed file.
+
+        The function is called as func(match, scan) for each candidate
+        `pattern` finds in code and returns None to leave it alone, or
+        (start, end, text) to replace text[start:end], where start is not
+        before the match. A fourth item, if returned, is the name the edit
+        is counted under instead of the rule's.
+        """
+        def register(func):
+            self.add(name, pattern, func, flags, when, scan=True)
+            return func
+        return register
+
+    def extend(self, other):
+        """Append every rule of another set; the combined version records both."""
+        for rule in other.rules:
+            self.add(*rule)
+        self.version = f"{self.version}+{other.name}:{other.version}"
+        return self
+
+    def fingerprint(self):
+        """A short hash of the version and every rule, including callable replacements' code."""
+        digest = hashlib.sha256(f"{self.version} lexer:{LEXER_VERSION}".encode())
+        for rule in self.rules:
+            digest.update(repr((rule.name, rule.pattern, rule.flags, _describe(rule.replacement),
+                                _describe(rule.when), rule.scan)).encode())
+        return digest.hexdigest()[:16]
+
+    def compile(self, path=None):
+        """The combined regex for the rules that apply to `path`, and its rule table.
+
+        The table maps each rule's marker group number to (rule, replacement,
+        base, later), where the rule's own group n is group base + n of the
+        combined match, template replacements are already renumbered and
+        `later` lists (rule, compiled pattern) for the active rules after it.
+        """
+        active = tuple(i for i, rule in enumerate(self.rules) if rule.when is None or rule.when(path))
+        if active not in self._compiled:
+            parts = []
+            table = {}
+            base = 0
+            for i in active:
+                rule = self.rules[i]
+                flags = "".join(letter for flag, letter in INLINE_FLAGS if rule.flags & flag)
+                parts.append(f"(?{flags}:{rule.pattern})()")
+                replacement = rule.replacement
+                if isinstance(replacement, str) and not rule.scan:
+                    replacement = TEMPLATE_GROUP_RE.sub(
+                        lambda m, base=base: f"\\g<{_renumber(m, base)}>", replacement
+                    )
+                compiled = re.compile(rule.pattern, rule.flags)
+                marker = base + compiled.groups + 1
+                table[marker] = (rule, replacement, base, [])
+                for earlier in table.values():
+                    if earlier[0] is not rule:
+                        earlier[3].append((rule, compiled))
+                base = marker
+            self._compiled[active] = (re.compile("|".join(parts)) if parts else None, table)
+        return self._compiled[active]
+
+    def apply(self, text, path=None):
+        """Return (new_text, {rule name: replacements}) after one scan of `text`."""
+        combined, table = self.compile(path)
+        counts = {}
+        if combined is None:
+            return text, counts
+
+        scan = None
+        pieces = []
+        pos = 0
+        for match in combined.finditer(text):
+            if match.start() < pos:
+                continue   # inside the previous edit
+            if scan is None:
+                scan = lex(text)
+            if not scan.in_code(match.start()):
+                continue
+            # The marker closing the matching alternative is the last group to close
+            rule, replacement, base, later = table[match.lastindex]
+            edit = _edit(rule, replacement, match, base, scan)
+            if edit is None and rule.scan:
+                # A token rule passed on this candidate: later rules may take it
+                for rule, compiled in later:
+                    own = compiled.match(text, match.start())
+                    edit = own and _edit(rule, rule.replacement, own, 0, scan)
+                    if edit:
+                        break
+            if edit is None or edit[0] < pos:
+                continue
+            start, end, new_text, name = edit
+            pieces.append(text[pos:start])
+            pieces.append(new_text)
+            pos = end
+            counts[name] = counts.get(name, 0) + 1
+        if not pieces:
+            return text, counts
+        pieces.append(text[pos:])
+        return "".join(pieces), counts
+
+
+def _edit(rule, replacement, match, base, scan):
+    """The (start, end, text, counted name) edit `rule` makes of its match, or None."""
+    if rule.scan:
+        edit = replacement(RuleMatch(match, base), scan)
+        if edit is None:
+            return None
+        return tuple(edit[:3]) + (edit[3] if len(edit) > 3 else rule.name,)
+    if isinstance(replacement, str):
+        return match.start(), match.end(), match.expand(replacement), rule.name
+    return match.start(), match.end(), replacement(RuleMatch(match, base)), rule.name
+
+
+def _describe(func):
+    """A template as-is; a callable by its name and compiled body, so editing it counts."""
+    if func is None or isinstance(func, str):
+        return func
+    code = getattr(func, "__code__", None)
+    if code is None:
+        return getattr(func, "__qualname__", repr(func))
+    return (func.__qualname__, code.co_code.hex(), repr(code.co_consts), code.co_names)
+
+
+def _renumber(template_group, base):
+    index = int(template_group.group(1) or template_group.group(2))
+    return base + index if index else 0
+
+
+def transform_file(path, rule_set, write=True):
+    """Read `path` once, apply every rule and write it back once if anything changed.
+
+    Returns (changed, counts, content) where content is the file's final text.
+    """
+    with open(path, 'r', encoding='utf-8') as f:
+        content = f.read()
+    new_content, counts = rule_set.apply(content, path)
+    changed = new_content != content
+    if changed and write:
+        with open(path, 'w', encoding='utf-8') as f:
+            f.write(new_content)
+    return changed, counts, new_content
+
+
+def open_manifest(manifest_file=MANIFEST_FILE):
+    """Open the codemod manifest, discarding it if it was written by another version."""
+    os.makedirs(os.path.dirname(manifest_file), exist_ok=True)
+    conn = sqlite3.connect(manifest_file)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if not row or row[0] != MANIFEST_VERSION:
+        conn.executescript("""
+            DROP TABLE IF EXISTS files;
+            CREATE TABLE files (
+                path TEXT, rules TEXT, fingerprint TEXT, version TEXT,
+                size INTEGER, mtime_ns INTEGER, sha256 TEXT,
+                PRIMARY KEY (path, rules)
+            );
+        """)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (MANIFEST_VERSION,))
+        conn.commit()
+    return conn
+
+
+def _walk(roots, accept):
+    for root in roots:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(ROOT_DIR, root)):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            for name in filenames:
+                if accept(name):
+                    yield os.path.join(dirpath, name)
+
+
+def discover_files(pages=True, components=True):
+    """Every app/**/page.tsx and components/** source, sorted and de-duplicated."""
+    paths = []
+    if pages:
+        paths.extend(_walk(PAGE_ROOTS, lambda name: name == "page.tsx"))
+    if components:
+        paths.extend(_walk(COMPONENT_ROOTS, lambda name: name.endswith(COMPONENT_EXTENSIONS)))
+    return unique_paths(paths)
+
+
+def unique_paths(paths):
+    """Drop repeated paths (also through symlinks), keeping the first occurrence's order."""
+    seen = set()
+    unique = []
+    for path in paths:
+        real = os.path.realpath(path)
+        if real not in seen:
+            seen.add(real)
+            unique.append(path)
+    return unique
+
+
+def page_paths(names, base_path):
+    """page.tsx paths for page names below `base_path`, de-duplicated.
+
+    Returns (paths, missing) where missing lists the names without a page.
+    """
+    names = list(dict.fromkeys(names))
+    paths = [os.path.join(base_path, name, "page.tsx") for name in names]
+    missing = [name for name, path in zip(names, paths) if not os.path.exists(path)]
+    return unique_paths(path for path in paths if os.path.exists(path)), missing
+
+
+# Rule sets built in this process, by names; workers build each set once
+_RULE_SETS = {}
+
+
+def _rule_set(names):
+    if names not in _RULE_SETS:
+        from codemod_rules import build_rule_set
+        _RULE_SETS[names] = build_rule_set(names)
+    return _RULE_SETS[names]
+
+
+def _transform_task(task):
+    """Transform one file in a worker.
+
+    `task` is (path, rule set names, write, known_sha256, diff). A file
+    whose content still hashes to `known_sha256` was already processed by
+    these rules and is returned as cached without being transformed. With
+    `diff`, a change comes back as a unified diff.
+    """
+    path, names, write, known_sha256, diff = task
+    started = time.perf_counter()
+    try:
+        st = os.stat(path)
+        with open(path, 'rb') as f:
+            raw = f.read()
+        sha256 = hashlib.sha256(raw).hexdigest()
+        if sha256 == known_sha256:
+            return FileResult(path, False, {}, time.perf_counter() - started, None,
+                              (st.st_size, st.st_mtime_ns, sha256), True, None)
+        content = raw.decode('utf-8')
+        new_content, counts = _rule_set(names).apply(content, path)
+        changed = new_content != content
+        patch = make_diff(os.path.relpath(path, ROOT_DIR), content, new_content) if changed and diff else None
+        if changed and write:
+            raw = new_content.encode('utf-8')
+            with open(path, 'wb') as f:
+                f.write(raw)
+            st = os.stat(path)
+            sha256 = hashlib.sha256(raw).hexdigest()
+        return FileResult(path, changed, counts, time.perf_counter() - started, None,
+                          (st.st_size, st.st_mtime_ns, sha256), False, patch)
+    except Exception as e:
+        return FileResult(path, False, {}, time.perf_counter() - started, str(e), None, False, None)
+
+
+def iter_codemod(paths, names, jobs=0, write=True, manifest=None, diff=False):
+    """Yield a FileResult per path, in input order, transforming on `jobs` processes (0 = one per CPU).
+
+    `manifest` maps path -> (size, mtime_ns, sha256) of files already
+    processed by exactly these rules; files whose stat matches are yielded
+    as cached without being opened, touched ones are only hashed. With
+    `diff`, changed files carry their unified diff.
+    """
+    names = tuple(names)
+    manifest = manifest or {}
+    tasks = []
+    for path in paths:
+        stamp = manifest.get(path)
+        try:
+            st = os.stat(path)
+        except OSError:
+            stamp = None
+        else:
+            if stamp and stamp[:2] == (st.st_size, st.st_mtime_ns):
+                continue
+        tasks.append((path, names, write, stamp[2] if stamp else None, diff))
+
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(tasks) <= 1:
+        results = map(_transform_task, tasks)
+        yield from _in_order(paths, manifest, tasks, results)
+        return
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        results = pool.map(_transform_task, tasks, chunksize=max(1, min(32, len(tasks) // (jobs * 8))))
+        yield from _in_order(paths, manifest, tasks, results)
+
+
+def _in_order(paths, manifest, tasks, results):
+    """Interleave skipped files with the workers' results, in `paths` order."""
+    pending = iter(tasks)
+    next_task = next(pending, None)
+    for path in paths:
+        if next_task is not None and next_task[0] == path:
+            yield next(results)
+            next_task = next(pending, None)
+        else:
+            yield FileResult(path, False, {}, 0.0, None, manifest[path], True, None)
+
+
+def run_codemod(paths, names, jobs=0, write=True, verbose=False, log=print, manifest_file=MANIFEST_FILE,
+                patch_writer=None):
+    """Transform `paths` with the named rule sets and print progress; returns the FileResults.
+
+    Changed files and errors are printed as they finish (every file with
+    `verbose`), each with its time, followed by totals and the slowest files.
+    With a `manifest_file`, files already processed by the same rules are
+    skipped, and the manifest is updated for every file that ends up as
+    the rules leave it. A `patch_writer` (codemod_patch.PatchWriter)
+    receives each change's diff as soon as its file is done; pass
+    write=False with it for a dry run.
+    """
+    started = time.perf_counter()
+    names = tuple(names)
+    rules_key = ",".join(names)
+    rule_set = _rule_set(names)
+    fingerprint = rule_set.fingerprint()
+    total = len(paths)
+    width = len(str(total))
+    results = []
+
+    conn = open_manifest(manifest_file) if manifest_file else None
+    try:
+        manifest = {}
+        if conn:
+            manifest = {
+                path: (size, mtime_ns, sha256)
+                for path, size, mtime_ns, sha256 in conn.execute(
+                    "SELECT path, size, mtime_ns, sha256 FROM files WHERE rules = ? AND fingerprint = ?",
+                    (rules_key, fingerprint)
+                )
+            }
+        for done, result in enumerate(iter_codemod(paths, names, jobs, write, manifest, patch_writer is not None), 1):
+            if result.patch:
+                patch_writer.write(os.path.relpath(result.path, ROOT_DIR), result.stamp[2], result.counts, result.patch)
+                result = result._replace(patch=None)
+            results.append(result)
+            if conn and (write or not result.changed) and result.stamp and result.stamp != manifest.get(result.path):
+                conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+                    (result.path, rules_key, fingerprint, rule_set.version) + result.stamp
+                )
+            if result.error:
+                status, detail = "❌", f"Error - {result.error}"
+            elif result.changed:
+                status = "✅"
+                detail = ", ".join(f"{name} x{count}" for name, count in sorted(result.counts.items()))
+            elif verbose:
+                status, detail = "ℹ️ ", "Unchanged since last run" if result.cached else "No changes needed"
+            else:
+                if done % 100 == 0:
+                    log(f"[{done:>{width}}/{total}] ...")
+                continue
+            log(f"[{done:>{width}}/{total}] {status} {os.path.relpath(result.path, ROOT_DIR)} "
+                f"({result.seconds * 1000:.1f} ms): {detail}")
+        if conn:
+            conn.commit()
+    finally:
+        if conn:
+            conn.close()
+
+    elapsed = time.perf_counter() - started
+    changed = sum(1 for result in results if result.changed)
+    failed = sum(1 for result in results if result.error)
+    cached = sum(1 for result in results if result.cached)
+    log(f"\n✨ Complete! {'Changed' if write else 'Would change'} {changed}/{total} files, {failed} errors in {elapsed:.2f}s "
+        f"({sum(r.seconds for r in results):.2f}s of file work)")
+    if manifest_file:
+        log(f"⏭️  Skipped {cached} files already processed by these rules ({fingerprint})")
+    slowest = sorted(results, key=lambda result: result.seconds, reverse=True)[:5]
+    if slowest and verbose:
+        log("Slowest files:")
+        for result in slowest:
+            log(f"  {result.seconds * 1000:7.1f} ms  {os.path.relpath(result.path, ROOT_DIR)}")
+    return results
+
+
+def add_runner_arguments(parser):
+    """The file selection and pool options shared by every codemod script."""
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="transform on N worker processes (default: one per CPU)")
+    parser.add_argument("--no-components", action="store_true",
+                        help="when discovering files, only process app/**/page.tsx")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="print every file with its timing, and the slowest files")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="process every file, even those the manifest shows as already done")
+    parser.add_argument("--dry-run", nargs="?", const="-", metavar="PATCH",
+                        help="write nothing; stream the changes as one patch set to PATCH (default: stdout)")
+    parser.add_argument("--format", choices=PATCH_FORMATS, default="diff",
+                        help="--dry-run patch set format: a unified diff or JSON lines (default: diff)")
+    parser.add_argument("--apply", metavar="PATCH",
+                        help="write a --dry-run patch set back instead of running any rules")
+
+
+def manifest_for(args):
+    """The manifest to use for parsed runner arguments, or None with --no-cache."""
+    return None if args.no_cache else MANIFEST_FILE
+
+
+def runner_log(args):
+    """Where progress goes: stderr while a --dry-run patch set streams to stdout."""
+    return stderr_log if args.dry_run == "-" else print
+
+
+@contextmanager
+def open_patch_output(path):
+    if path == "-":
+        yield sys.stdout
+        return
+    with open(path, 'w', encoding='utf-8', newline='') as out:
+        yield out
+
+
+def run_with_args(paths, names, args):
+    """run_codemod() as parsed runner arguments ask: in place, or as a --dry-run patch set."""
+    options = dict(jobs=args.jobs, verbose=args.verbose, manifest_file=manifest_for(args), log=runner_log(args))
+    if not args.dry_run:
+        return run_codemod(paths, names, **options)
+    with open_patch_output(args.dry_run) as out:
+        writer = PatchWriter(out, args.format)
+        results = run_codemod(paths, names, write=False, patch_writer=writer, **options)
+    if args.dry_run != "-":
+        print(f"📝 Patch set for {writer.files} files: {args.dry_run} (review, then --apply {args.dry_run})")
+    return results
+
+
+def apply_with_args(args):
+    """--apply: write a reviewed patch set back, all files or none. Returns the exit status."""
+    try:
+        count = apply_patch_set(args.apply, ROOT_DIR)
+    except (PatchError, OSError, UnicodeDecodeError, ValueError) as e:
+        print(f"❌ Nothing applied: {e}")
+        return 1
+    print(f"\n✨ Applied {args.apply} to {count} files")
+    return 0
+
+
+def main():
+    from codemod_rules import RULE_SETS
+
+    parser = argparse.ArgumentParser(description="Apply codemod rule sets to TSX files in a single pass each")
+    parser.add_argument("paths", nargs="*",
+                        help="files to transform (default: every app/**/page.tsx and components/** source)")
+    parser.add_argument("--rules", default="enhance,test-ids",
+                        help=f"comma-separated rule sets to combine ({', '.join(RULE_SETS)})")
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+    if args.apply:
+        sys.exit(apply_with_args(args))
+
+    names = tuple(name.strip() for name in args.rules.split(",") if name.strip())
+    rule_set = _rule_set(names)
+    paths = unique_paths(args.paths) if args.paths else discover_files(components=not args.no_components)
+    runner_log(args)(f"🚀 Applying {len(rule_set.rules)} rules ({rule_set.version}) to {len(paths)} files\n")
+    run_with_args(paths, names, args)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,191 @@
+#!/usr/bin/env python3
+"""
+Patch sets for codemod dry runs.
+
+A dry run writes what the codemods would change as one patch set instead of
+touching the files: either a combined unified diff (readable, and also
+accepted by `git apply`) or JSON lines with one record per file carrying the
+file's original sha256, the rule counts and its diff. Workers build each
+file's diff; the main process streams them out as files finish, so nothing
+is held in memory for the whole run.
+
+apply_patch_set() later writes a patch set back without re-running any
+rules. Every file is checked and patched into a temporary sibling first and
+only renamed into place once all of them applied cleanly, so a stale patch
+set changes nothing.
+
+    python3 codemod.py --dry-run codemods.diff        # review, then
+    python3 codemod.py --apply codemods.diff
+"""
+
+import os
+import re
+import sys
+import json
+import difflib
+import hashlib
+import tempfile
+from collections import namedtuple
+
+PATCH_FORMATS = ("diff", "jsonl")
+NO_NEWLINE = "\\ No newline at end of file\n"
+
+HUNK_HEADER_RE = re.compile(r"@@ -(\d+)(?:,(\d+))? \+(\d+)(?:,(\d+))? @@")
+
+# One file's changes; `sha256` is the original content's hash, or None when unknown
+FilePatch = namedtuple("FilePatch", ["path", "sha256", "hunks"])
+
+# `lines` are (tag, text) pairs, tag being " ", "-" or "+"
+Hunk = namedtuple("Hunk", ["old_start", "old_count", "lines"])
+
+
+class PatchError(Exception):
+    """A patch that does not apply to the file on disk."""
+
+
+def split_lines(text):
+    """Lines with their endings, split on "\\n" only (str.splitlines() also splits on \\r and \\u2028)."""
+    lines = [line + "\n" for line in text.split("\n")]
+    last = lines.pop()[:-1]
+    if last:
+        lines.append(last)
+    return lines
+
+
+def make_diff(rel_path, old, new, context=3):
+    """Unified diff from `old` to `new` text, with a/ and b/ prefixed paths."""
+    lines = []
+    for line in difflib.unified_diff(split_lines(old), split_lines(new),
+                                     f"a/{rel_path}", f"b/{rel_path}", n=context):
+        lines.append(line if line.endswith("\n") else line + "\n" + NO_NEWLINE)
+    return "".join(lines)
+
+
+class PatchWriter:
+    """Streams file diffs to `out` as a combined unified diff or as JSON lines."""
+
+    def __init__(self, out, fmt="diff"):
+        if fmt not in PATCH_FORMATS:
+            raise ValueError(f"unknown patch format {fmt!r} (known: {', '.join(PATCH_FORMATS)})")
+        self.out = out
+        self.format = fmt
+        self.files = 0
+
+    def write(self, rel_path, sha256, counts, diff):
+        if self.format == "jsonl":
+            self.out.write(json.dumps({"path": rel_path, "sha256": sha256, "counts": counts, "diff": diff}) + "\n")
+        else:
+            self.out.write(diff)
+        self.files += 1
+
+
+def parse_diff(lines):
+    """Yield a FilePatch per file of a unified diff given as lines with their endings.
+
+    Lines outside of file headers and hunks (commentary, progress output)
+    are ignored, as `git apply` does.
+    """
+    path = None
+    hunks = []
+    hunk = None
+    old_left = new_left = 0
+    for line in lines:
+        if line.startswith("\\"):
+            # The line before lacks its newline in the file
+            if hunk and hunk.lines:
+                tag, text = hunk.lines[-1]
+                hunk.lines[-1] = (tag, text[:-1] if text.endswith("\n") else text)
+            continue
+        if old_left or new_left:
+            tag = line[:1]
+            if tag not in (" ", "-", "+"):
+                raise PatchError(f"{path}: hunk ends early at {line.strip()!r}")
+            hunk.lines.append((tag, line[1:]))
+            old_left -= tag != "+"
+            new_left -= tag != "-"
+        elif line.startswith("--- "):
+            if path:
+                yield FilePatch(path, None, hunks)
+            path, hunks, hunk = None, [], None
+        elif line.startswith("+++ ") and not path:
+            name = line[4:].rstrip("\n").split("\t")[0]
+            path = name[2:] if name.startswith("b/") else name
+        elif line.startswith("@@") and path:
+            header = HUNK_HEADER_RE.match(line)
+            if not header:
+                raise PatchError(f"{path}: malformed hunk header {line.strip()!r}")
+            old_left = int(header.group(2) or 1)
+            new_left = int(header.group(4) or 1)
+            hunk = Hunk(int(header.group(1)), old_left, [])
+            hunks.append(hunk)
+    if path:
+        yield FilePatch(path, None, hunks)
+
+
+def read_patch_set(path):
+    """Yield the FilePatches of a patch set written by PatchWriter, in either format."""
+    with open(path, 'rb') as f:
+        first = f.readline()
+        f.seek(0)
+        if first.startswith(b"{"):
+            for line in f:
+                if line.strip():
+                    record = json.loads(line)
+                    for patch in parse_diff(split_lines(record["diff"])):
+                        yield patch._replace(sha256=record.get("sha256"))
+        else:
+            # Binary lines split on b"\n" only, like split_lines()
+            yield from parse_diff(line.decode('utf-8') for line in f)
+
+
+def apply_hunks(path, text, hunks):
+    """Return `text` with `hunks` applied; every removed and context line must match exactly."""
+    lines = split_lines(text)
+    output = []
+    pos = 0
+    for number, hunk in enumerate(hunks, 1):
+        start = hunk.old_start - 1 if hunk.old_count else hunk.old_start
+        old = [line for tag, line in hunk.lines if tag != "+"]
+        if start < pos or lines[start:start + len(old)] != old:
+            raise PatchError(f"{path}: hunk {number} does not match line {hunk.old_start}")
+        output.extend(lines[pos:start])
+        output.extend(line for tag, line in hunk.lines if tag != "-")
+        pos = start + len(old)
+    output.extend(lines[pos:])
+    return "".join(output)
+
+
+def apply_patch_set(patch_path, root, log=print):
+    """Apply a patch set below `root`, all or nothing. Returns the number of files written.
+
+    Raises PatchError, leaving every file untouched, if any patch does not
+    apply or a file changed since the patch set was written.
+    """
+    staged = []
+    try:
+        for patch in read_patch_set(patch_path):
+            path = os.path.join(root, patch.path)
+            with open(path, 'rb') as f:
+                raw = f.read()
+            if patch.sha256 and hashlib.sha256(raw).hexdigest() != patch.sha256:
+                raise PatchError(f"{patch.path}: changed since the patch set was written")
+            content = apply_hunks(patch.path, raw.decode('utf-8'), patch.hunks)
+            fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=".codemod-")
+            staged.append((tmp_path, path))
+            with os.fdopen(fd, 'w', encoding='utf-8', newline='') as f:
+                f.write(content)
+            os.chmod(tmp_path, os.stat(path).st_mode & 0o7777)
+    except BaseException:
+        for tmp_path, _ in staged:
+            os.unlink(tmp_path)
+        raise
+
+    for tmp_path, path in staged:
+        os.replace(tmp_path, path)
+        log(f"✅ {os.path.relpath(path, root)}")
+    return len(staged)
+
+
+def stderr_log(*args, **kwargs):
+    """print() to stderr, for progress while a patch set streams to stdout."""
+    print(*args, file=sys.stderr, **kwargs)
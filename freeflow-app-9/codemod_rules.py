@@ -0,0 +1,288 @@
+#!/usr/bin/env python3
+"""
+Rule sets for codemod.py.
+
+Each rule set is built by a module-level factory so any process can rebuild
+it by name. Bump a set's version whenever one of its rules changes.
+"""
+
+import os
+import re
+
+from codemod import RuleSet
+from tsx_lexer import IDENTIFIER_CHARS, SPACE_RE, attribute, string_attribute
+
+# Validation errors get an alert() instead of a console.log()
+VALIDATION_WORDS_RE = re.compile(r"required|please|must|cannot|invalid", re.IGNORECASE)
+ALERT_PREFIX = "❌ Error\\n\\n"
+
+# toast calls and what replaces them: rule name, method ("" for toast()), emoji
+TOAST_CALLS = [
+    ("toast-success", "success", "✅"),
+    ("toast-info", "info", "ℹ️"),
+    ("toast-warning", "warning", "⚠️"),
+    ("toast-default", "", "📢"),
+]
+
+# toast imports the enhance rules remove: rule name, module
+TOAST_IMPORTS = [
+    ("toast-import-sonner", "sonner"),
+    ("toast-import-lib", "@/lib/toast"),
+]
+
+TOAST_REFERENCE_RE = re.compile(r"(?<![\w$.])toast\b")
+TOAST_CALL_RE = re.compile(r"toast(?:\.(success|info|warning|error))?\(")
+TOAST_IMPORT_RE = re.compile(r"import\s*\{\s*toast\s*\}\s*from\s*['\"][^'\"\n]*['\"]")
+
+
+def message_argument(match, scan):
+    """The lone string or template literal passed to the call whose `(` ends `match`.
+
+    Returns (token, end of the call), or None when the call has other
+    arguments, an empty message, or is really e.g. `mytoast(` or `obj.toast(`.
+    """
+    text = scan.text
+    if match.start() and (text[match.start() - 1] in IDENTIFIER_CHARS or text[match.start() - 1] == "."):
+        return None
+    token = scan.token_at(SPACE_RE.match(text, match.end()).end())
+    if token is None or token.kind not in ("string", "template") or token.end - token.start < 3 \
+            or text[token.end - 1] != text[token.start]:
+        return None
+    close = SPACE_RE.match(text, token.end).end()
+    if not text.startswith(")", close):
+        return None
+    return token, close + 1
+
+
+def toast_fully_replaced(scan):
+    """True when every `toast` in the file's code, imports aside, is a call the enhance rules rewrite.
+
+    Calls with options (`toast.success('Saved', {...})`), other methods
+    such as toast.promise() and bare references keep the import.
+    """
+    if "toast-fully-replaced" not in scan.memo:
+        text = scan.text
+        imports = [match.span() for match in TOAST_IMPORT_RE.finditer(text)]
+        replaced = True
+        for reference in TOAST_REFERENCE_RE.finditer(text):
+            start = reference.start()
+            if not scan.in_code(start) or any(begin <= start < end for begin, end in imports):
+                continue
+            call = TOAST_CALL_RE.match(text, start)
+            if call is None or message_argument(call, scan) is None:
+                replaced = False
+                break
+        scan.memo["toast-fully-replaced"] = replaced
+    return scan.memo["toast-fully-replaced"]
+
+
+def quote_message(prefix, token, text):
+    """`prefix` followed by the literal's text, as a literal that means the same.
+
+    Single quotes where that is safe, as the regex rules always wrote;
+    otherwise the original quotes, and template literals with ${...} or
+    line breaks stay template literals.
+    """
+    quote = text[token.start]
+    body = text[token.start + 1:token.end - 1]
+    if quote == "`":
+        if token.parts or any(char in body for char in "'\\\n"):
+            return f"`{prefix}{body}`"
+        quote = "'"
+    elif "'" in body and quote == '"':
+        return f'"{prefix}{body}"'
+    return f"'{prefix}{body}'"
+
+
+def enhance_rules():
+    """Replace sonner toasts with console.log()/alert() feedback (enhance-all-pages.py)."""
+    rules = RuleSet("enhance", version="5")
+
+    # 1. Remove toast imports (imports already commented out are not code),
+    # but only from files where step 2 rewrites every use of toast
+    def remove_import(module):
+        def remove(match, scan):
+            if toast_fully_replaced(scan):
+                return match.start(), match.end(), \
+                    f"// import {{ toast }} from '{module}' // Removed - using alert() for user feedback"
+        return remove
+
+    for name, module in TOAST_IMPORTS:
+        rules.token_rule(name, rf"import\s*\{{\s*toast\s*\}}\s*from\s*['\"]{re.escape(module)}['\"]")(
+            remove_import(module))
+
+    # 2. Replace toast calls whose only argument is a message literal;
+    # template literals keep their ${...} interpolations
+    def replace_call(emoji):
+        def replace(match, scan):
+            argument = message_argument(match, scan)
+            if argument:
+                token, end = argument
+                return match.start(), end, f"console.log({quote_message(emoji + ' ', token, scan.text)})"
+        return replace
+
+    for name, method, emoji in TOAST_CALLS:
+        pattern = rf"toast\.{method}\(" if method else r"toast\("
+        rules.token_rule(name, pattern)(replace_call(emoji))
+
+    @rules.token_rule("toast-error", r"toast\.error\(")
+    def replace_error(match, scan):
+        argument = message_argument(match, scan)
+        if not argument:
+            return None
+        token, end = argument
+        if VALIDATION_WORDS_RE.search(scan.text, token.start, token.end):
+            return match.start(), end, f"alert({quote_message(ALERT_PREFIX, token, scan.text)})"
+        return match.start(), end, f"console.log({quote_message('❌ ', token, scan.text)})"
+
+    return rules
+
+
+def is_plugin_marketplace(path):
+    return os.path.basename(os.path.dirname(path or "")) == "plugin-marketplace"
+
+
+def insert_attribute(tag, text):
+    """The edit adding `text` as the last attribute of a lexed JSX tag."""
+    pos = tag.attributes[-1].end if tag.attributes else tag.start + 1 + len(tag.name)
+    return pos, pos, f" {text}"
+
+
+# Plugin marketplace buttons, by what their onClick handler calls
+PLUGIN_BUTTONS = [
+    ("uninstall-plugin-btn", re.compile(r"(?<![\w$])uninstallPlugin\s*\(")),
+    ("install-plugin-btn", re.compile(r"(?<![\w$])installPlugin\s*\(")),
+    ("grid-view-btn", re.compile(r"""(?<![\w$])setViewMode\(\s*['"]grid['"]\s*\)""")),
+    ("list-view-btn", re.compile(r"""(?<![\w$])setViewMode\(\s*['"]list['"]\s*\)""")),
+]
+
+
+# Generic action buttons (save, cancel, submit, create, delete, etc.), by
+# the family words in their label, with the ID for a button labelled with
+# nothing but that word
+ACTION_PATTERNS = [
+    (r'([Ss]ave|[Ss]ubmit)', 'save-btn'),
+    (r'([Cc]ancel|[Cc]lose)', 'cancel-btn'),
+    (r'([Cc]reate|[Aa]dd|[Nn]ew)', 'create-btn'),
+    (r'([Dd]elete|[Rr]emove)', 'delete-btn'),
+    (r'([Ee]dit|[Mm]odify)', 'edit-btn'),
+    (r'([Ee]xport)', 'export-btn'),
+    (r'([Ii]mport)', 'import-btn'),
+    (r'([Ss]hare)', 'share-btn'),
+    (r'([Dd]ownload)', 'download-btn'),
+    (r'([Uu]pload)', 'upload-btn'),
+    (r'([Rr]efresh)', 'refresh-btn'),
+    (r'([Ss]earch)', 'search-btn'),
+    (r'([Ff]ilter)', 'filter-btn'),
+]
+
+# Every family in one regex: a label is searched once, and the one group
+# that matched names the family. Whole words only, so "Address" is no "Add".
+ACTION_LABEL_RE = re.compile(r"\b(?:" + "|".join(pattern for pattern, _ in ACTION_PATTERNS) + r")(?:s|e?d|ing)?\b")
+LABEL_WORD_RE = re.compile(r"[a-z0-9]+")
+HTML_ENTITY_RE = re.compile(r"&#?\w+;")
+MAX_LABEL_WORDS = 4
+BUTTON_TAGS = ("button", "Button")
+
+
+def button_label(scan, tag):
+    """A button's visible text, or its aria-label or title when it has none."""
+    children = scan.children(tag)
+    label = scan.jsx_text(*children) if children else ""
+    return label or string_attribute(scan, tag, "aria-label") or string_attribute(scan, tag, "title") or ""
+
+
+def action_test_id(label):
+    """(test ID, family ID) for an action button's label, or None.
+
+    A label that is just the family word gets the family's ID ("Close" ->
+    cancel-btn); others are named after their first words, like the IDs
+    written by hand ("Export Report" -> export-report-btn).
+    """
+    match = ACTION_LABEL_RE.search(label)
+    if not match:
+        return None
+    family = ACTION_PATTERNS[match.lastindex - 1][1]
+    words = LABEL_WORD_RE.findall(HTML_ENTITY_RE.sub(" ", label).lower())
+    if words == [match.group(match.lastindex).lower()]:
+        return family, family
+    return "-".join(words[:MAX_LABEL_WORDS]) + "-btn", family
+
+
+def page_test_ids(scan):
+    """{tag start: (test ID, family ID)} for the action buttons of one file without an ID.
+
+    IDs already in the file are never reused, and a repeated ID gets -2,
+    -3, ... in document order. Buttons that have an ID are left alone, so
+    once written an ID stays put on later runs.
+    """
+    if "action-test-ids" not in scan.memo:
+        taken = {string_attribute(scan, tag, "data-testid") for tag in scan.tags.values()}
+        assigned = {}
+        for start in sorted(scan.tags):
+            tag = scan.tags[start]
+            if tag.name not in BUTTON_TAGS or attribute(tag, "data-testid"):
+                continue
+            found = action_test_id(button_label(scan, tag))
+            if not found:
+                continue
+            test_id, family = found
+            unique, n = test_id, 2
+            while unique in taken:
+                unique, n = f"{test_id}-{n}", n + 1
+            taken.add(unique)
+            assigned[start] = (unique, family)
+        scan.memo["action-test-ids"] = assigned
+    return scan.memo["action-test-ids"]
+
+
+def test_id_rules():
+    """Add data-testid attributes to buttons (add-test-ids-script.py)."""
+    rules = RuleSet("test-ids", version="3")
+
+    # Plugin marketplace install/uninstall and view mode buttons. The lexed
+    # tag gives the whole onClick={...} however it nests; buttons that
+    # already have a test ID are left alone.
+    @rules.token_rule("plugin-marketplace-btn", r"<button", when=is_plugin_marketplace)
+    def plugin_button(match, scan):
+        tag = scan.tag_at(match.start())
+        if tag is None or tag.name != "button" or attribute(tag, "data-testid"):
+            return None
+        on_click = attribute(tag, "onClick")
+        if on_click is None or on_click.value_end is None:
+            return None
+        handler = scan.text[on_click.value_start:on_click.value_end]
+        for test_id, call_re in PLUGIN_BUTTONS:
+            if call_re.search(handler):
+                return insert_attribute(tag, f'data-testid="{test_id}"') + (test_id,)
+        return None
+
+    # Every other <button>/<Button> whose label has an action word; counted
+    # by family
+    @rules.token_rule("action-btn", r"<[Bb]utton\b")
+    def action_button(match, scan):
+        found = page_test_ids(scan).get(match.start())
+        if found:
+            test_id, family = found
+            return insert_attribute(scan.tag_at(match.start()), f'data-testid="{test_id}"') + (family,)
+        return None
+
+    return rules
+
+
+RULE_SETS = {
+    "enhance": enhance_rules,
+    "test-ids": test_id_rules,
+}
+
+
+def build_rule_set(names):
+    """Combine the named rule sets, in order, into one RuleSet."""
+    names = [name.strip() for name in names if name.strip()]
+    unknown = [name for name in names if name not in RULE_SETS]
+    if unknown:
+        raise ValueError(f"unknown rule sets: {', '.join(unknown)} (known: {', '.join(RULE_SETS)})")
+    rule_set = RULE_SETS[names[0]]()
+    for name in names[1:]:
+        rule_set.extend(RULE_SETS[name]())
+    return rule_set
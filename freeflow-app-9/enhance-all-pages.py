@@ -1,14 +1,18 @@
 #!/usr/bin/env python3
 """
 Systematically enhance all dashboard pages by:
-1. Removing toast imports
+1. Removing toast imports from pages whose toast calls all get replaced
 2. Replacing toast calls with console.log/alert
 3. Adding data-testid attributes to buttons
 """
 
 import os
-import re
-import subprocess
+import sys
+import argparse
+
+from codemod import (
+    add_runner_arguments, apply_with_args, discover_files, page_paths, run_with_args, runner_log
+)
 
 # All dashboard pages that need enhancement
 PAGES_TO_ENHANCE = [
@@ -55,108 +59,30 @@ PAGES_TO_ENHANCE = [
     'workflow-builder'
 ]
 
-BASE_PATH = '/Users/thabonyembe/Documents/freeflow-app-9/app/(app)/dashboard'
-
-def enhance_page(page_name):
-    """Enhance a single page"""
-    file_path = os.path.join(BASE_PATH, page_name, 'page.tsx')
-
-    if not os.path.exists(file_path):
-        print(f"❌ {page_name}: File not found")
-        return False
-
-    try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-
-        original_content = content
-
-        # 1. Remove toast imports
-        content = re.sub(
-            r"import\s*\{\s*toast\s*\}\s*from\s*['\"]sonner['\"]",
-            "// import { toast } from 'sonner' // Removed - using alert() for user feedback",
-            content
-        )
-        content = re.sub(
-            r"import\s*\{\s*toast\s*\}\s*from\s*['\"]@/lib/toast['\"]",
-            "// import { toast } from '@/lib/toast' // Removed - using alert() for user feedback",
-            content
-        )
-
-        # 2. Replace toast calls
-        # toast.success
-        content = re.sub(
-            r"toast\.success\(\s*['\"]([^'\"]+)['\"]\s*\)",
-            r"console.log('✅ \1')",
-            content
-        )
-        content = re.sub(
-            r"toast\.success\(\s*`([^`]+)`\s*\)",
-            lambda m: f"console.log('✅ {m.group(1)}')",
-            content
-        )
-
-        # toast.error (check if validation error - use alert)
-        def replace_error(match):
-            msg = match.group(1)
-            # Validation errors get alerts
-            if any(word in msg.lower() for word in ['required', 'please', 'must', 'cannot', 'invalid']):
-                return f"alert('❌ Error\\n\\n{msg}')"
-            return f"console.log('❌ {msg}')"
-
-        content = re.sub(
-            r"toast\.error\(\s*['\"]([^'\"]+)['\"]\s*\)",
-            replace_error,
-            content
-        )
-
-        # toast.info
-        content = re.sub(
-            r"toast\.info\(\s*['\"]([^'\"]+)['\"]\s*\)",
-            r"console.log('ℹ️ \1')",
-            content
-        )
-
-        # toast.warning
-        content = re.sub(
-            r"toast\.warning\(\s*['\"]([^'\"]+)['\"]\s*\)",
-            r"console.log('⚠️ \1')",
-            content
-        )
-
-        # toast() default
-        content = re.sub(
-            r"toast\(\s*['\"]([^'\"]+)['\"]\s*\)",
-            r"console.log('📢 \1')",
-            content
-        )
-
-        # 3. Add test IDs to buttons (basic pattern - won't catch all)
-        # This is a simple approach; manual review recommended
-
-        if content != original_content:
-            with open(file_path, 'w', encoding='utf-8') as f:
-                f.write(content)
-            print(f"✅ {page_name}: Enhanced successfully")
-            return True
-        else:
-            print(f"ℹ️  {page_name}: No changes needed")
-            return True
-
-    except Exception as e:
-        print(f"❌ {page_name}: Error - {str(e)}")
-        return False
+BASE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'app', '(app)', 'dashboard')
 
 def main():
-    print("🚀 Starting systematic page enhancement...")
-    print(f"📋 Processing {len(PAGES_TO_ENHANCE)} pages\n")
-
-    success_count = 0
-    for page in PAGES_TO_ENHANCE:
-        if enhance_page(page):
-            success_count += 1
-
-    print(f"\n✨ Complete! Enhanced {success_count}/{len(PAGES_TO_ENHANCE)} pages")
+    parser = argparse.ArgumentParser(description="Replace toast feedback with console.log/alert across the app")
+    parser.add_argument("pages", nargs="*",
+                        help="dashboard pages, e.g. invoices or team/enhanced (default: every page.tsx and component)")
+    parser.add_argument("--listed", action="store_true",
+                        help="process the hand-picked PAGES_TO_ENHANCE list instead of discovering files")
+    add_runner_arguments(parser)
+    args = parser.parse_args()
+    if args.apply:
+        sys.exit(apply_with_args(args))
+
+    log = runner_log(args)
+    if args.pages or args.listed:
+        paths, missing = page_paths(args.pages or PAGES_TO_ENHANCE, BASE_PATH)
+        for page in missing:
+            log(f"❌ {page}: File not found")
+    else:
+        paths = discover_files(components=not args.no_components)
+
+    log("🚀 Starting systematic page enhancement...")
+    log(f"📋 Processing {len(paths)} pages\n")
+    run_with_args(paths, ["enhance"], args)
 
 if __name__ == '__main__':
     main()
@@ -1,12 +1,22 @@
 #!/usr/bin/env python3
 
+import io
 import os
 import re
-import glob
-from pathlib import Path
+import sys
+import gzip
+import argparse
+import tempfile
+from contextlib import contextmanager
 
-MIGRATIONS_DIR = "/Users/thabonyembe/Documents/freeflow-app-9/supabase/migrations"
-OUTPUT_FILE = "/Users/thabonyembe/Documents/freeflow-app-9/supabase/migrations/20241216000010_all_missing_tables.sql"
+from migration_index import (
+    CACHE_FILE, MIGRATIONS_DIR, ROOT_DIR, build_index, definition_order, latest_definition, read_statement
+)
+from sql_schema import canonical_type, dependency_batches, parse_create_table
+from source_index import CACHE_FILE as SOURCE_CACHE_FILE, SOURCE_DIRS, referenced_tables, scan_tree
+
+OUTPUT_FILE = os.path.join(MIGRATIONS_DIR, "20241216000010_all_missing_tables.sql")
+OUTPUT_BUFFER_SIZE = 1 << 20
 
 # List of all missing tables
 TABLES = [
@@ -79,90 +89,201 @@ TABLES = [
     "webhook_event_types", "webinars", "workflow_steps"
 ]
 
-def extract_create_table(file_path, table_name):
-    """Extract CREATE TABLE statement for a specific table from a file."""
-    with open(file_path, 'r', encoding='utf-8') as f:
-        content = f.read()
-
-    # Pattern to match CREATE TABLE statement
-    # We need to match from CREATE TABLE to the closing semicolon
-    # This handles multi-line statements with nested parentheses
+def extract_create_table(definition):
+    """Extract the CREATE TABLE statement for an indexed table definition."""
+    return read_statement(definition).strip()
 
-    # Find the start of the CREATE TABLE statement
-    pattern = rf'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?{re.escape(table_name)}\s*\('
-    match = re.search(pattern, content, re.IGNORECASE | re.MULTILINE)
+def find_table_file(table_name, index):
+    """Find the CREATE TABLE statement for this table, the latest if several migrations create it.
 
-    if not match:
+    The latest is the definition --duplicates diffs the others against.
+    """
+    definitions = index.get(table_name.lower())
+    if not definitions:
         return None
+    return latest_definition(definitions)
+
+def analyze_duplicates(index):
+    """Compare every table created more than once against its most recent definition.
+
+    Returns a list of (table, latest, others) where `others` holds a
+    (definition, added, removed, changed) column diff per older definition:
+    columns the older one has that the latest lacks (`added`), columns it
+    lacks (`removed`) and columns whose normalised type differs (`changed`).
+    Aliases of one type, like `timestamptz` and `timestamp with time zone`,
+    are the same type.
+    """
+    duplicates = []
+    for table in sorted(index):
+        definitions = index[table]
+        if len(definitions) < 2:
+            continue
+        latest = latest_definition(definitions)
+        latest_columns = column_types(latest)
+        others = []
+        for definition in sorted(definitions, key=definition_order, reverse=True):
+            if definition is latest:
+                continue
+            columns = column_types(definition)
+            added = sorted(set(columns) - set(latest_columns))
+            removed = sorted(set(latest_columns) - set(columns))
+            changed = sorted(
+                (name, columns[name], latest_columns[name])
+                for name in set(columns) & set(latest_columns)
+                if columns[name] != latest_columns[name]
+            )
+            others.append((definition, added, removed, changed))
+        duplicates.append((table, latest, others))
+    return duplicates
+
+def column_types(definition):
+    """{column: canonical type} of a CREATE TABLE definition; {} if it does not parse."""
+    schema = parse_create_table(read_statement(definition))
+    return {name: canonical_type(column_type) for name, column_type in schema.columns.items()} if schema else {}
+
+def report_duplicates(duplicates, log=print):
+    """Print the duplicate analysis; returns the number of tables with conflicting column sets."""
+    def where(definition):
+        return f"{os.path.basename(definition.path)}:{definition.line}"
+
+    log("Column diffs are against the latest definition: +only here, -only in latest, ~type differs\n")
+    conflicting = 0
+    for table, latest, others in duplicates:
+        conflicts = [other for other in others if any(other[1:])]
+        if conflicts:
+            conflicting += 1
+        log(f"{table}: {len(others) + 1} definitions, "
+            f"{'CONFLICTING' if conflicts else 'identical'} column sets")
+        log(f"  * {where(latest)} (latest)")
+        for definition, added, removed, changed in others:
+            diff = [f"+{name}" for name in added] + [f"-{name}" for name in removed]
+            diff += [f"~{name} {old} -> {new}" for name, old, new in changed]
+            log(f"    {where(definition)}  {' '.join(diff) if diff else '(same columns)'}")
+
+    log("\n" + "=" * 50)
+    log(f"Tables defined more than once: {len(duplicates)}")
+    log(f"Tables with conflicting definitions: {conflicting}")
+    return conflicting
+
+def extract_records(tables, index, log=print):
+    """Yield a (table, source, statement) record per table; source and statement are None if missing."""
+    for table in tables:
+        log(f"Processing: {table}")
 
-    # Find the matching closing parenthesis and semicolon
-    start_pos = match.start()
-    paren_count = 0
-    in_string = False
-    string_char = None
-    i = match.end() - 1  # Start from the opening parenthesis
-
-    while i < len(content):
-        char = content[i]
-
-        # Handle string literals
-        if char in ('"', "'") and (i == 0 or content[i-1] != '\\'):
-            if not in_string:
-                in_string = True
-                string_char = char
-            elif char == string_char:
-                in_string = False
-                string_char = None
-
-        # Count parentheses only outside of strings
-        if not in_string:
-            if char == '(':
-                paren_count += 1
-            elif char == ')':
-                paren_count -= 1
-
-                # Found the closing parenthesis
-                if paren_count == 0:
-                    # Now find the semicolon
-                    j = i + 1
-                    while j < len(content):
-                        if content[j] == ';':
-                            # Extract the complete statement
-                            statement = content[start_pos:j+1]
-                            return statement.strip()
-                        elif not content[j].isspace():
-                            # Non-whitespace character before semicolon
-                            break
-                        j += 1
-                    break
-
-        i += 1
-
-    return None
-
-def find_table_file(table_name):
-    """Find which migration file contains the CREATE TABLE statement for this table."""
-    sql_files = glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql"))
-
-    for file_path in sql_files:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            content = f.read()
-            # Look for CREATE TABLE statement with this exact table name
-            pattern = rf'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?{re.escape(table_name)}\s*\('
-            if re.search(pattern, content, re.IGNORECASE):
-                return file_path
-
-    return None
-
-def main():
-    print(f"Searching for {len(TABLES)} tables in migration files...")
-
-    # Create output file with header
-    with open(OUTPUT_FILE, 'w', encoding='utf-8') as out:
-        out.write("""-- =====================================================
+        # Find the file containing this table
+        definition = find_table_file(table, index)
+
+        if not definition:
+            log(f"  NOT FOUND")
+            yield table, None, None
+            continue
+
+        file_name = os.path.basename(definition.path)
+        log(f"  Found in: {file_name}")
+
+        # Extract the CREATE TABLE statement
+        statement = extract_create_table(definition)
+
+        if not statement:
+            log(f"  WARNING: Could not extract statement")
+            yield table, None, None
+            continue
+
+        # Make sure it has IF NOT EXISTS
+        if "IF NOT EXISTS" not in statement.upper():
+            statement = re.sub(
+                r'(CREATE\s+TABLE)\s+',
+                r'\1 IF NOT EXISTS ',
+                statement,
+                count=1,
+                flags=re.IGNORECASE
+            )
+
+        yield table, file_name, statement
+
+@contextmanager
+def open_output(path, compress=False):
+    """Open the consolidated output as one buffered text stream.
+
+    `-` streams to stdout. Files are written to a temporary sibling and
+    renamed over `path` only once everything was written, so a crash never
+    leaves a half-written migration behind.
+    """
+    if path == "-":
+        if not compress:
+            yield sys.stdout
+            sys.stdout.flush()
+            return
+        with gzip.GzipFile(fileobj=sys.stdout.buffer, mode='wb') as gz, \
+                io.TextIOWrapper(gz, encoding='utf-8') as out:
+            yield out
+        sys.stdout.buffer.flush()
+        return
+
+    directory = os.path.dirname(os.path.abspath(path))
+    fd, tmp_path = tempfile.mkstemp(dir=directory, prefix=f".{os.path.basename(path)}.", suffix=".tmp")
+    try:
+        with open(fd, 'wb', buffering=OUTPUT_BUFFER_SIZE) as raw:
+            if compress:
+                with gzip.GzipFile(filename=os.path.basename(path), fileobj=raw, mode='wb') as gz, \
+                        io.TextIOWrapper(gz, encoding='utf-8') as out:
+                    yield out
+            else:
+                with io.TextIOWrapper(raw, encoding='utf-8', write_through=False) as out:
+                    yield out
+        os.chmod(tmp_path, os.stat(path).st_mode if os.path.exists(path) else 0o644)
+        os.replace(tmp_path, path)
+    except BaseException:
+        if os.path.exists(tmp_path):
+            os.unlink(tmp_path)
+        raise
+
+def order_records(records):
+    """Reorder found records so every table follows the tables it references.
+
+    Returns (records, batch_of, cycles, external): missing tables keep their
+    place at the end, `batch_of` maps table -> batch number, `cycles` lists
+    reference cycles and `external` maps table -> referenced tables that are
+    not part of this migration (other than auth.*).
+    """
+    found = {}
+    missing = []
+    for record in records:
+        if record[2] is None:
+            missing.append(record)
+        else:
+            found[record[0]] = record
+
+    dependencies = {}
+    external = {}
+    for table, _, statement in found.values():
+        schema = parse_create_table(statement)
+        referenced = {fk.table for fk in schema.foreign_keys} if schema else set()
+        dependencies[table] = referenced
+        outside = sorted(
+            ref for ref in referenced
+            if ref not in found and ref != table and not ref.startswith("auth.")
+        )
+        if outside:
+            external[table] = outside
+
+    batches, cycles = dependency_batches(dependencies)
+    batch_of = {table: number for number, batch in enumerate(batches, 1) for table in batch}
+    ordered = [found[table] for batch in batches for table in batch]
+    return ordered + missing, batch_of, cycles, external
+
+def write_consolidated(out, records, total, batch_of=None, cycles=(), external=None):
+    """Stream the header, every found statement and the summary to `out`.
+
+    With `batch_of`, a header is written before each dependency batch; tables
+    within one batch do not reference each other, except the tables of a
+    foreign key cycle, which the batch header then names.
+    Returns (found_count, missing_tables).
+    """
+    out.write(f"""-- =====================================================
 -- ALL MISSING TABLES - Consolidated Migration
 -- Created: December 16, 2024
--- Total Tables: 314
+-- Total Tables: {total}
 -- =====================================================
 -- This file consolidates CREATE TABLE statements for all missing tables
 -- extracted from existing migration files.
@@ -172,72 +293,175 @@ def main():
 
     found_count = 0
     missing_tables = []
+    batch = None
+    batch_count = max(batch_of.values(), default=0) if batch_of else 0
+    cyclic = {table for cycle in cycles for table in cycle}
 
-    for table in TABLES:
-        print(f"Processing: {table}")
-
-        # Find the file containing this table
-        file_path = find_table_file(table)
-
-        if file_path:
-            file_name = os.path.basename(file_path)
-            print(f"  Found in: {file_name}")
-
-            # Extract the CREATE TABLE statement
-            statement = extract_create_table(file_path, table)
-
-            if statement:
-                # Make sure it has IF NOT EXISTS
-                if "IF NOT EXISTS" not in statement.upper():
-                    statement = re.sub(
-                        r'(CREATE\s+TABLE)\s+',
-                        r'\1 IF NOT EXISTS ',
-                        statement,
-                        count=1,
-                        flags=re.IGNORECASE
-                    )
-
-                with open(OUTPUT_FILE, 'a', encoding='utf-8') as out:
-                    out.write(f"\n-- =====================================================\n")
-                    out.write(f"-- Table: {table}\n")
-                    out.write(f"-- Source: {file_name}\n")
-                    out.write(f"-- =====================================================\n")
-                    out.write(statement)
-                    out.write("\n\n")
-
-                found_count += 1
-            else:
-                print(f"  WARNING: Could not extract statement")
-                missing_tables.append(table)
-        else:
-            print(f"  NOT FOUND")
+    for table, source, statement in records:
+        if statement is None:
             missing_tables.append(table)
+            continue
+
+        if batch_of and batch_of[table] != batch:
+            batch = batch_of[table]
+            size = sum(1 for number in batch_of.values() if number == batch)
+            out.write(f"\n-- #####################################################\n")
+            out.write(f"-- BATCH {batch}/{batch_count}: {size} tables\n")
+            batch_cycles = [cycle for cycle in cycles if batch_of.get(cycle[0]) == batch]
+            if batch_cycles:
+                out.write(f"-- Depends only on earlier batches, but contains foreign key cycles:\n")
+                for cycle in batch_cycles:
+                    out.write(f"-- - {' <-> '.join(cycle)}\n")
+                out.write(f"-- No order creates a cycle's tables on a fresh database: move one REFERENCES\n")
+                out.write(f"-- of each cycle into an ALTER TABLE ... ADD CONSTRAINT after this batch\n")
+            else:
+                out.write(f"-- Depends only on earlier batches; tables in this batch are independent\n")
+            out.write(f"-- #####################################################\n")
+
+        out.write(f"\n-- =====================================================\n")
+        out.write(f"-- Table: {table}\n")
+        out.write(f"-- Source: {source}\n")
+        if table in cyclic:
+            out.write(f"-- WARNING: part of a foreign key cycle, see the batch header\n")
+        out.write(f"-- =====================================================\n")
+        out.write(statement)
+        out.write("\n\n")
+        found_count += 1
 
     # Add summary
-    with open(OUTPUT_FILE, 'a', encoding='utf-8') as out:
-        out.write("\n-- =====================================================\n")
-        out.write("-- EXTRACTION SUMMARY\n")
-        out.write("-- =====================================================\n")
-        out.write(f"-- Total tables searched: {len(TABLES)}\n")
-        out.write(f"-- Tables found: {found_count}\n")
-        out.write(f"-- Tables not found: {len(missing_tables)}\n")
-        out.write("-- =====================================================\n")
-
-        if missing_tables:
-            out.write("-- TABLES NOT FOUND:\n")
-            for table in missing_tables:
-                out.write(f"-- - {table}\n")
-
-    print("\n" + "=" * 50)
-    print("EXTRACTION COMPLETE!")
-    print("=" * 50)
-    print(f"Found: {found_count}/{len(TABLES)} tables")
-    print(f"Output: {OUTPUT_FILE}")
+    out.write("\n-- =====================================================\n")
+    out.write("-- EXTRACTION SUMMARY\n")
+    out.write("-- =====================================================\n")
+    out.write(f"-- Total tables searched: {total}\n")
+    out.write(f"-- Tables found: {found_count}\n")
+    out.write(f"-- Tables not found: {len(missing_tables)}\n")
+    out.write("-- =====================================================\n")
+
+    if missing_tables:
+        out.write("-- TABLES NOT FOUND:\n")
+        for table in missing_tables:
+            out.write(f"-- - {table}\n")
+
+    if cycles:
+        out.write("-- FOREIGN KEY CYCLES:\n")
+        for cycle in cycles:
+            out.write(f"-- - {' <-> '.join(cycle)}\n")
+
+    if external:
+        out.write("-- REFERENCES TO TABLES OUTSIDE THIS FILE:\n")
+        for table, refs in sorted(external.items()):
+            out.write(f"-- - {table} -> {', '.join(refs)}\n")
+
+    return found_count, missing_tables
+
+def discover_tables(index, facts_by_path, log=print):
+    """Compare the tables the app queries with the tables the migrations create.
+
+    Returns (defined, missing): referenced tables that some migration creates,
+    and referenced tables that no migration creates, both sorted.
+    """
+    referenced = referenced_tables(facts_by_path)
+    defined = sorted(table for table in referenced if table.lower() in index)
+    missing = sorted(table for table in referenced if table.lower() not in index)
+
+    log(f"Tables referenced by the app: {len(referenced)}")
+    log(f"  created by a migration: {len(defined)}")
+    log(f"  created by no migration: {len(missing)}")
+    for table in missing:
+        files = referenced[table]
+        where = os.path.relpath(files[0], ROOT_DIR)
+        more = f" (+{len(files) - 1} more)" if len(files) > 1 else ""
+        log(f"  - {table}  {where}{more}")
+    return defined, missing
+
+def parse_args():
+    parser = argparse.ArgumentParser(description="Consolidate CREATE TABLE statements for missing tables")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE,
+                        help="consolidated migration to write, or - for stdout (e.g. to pipe into psql)")
+    parser.add_argument("--gzip", action="store_true",
+                        help="gzip the output (implied by a .gz output path)")
+    parser.add_argument("--order", choices=("dependencies", "listed"), default="dependencies",
+                        help="emit tables in foreign key dependency batches (default) or in TABLES order")
+    parser.add_argument("--discover", action="store_true",
+                        help="list tables queried with .from() in lib/, hooks/ and app/ that no migration creates, then exit")
+    parser.add_argument("--from-app", action="store_true",
+                        help="consolidate every table the app queries instead of the hard-coded TABLES list")
+    parser.add_argument("--duplicates", action="store_true",
+                        help="report every table created more than once with a column diff, then exit")
+    parser.add_argument("--strict", action="store_true",
+                        help="with --duplicates, exit non-zero if any definitions conflict (for pre-commit)")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="re-parse every migration instead of using the on-disk index cache")
+    parser.add_argument("-j", "--jobs", type=int, default=1,
+                        help="parse migrations on N worker processes (0 = one per CPU)")
+    return parser.parse_args()
+
+def main():
+    args = parse_args()
+    output = args.output
+    compress = args.gzip or output.endswith(".gz")
+
+    # Keep stdout clean for the SQL when streaming it
+    def log(*values):
+        print(*values, file=sys.stderr if output == "-" else sys.stdout)
+
+    # One pass over the migrations; every lookup below is a dictionary hit.
+    # Our own output is never a source, also when this run writes elsewhere.
+    stats = {}
+    index = build_index(MIGRATIONS_DIR, exclude=(OUTPUT_FILE,) if output == "-" else (OUTPUT_FILE, output),
+                        cache_file=None if args.no_cache else CACHE_FILE, stats=stats,
+                        jobs=args.jobs)
+    log(f"Indexed {sum(len(d) for d in index.values())} CREATE TABLE statements "
+        f"for {len(index)} tables ({stats['parsed']}/{stats['files']} migrations parsed)")
+
+    if args.duplicates:
+        conflicting = report_duplicates(analyze_duplicates(index), log)
+        sys.exit(1 if args.strict and conflicting else 0)
+
+    tables = TABLES
+    if args.discover or args.from_app:
+        source_stats = {}
+        facts_by_path = scan_tree(SOURCE_DIRS, None if args.no_cache else SOURCE_CACHE_FILE,
+                                  args.jobs, source_stats)
+        log(f"Scanned {source_stats['scanned']}/{source_stats['files']} source files")
+        defined, missing = discover_tables(index, facts_by_path, log)
+        if args.discover:
+            sys.exit(0)
+        tables = defined
+
+    log(f"Searching for {len(tables)} tables in migration files...")
+    records = extract_records(tables, index, log)
+    batch_of, cycles, external = None, [], {}
+    if args.order == "dependencies":
+        # The graph needs every statement, so materialise the records first
+        records, batch_of, cycles, external = order_records(list(records))
+        log(f"Ordered into {max(batch_of.values(), default=0)} dependency batches")
+
+    with open_output(output, compress) as out:
+        found_count, missing_tables = write_consolidated(
+            out, records, len(tables), batch_of, cycles, external
+        )
+
+    log("\n" + "=" * 50)
+    log("EXTRACTION COMPLETE!")
+    log("=" * 50)
+    log(f"Found: {found_count}/{len(tables)} tables")
+    log(f"Output: {'stdout' if output == '-' else output}")
 
     if missing_tables:
-        print(f"\nTables not found ({len(missing_tables)}):")
+        log(f"\nTables not found ({len(missing_tables)}):")
         for table in missing_tables:
-            print(f"  - {table}")
+            log(f"  - {table}")
+
+    if cycles:
+        log(f"\nForeign key cycles ({len(cycles)}):")
+        for cycle in cycles:
+            log(f"  - {' <-> '.join(cycle)}")
+
+    if external:
+        log(f"\nTables referencing tables outside this file ({len(external)}):")
+        for table, refs in sorted(external.items()):
+            log(f"  - {table} -> {', '.join(refs)}")
 
 if __name__ == "__main__":
     main()
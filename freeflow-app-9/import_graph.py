@@ -0,0 +1,275 @@
+#!/usr/bin/env python3
+"""
+Import graph and bundle weight of the app's routes.
+
+The import specifiers of every file under app/, components/, lib/ and hooks/
+come from the incremental source index (source_index.py), so only files that
+changed since the last run are read. `@/` aliases (tsconfig's "@/*" -> "./*")
+and relative specifiers are resolved to files the way the bundler does, and
+each page route is weighed by the source it pulls in statically: its
+page.tsx, the layouts above it and everything those import, transitively.
+Type-only imports are erased at build time and dynamic import()s become
+separate chunks, so neither counts.
+
+A page is flagged when it imports a heavy module at top level (from the
+page.tsx or the files next to it, like its *-client.tsx): a package known to
+be large, or a shared module whose own graph exceeds --heavy-kb. Those are
+candidates for next/dynamic.
+
+    python3 import_graph.py                          # heaviest routes and flagged pages
+    python3 import_graph.py --route /dashboard       # what one route pulls in
+    python3 import_graph.py --json import_graph.json
+"""
+
+import os
+import sys
+import json
+import time
+import argparse
+from collections import namedtuple
+
+from migration_index import ROOT_DIR
+from source_index import CACHE_FILE as SOURCE_CACHE_FILE, SOURCE_EXTENSIONS, page_routes, scan_tree
+
+GRAPH_DIRS = ("app", "components", "lib", "hooks")
+LAYOUT_FILES = tuple("layout" + ext for ext in SOURCE_EXTENSIONS)
+
+# Packages that add tens to hundreds of KB to a client bundle
+HEAVY_PACKAGES = {
+    "framer-motion", "recharts", "chart.js", "react-chartjs-2", "d3", "three", "@react-three/fiber",
+    "@react-three/drei", "prismjs", "react-syntax-highlighter", "highlight.js", "monaco-editor",
+    "@monaco-editor/react", "jspdf", "jspdf-autotable", "pdf-lib", "pdfjs-dist", "exceljs", "xlsx",
+    "@tiptap/react", "@tiptap/starter-kit", "yjs", "mapbox-gl", "leaflet", "react-leaflet",
+    "canvas-confetti", "lottie-react", "react-player", "@fullcalendar/react",
+}
+HEAVY_LOCAL_KB = 150
+
+# `edges` are the static local imports of each file, `lazy` its dynamic
+# import()s and `packages` the static package imports; `sizes` has the
+# size of every local file in the graph, assets (CSS, JSON) included
+ImportGraph = namedtuple("ImportGraph", ["sizes", "edges", "lazy", "packages", "unresolved"])
+
+# `heavy` holds (specifier, reason) pairs for the page's heavy top-level imports
+RouteWeight = namedtuple("RouteWeight", ["route", "path", "size", "files", "packages", "heavy"])
+
+
+def package_name(spec):
+    """"@scope/pkg/sub" -> "@scope/pkg", "pkg/sub" -> "pkg"."""
+    parts = spec.split("/")
+    return "/".join(parts[:2]) if spec.startswith("@") else parts[0]
+
+
+def is_local(spec):
+    return spec.startswith(("@/", "./", "../")) or spec in (".", "..")
+
+
+def resolve_import(spec, importer, files, root=ROOT_DIR):
+    """The file a local specifier names, or None.
+
+    Tries the path as written, with each source extension, then as a
+    directory's index file. Files outside the indexed directories (types/,
+    stylesheets, JSON) are looked up on disk and count as leaves.
+    """
+    if spec.startswith("@/"):
+        base = os.path.join(root, spec[2:])
+    else:
+        base = os.path.join(os.path.dirname(importer), spec)
+    base = os.path.normpath(base.split("?")[0])
+    if base in files:
+        return base
+    for ext in SOURCE_EXTENSIONS:
+        if base + ext in files:
+            return base + ext
+    for ext in SOURCE_EXTENSIONS:
+        index = os.path.join(base, "index" + ext)
+        if index in files:
+            return index
+    for candidate in (base, *(base + ext for ext in SOURCE_EXTENSIONS)):
+        if os.path.isfile(candidate):
+            return candidate
+    return None
+
+
+def build_graph(facts_by_path, root=ROOT_DIR):
+    """Resolve the imports of every indexed file into an ImportGraph."""
+    files = set(facts_by_path)
+    sizes = {}
+    edges, lazy, packages = {}, {}, {}
+    unresolved = []
+    resolved = {}
+    for path, facts in facts_by_path.items():
+        edges[path], lazy[path], packages[path] = [], [], []
+        directory = os.path.dirname(path)
+        for spec, kind in facts["imports"]:
+            if kind == "type":
+                continue
+            if not is_local(spec):
+                (lazy if kind == "dynamic" else packages)[path].append(package_name(spec))
+                continue
+            # "@/" specifiers resolve the same from everywhere
+            key = ("", spec) if spec.startswith("@/") else (directory, spec)
+            if key not in resolved:
+                resolved[key] = resolve_import(spec, path, files, root)
+            target = resolved[key]
+            if target is None:
+                unresolved.append((path, spec))
+            elif kind == "dynamic":
+                lazy[path].append(target)
+            else:
+                edges[path].append(target)
+                if target not in sizes and target not in files:
+                    sizes[target] = os.path.getsize(target)
+    for path in files:
+        sizes[path] = os.path.getsize(path)
+    return ImportGraph(sizes, edges, lazy, packages, unresolved)
+
+
+def reachable(graph, roots):
+    """Every local file `roots` import statically, transitively, the roots included."""
+    seen = set(roots)
+    stack = list(roots)
+    while stack:
+        for target in graph.edges.get(stack.pop(), ()):
+            if target not in seen:
+                seen.add(target)
+                stack.append(target)
+    return seen
+
+
+def route_roots(page, files, root=ROOT_DIR):
+    """A page and the layouts wrapping it, outermost first."""
+    app_dir = os.path.join(root, "app")
+    layouts = []
+    directory = os.path.dirname(page)
+    while True:
+        layouts.extend(os.path.join(directory, name) for name in LAYOUT_FILES
+                       if os.path.join(directory, name) in files)
+        if directory == app_dir or not directory.startswith(app_dir):
+            break
+        directory = os.path.dirname(directory)
+    return layouts[::-1] + [page]
+
+
+def route_entry(graph, page):
+    """The page and the files next to it that it imports, e.g. its *-client.tsx.
+
+    Their imports are the page's top level: a module imported there is in
+    the route's first chunk unless it is loaded with next/dynamic.
+    """
+    directory = os.path.dirname(page) + os.sep
+    entry = {page}
+    stack = [page]
+    while stack:
+        for target in graph.edges[stack.pop()]:
+            if target.startswith(directory) and target not in entry and target in graph.edges:
+                entry.add(target)
+                stack.append(target)
+    return entry
+
+
+def weigh_routes(facts_by_path, graph, heavy_packages=HEAVY_PACKAGES, heavy_kb=HEAVY_LOCAL_KB):
+    """RouteWeight for every page route, heaviest first."""
+    files = set(facts_by_path)
+    subtree_sizes = {}
+
+    def subtree_size(path):
+        if path not in subtree_sizes:
+            subtree_sizes[path] = sum(graph.sizes[p] for p in reachable(graph, [path]))
+        return subtree_sizes[path]
+
+    weights = []
+    for route, page in page_routes(facts_by_path):
+        closure = reachable(graph, route_roots(page, files))
+        packages = sorted({name for path in closure for name in graph.packages.get(path, ())})
+        entry = route_entry(graph, page)
+        heavy = [(name, "package") for name in sorted(
+            {name for path in entry for name in graph.packages[path]} & heavy_packages)]
+        for target in sorted({target for path in entry for target in graph.edges[path]} - entry):
+            size = subtree_size(target)
+            if size > heavy_kb * 1024:
+                heavy.append((os.path.relpath(target, ROOT_DIR), f"{size / 1024:.0f} KB"))
+        weights.append(RouteWeight(route, page, sum(graph.sizes[p] for p in closure),
+                                   sorted(closure), packages, heavy))
+    weights.sort(key=lambda weight: (-weight.size, weight.route))
+    return weights
+
+
+def format_size(size):
+    return f"{size / 1024 / 1024:.1f} MB" if size >= 1024 * 1024 else f"{size / 1024:.0f} KB"
+
+
+def print_route(weight, graph, top):
+    print(f"📦 {weight.route}  ({os.path.relpath(weight.path, ROOT_DIR)})")
+    print(f"   {format_size(weight.size)} of source in {len(weight.files)} files")
+    print(f"\n   Largest contributors:")
+    for path in sorted(weight.files, key=lambda p: -graph.sizes[p])[:top]:
+        print(f"   {format_size(graph.sizes[path]):>9}  {os.path.relpath(path, ROOT_DIR)}")
+    print(f"\n   Packages: {', '.join(weight.packages) or '(none)'}")
+    for spec, reason in weight.heavy:
+        print(f"   ⚠️  imports {spec} at top level ({reason}); lazy-load it with next/dynamic")
+    lazy = sorted({os.path.relpath(p, ROOT_DIR) if os.path.isabs(p) else p
+                   for path in weight.files for p in graph.lazy.get(path, ())})
+    if lazy:
+        print(f"   Already lazy: {', '.join(lazy)}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Weigh each route by the source it imports, transitively")
+    parser.add_argument("--route", help="show the contributors of one route (e.g. /dashboard)")
+    parser.add_argument("--top", type=int, default=20, help="routes or contributors to print (default: 20)")
+    parser.add_argument("--heavy-kb", type=int, default=HEAVY_LOCAL_KB,
+                        help=f"flag local imports pulling in more source than this (default: {HEAVY_LOCAL_KB})")
+    parser.add_argument("--heavy-package", action="append", default=[], metavar="NAME",
+                        help="treat another package as heavy (repeatable)")
+    parser.add_argument("--json", metavar="PATH", help="write every route's weight as JSON")
+    parser.add_argument("--no-cache", action="store_true", help="re-scan every source file")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="scan changed files on N worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    stats = {}
+    facts = scan_tree(GRAPH_DIRS, None if args.no_cache else SOURCE_CACHE_FILE, args.jobs, stats, inventory=True)
+    graph = build_graph(facts)
+    weights = weigh_routes(facts, graph, HEAVY_PACKAGES | set(args.heavy_package), args.heavy_kb)
+    summary = (f"{len(weights)} routes over {stats['files']} files ({stats['scanned']} scanned, "
+               f"{len(graph.unresolved)} unresolved imports) in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([{
+                "route": weight.route,
+                "path": os.path.relpath(weight.path, ROOT_DIR),
+                "size": weight.size,
+                "files": len(weight.files),
+                "largest": [[os.path.relpath(path, ROOT_DIR), graph.sizes[path]]
+                            for path in sorted(weight.files, key=lambda p: -graph.sizes[p])[:args.top]],
+                "packages": weight.packages,
+                "heavy": [list(entry) for entry in weight.heavy],
+            } for weight in weights], f, indent=1)
+        print(f"Wrote {args.json}; {summary}")
+        return
+
+    if args.route:
+        matches = [weight for weight in weights if weight.route == args.route]
+        if not matches:
+            parser.error(f"no page serves {args.route}")
+        for weight in matches:
+            print_route(weight, graph, args.top)
+        print(f"\n{summary}")
+        return
+
+    print(f"{'source':>9} {'files':>6}  route")
+    for weight in weights[:args.top]:
+        print(f"{format_size(weight.size):>9} {len(weight.files):>6}  {weight.route}")
+    flagged = [weight for weight in weights if weight.heavy]
+    if flagged:
+        print(f"\n⚠️  {len(flagged)} pages import heavy modules at top level; the heaviest:")
+        for weight in flagged[:args.top]:
+            print(f"  {weight.route}: {', '.join(f'{spec} ({reason})' for spec, reason in weight.heavy)}")
+    print(f"\n{summary}")
+    sys.exit(1 if flagged else 0)
+
+
+if __name__ == "__main__":
+    main()
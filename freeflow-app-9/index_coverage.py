@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Index and RLS coverage analysis for the Supabase migrations.
+
+Every migration is tokenized once and its CREATE TABLE, ALTER TABLE, CREATE
+INDEX and CREATE POLICY statements are folded into one picture of the schema.
+A column is reported when something filters on it but no index leads with it:
+
+  foreign-key  the column references another table (joins, ON DELETE scans)
+  rls          a row level security policy predicate compares it
+  app-filter   a query chain in lib/ filters or sorts on it (.eq('col', ...))
+
+Findings are ranked by how often the column is hit and written out as a
+suggested migration of CREATE INDEX IF NOT EXISTS statements to review.
+
+    python3 index_coverage.py [-o supabase/suggested_indexes.sql] [--top 40] [--json PATH]
+"""
+
+import os
+import re
+import sys
+import glob
+import json
+import hashlib
+import argparse
+from collections import namedtuple
+
+from extract_tables import open_output
+from migration_index import MIGRATIONS_DIR, ROOT_DIR, parallel_map
+from source_index import CACHE_FILE as SOURCE_CACHE_FILE, referenced_filters, scan_tree
+from sql_schema import (
+    IndexDefinition, TableSchema, closing_paren, parse_alter_table, parse_create_index,
+    parse_create_policy, parse_create_table
+)
+from sql_tokenizer import iter_statements, nested_statements, open_sql, statement_kind
+
+OUTPUT_FILE = os.path.join(ROOT_DIR, "supabase", "suggested_indexes.sql")
+APP_SOURCE_DIRS = ("lib",)
+MAX_IDENTIFIER_LENGTH = 63
+
+# How much one hit of each reason adds to a column's rank
+REASON_WEIGHTS = {"rls": 3, "app-filter": 2, "foreign-key": 1}
+
+PARSERS = {
+    "CREATE TABLE": parse_create_table,
+    "ALTER TABLE": parse_alter_table,
+    "CREATE INDEX": parse_create_index,
+    "CREATE POLICY": parse_create_policy,
+}
+
+# `reasons` maps reason -> list of human-readable sources
+Finding = namedtuple("Finding", ["score", "table", "column", "reasons"])
+
+STRING_LITERAL_RE = re.compile(r"'(?:[^']|'')*'")
+SUBQUERY_RE = re.compile(r"\(\s*SELECT\b", re.IGNORECASE)
+QUALIFIED_COLUMN_RE = re.compile(r'(?:"([^"]+)"|(\w+))\s*\.\s*(?:"([^"]+)"|(\w+))')
+BARE_IDENTIFIER_RE = re.compile(r'(?<![.\w"])(?:"([^"]+)"|([A-Za-z_]\w*))(?!\s*[.(])')
+PLAIN_IDENTIFIER_RE = re.compile(r'[a-z_][a-z0-9_]*$')
+
+
+def parse_statement(buf, statement, parsed):
+    """Append what one statement defines to `parsed`, looking inside DO blocks."""
+    kind = statement_kind(buf, statement)
+    if kind == "DO":
+        for block, nested in nested_statements(buf, statement):
+            parse_statement(block, nested, parsed)
+        return
+    parser = PARSERS.get(kind)
+    if parser:
+        result = parser(buf[statement.start:statement.end].decode('utf-8', errors='replace'))
+        if result:
+            parsed.append(result)
+
+
+def parse_migration(path):
+    """Parse the schema statements of one migration in a worker process.
+
+    Returns a list of TableSchema / IndexDefinition / Policy tuples in
+    statement order; everything else in the file is skipped unread.
+    """
+    parsed = []
+    with open_sql(path) as buf:
+        for statement in iter_statements(buf):
+            parse_statement(buf, statement, parsed)
+    return parsed
+
+
+def load_schema(paths, jobs=1):
+    """Fold every migration into (tables, indexes, policies), each keyed by table.
+
+    Columns and foreign keys from repeated or altered definitions are merged.
+    Primary keys and UNIQUE constraints count as indexes.
+    """
+    tables = {}
+    indexes = {}
+    policies = {}
+    for parsed in parallel_map(parse_migration, paths, jobs):
+        for item in parsed:
+            if isinstance(item, IndexDefinition):
+                indexes.setdefault(item.table, []).append(item)
+            elif isinstance(item, TableSchema):
+                table = tables.setdefault(item.name, TableSchema(item.name, {}, [], (), []))
+                table.columns.update(item.columns)
+                table.foreign_keys.extend(fk for fk in item.foreign_keys if fk not in table.foreign_keys)
+                table.unique.extend(item.unique)
+                if item.primary_key:
+                    tables[item.name] = table = table._replace(primary_key=item.primary_key)
+            else:
+                # A policy re-created by a later migration replaces the earlier one
+                policies.setdefault(item.table, {})[item.name] = item
+
+    for name, table in tables.items():
+        keys = ([table.primary_key] if table.primary_key else []) + table.unique
+        indexes.setdefault(name, []).extend(
+            IndexDefinition(None, name, tuple(key), True, False) for key in keys
+        )
+    return tables, indexes, {table: list(named.values()) for table, named in policies.items()}
+
+
+def is_indexed(indexes, columns):
+    """True if some index leads with exactly these columns, in any order."""
+    return any(
+        len(index.columns) >= len(columns) and set(index.columns[:len(columns)]) == set(columns)
+        for index in indexes
+    )
+
+
+def predicate_columns(predicate, table):
+    """Columns of `table` a policy predicate reads, outside of subqueries.
+
+    Inside a subquery only columns qualified with the table's own name count,
+    since bare names there belong to the subquery's tables.
+    """
+    predicate = STRING_LITERAL_RE.sub("''", predicate)
+    bare_name = table.name.split(".")[-1]
+    found = set()
+    for match in QUALIFIED_COLUMN_RE.finditer(predicate):
+        if (match.group(1) or match.group(2).lower()) == bare_name:
+            found.add(match.group(3) or match.group(4).lower())
+
+    outer = []
+    pos = 0
+    for subquery in SUBQUERY_RE.finditer(predicate):
+        if subquery.start() < pos:
+            continue
+        outer.append(predicate[pos:subquery.start()])
+        close = closing_paren(predicate, subquery.start())
+        pos = len(predicate) if close is None else close + 1
+    outer.append(predicate[pos:])
+    for match in BARE_IDENTIFIER_RE.finditer(" ".join(outer)):
+        found.add(match.group(1) or match.group(2).lower())
+    return {column for column in found if column in table.columns}
+
+
+def find_unindexed(tables, indexes, policies, filters):
+    """Rank every (table, column) that is filtered on without a leading index."""
+    hits = {}
+
+    def hit(table, column, reason, source):
+        if table.name in tables and column in table.columns \
+                and not is_indexed(indexes.get(table.name, []), (column,)):
+            hits.setdefault((table.name, column), {}).setdefault(reason, []).append(source)
+
+    for table in tables.values():
+        if "." in table.name:
+            continue   # auth.*, storage.*: owned by Supabase, not by our migrations
+        for fk in table.foreign_keys:
+            if len(fk.columns) > 1:
+                if not is_indexed(indexes.get(table.name, []), fk.columns):
+                    hits.setdefault((table.name, ", ".join(fk.columns)), {}) \
+                        .setdefault("foreign-key", []).append(f"-> {fk.table}")
+                continue
+            hit(table, fk.columns[0], "foreign-key", f"-> {fk.table}")
+        for policy in policies.get(table.name, []):
+            for column in sorted(set().union(*(predicate_columns(p, table) for p in policy.predicates))):
+                if table.columns.get(column) != "boolean":
+                    hit(table, column, "rls", f'{policy.command} "{policy.name}"')
+
+    for (name, column), uses in filters.items():
+        table = tables.get(name.lower())
+        if not table or "." in table.name or table.columns.get(column) == "boolean":
+            continue
+        for path in sorted({path for path, _ in uses}):
+            methods = ",".join(sorted({method for use_path, method in uses if use_path == path}))
+            hit(table, column, "app-filter", f"{os.path.relpath(path, ROOT_DIR)} ({methods})")
+
+    findings = [
+        Finding(sum(REASON_WEIGHTS[reason] * len(sources) for reason, sources in reasons.items()),
+                table, column, reasons)
+        for (table, column), reasons in hits.items()
+    ]
+    return sorted(findings, key=lambda f: (-f.score, f.table, f.column))
+
+
+def quote(identifier):
+    """Double-quote an identifier unless it is already a plain lower-case name."""
+    return identifier if PLAIN_IDENTIFIER_RE.match(identifier) else '"' + identifier.replace('"', '""') + '"'
+
+
+def index_name(table, column):
+    """Postgres-sized name for a suggested index."""
+    return f"idx_{table}_{column.replace(', ', '_')}"[:MAX_IDENTIFIER_LENGTH]
+
+
+def index_names(findings, indexes):
+    """{(table, column): name} for the suggested indexes, none reusing an existing index's name.
+
+    With CREATE INDEX IF NOT EXISTS a suggestion named like an index on
+    another table or column would silently create nothing, so names taken
+    by the migrations, or by a higher-ranked suggestion, also after
+    truncation to 63 characters, get a short hash of the table and column.
+    """
+    taken = {index.name for table_indexes in indexes.values() for index in table_indexes if index.name}
+    names = {}
+    for finding in findings:
+        name = index_name(finding.table, finding.column)
+        if name in taken:
+            digest = hashlib.sha1(f"{finding.table}.{finding.column}".encode()).hexdigest()[:8]
+            stem, suffix, n = name, f"_{digest}", 2
+            name = stem[:MAX_IDENTIFIER_LENGTH - len(suffix)] + suffix
+            while name in taken:
+                suffix, n = f"_{digest}{n}", n + 1
+                name = stem[:MAX_IDENTIFIER_LENGTH - len(suffix)] + suffix
+        taken.add(name)
+        names[finding.table, finding.column] = name
+    return names
+
+
+def write_suggestions(out, findings, names):
+    """Write the findings as a reviewable migration of CREATE INDEX statements named by `names`."""
+    out.write("-- Suggested indexes generated by index_coverage.py\n")
+    out.write("-- Review before moving into supabase/migrations; ranked by query pressure.\n")
+    out.write("-- Run outside a transaction and add CONCURRENTLY for large live tables.\n")
+    for rank, finding in enumerate(findings, 1):
+        out.write(f"\n-- #{rank} score {finding.score}: "
+                  f"{', '.join(f'{r} x{len(s)}' for r, s in sorted(finding.reasons.items()))}\n")
+        columns = ", ".join(quote(column) for column in finding.column.split(", "))
+        out.write(f"CREATE INDEX IF NOT EXISTS {quote(names[finding.table, finding.column])} "
+                  f"ON public.{quote(finding.table)} ({columns});\n")
+
+
+def report(findings, top, stats):
+    print("=" * 60)
+    print("INDEX AND RLS COVERAGE")
+    print("=" * 60)
+    print(f"Tables: {stats['tables']}  Indexes: {stats['indexes']}  Policies: {stats['policies']}")
+    print(f"App filter columns scanned: {stats['filters']}")
+    print()
+    for reason in REASON_WEIGHTS:
+        count = sum(1 for finding in findings if reason in finding.reasons)
+        print(f"⚠️  {reason}: {count} unindexed columns")
+    print()
+    if not findings:
+        print("✅ Every filtered column is covered by an index!")
+        return
+
+    print(f"{'Rank':>4}  {'Score':>5}  Column")
+    for rank, finding in enumerate(findings[:top], 1):
+        print(f"{rank:>4}  {finding.score:>5}  {finding.table}.{finding.column}")
+        for reason, sources in sorted(finding.reasons.items()):
+            more = f" (+{len(sources) - 3} more)" if len(sources) > 3 else ""
+            print(f"{'':>13}{reason}: {'; '.join(sources[:3])}{more}")
+    if len(findings) > top:
+        print(f"  ... and {len(findings) - top} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Find foreign keys, RLS predicates and app filters without an index")
+    parser.add_argument("-o", "--output", default=OUTPUT_FILE,
+                        help="suggested migration to write, or - for stdout (default: supabase/suggested_indexes.sql)")
+    parser.add_argument("--top", type=int, default=40, help="findings to print (default: 40)")
+    parser.add_argument("--json", metavar="PATH", help="also write the findings as JSON")
+    parser.add_argument("--source-dirs", nargs="+", default=list(APP_SOURCE_DIRS),
+                        help="app directories whose .eq()/.order() filters count (default: lib)")
+    parser.add_argument("--no-cache", action="store_true", help="re-scan every source file")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="parse on N worker processes (default: one per CPU)")
+    args = parser.parse_args()
+
+    paths = sorted(glob.glob(os.path.join(MIGRATIONS_DIR, "*.sql")))
+    tables, indexes, policies = load_schema(paths, args.jobs)
+    filters = referenced_filters(scan_tree(
+        args.source_dirs, None if args.no_cache else SOURCE_CACHE_FILE, args.jobs
+    ))
+    findings = find_unindexed(tables, indexes, policies, filters)
+
+    if args.output != "-":
+        report(findings, args.top, {
+            "tables": len(tables),
+            "indexes": sum(len(i) for i in indexes.values()),
+            "policies": sum(len(p) for p in policies.values()),
+            "filters": len(filters),
+        })
+    with open_output(args.output) as out:
+        write_suggestions(out, findings, index_names(findings, indexes))
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump([finding._asdict() for finding in findings], f, indent=2)
+    if args.output != "-":
+        print(f"\nSuggested migration: {args.output} ({len(findings)} indexes)")
+    sys.exit(1 if findings else 0)
+
+
+if __name__ == "__main__":
+    main()
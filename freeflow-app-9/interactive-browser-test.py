@@ -2,13 +2,18 @@
 """
 Interactive Browser Test for KAZI Platform
 Tests all dashboard features and generates screenshots
+
+Pages are waited for with browser_pool.wait_for_ready() rather than fixed
+sleeps; pass --slow-mo to slow the browser down for watching.
+
+    python3 interactive-browser-test.py [--slow-mo 1000] [--keep-open 0]
 """
 
 import asyncio
+import argparse
 from playwright.async_api import async_playwright
-import time
 
-BASE_URL = "http://localhost:9323"
+from browser_pool import BASE_URL, READINESS_SCRIPT, VIEWPORT, goto_ready
 
 async def test_page_with_screenshot(page, url, name, check_text=None):
     """Test a page and take screenshot"""
@@ -18,11 +23,8 @@ async def test_page_with_screenshot(page, url, name, check_text=None):
     print(f"{'='*60}")
 
     try:
-        # Navigate with longer timeout
-        await page.goto(url, wait_until='networkidle', timeout=60000)
-
-        # Wait for page to stabilize
-        await page.wait_for_timeout(2000)
+        # Navigate with longer timeout; a page that never gets ready fails
+        await goto_ready(page, url, timeout=60000, required=True)
 
         # Check for specific text if provided
         if check_text:
@@ -67,8 +69,7 @@ async def test_ai_models(page):
     print(f"{'='*60}")
 
     try:
-        await page.goto(f"{BASE_URL}/dashboard/ai-create", wait_until='networkidle', timeout=60000)
-        await page.wait_for_timeout(3000)
+        await goto_ready(page, f"{BASE_URL}/dashboard/ai-create", timeout=60000, required=True)
 
         # Get page content
         content = await page.content()
@@ -120,8 +121,7 @@ async def test_ups_system(page):
     print(f"{'='*60}")
 
     try:
-        await page.goto(f"{BASE_URL}/dashboard/collaboration", wait_until='networkidle', timeout=60000)
-        await page.wait_for_timeout(3000)
+        await goto_ready(page, f"{BASE_URL}/dashboard/collaboration", timeout=60000, required=True)
 
         content = await page.content()
 
@@ -155,8 +155,7 @@ async def test_dashboard_animations(page):
     print(f"{'='*60}")
 
     try:
-        await page.goto(f"{BASE_URL}/dashboard", wait_until='networkidle', timeout=60000)
-        await page.wait_for_timeout(3000)
+        await goto_ready(page, f"{BASE_URL}/dashboard", timeout=60000, required=True)
 
         content = await page.content()
 
@@ -184,7 +183,7 @@ async def test_dashboard_animations(page):
         print(f"Error: {str(e)}")
         return False
 
-async def main():
+async def main(args):
     print("""
 ╔════════════════════════════════════════════════════════════╗
 ║     KAZI Platform - Interactive Browser Testing            ║
@@ -194,8 +193,9 @@ async def main():
 
     async with async_playwright() as p:
         # Launch browser with headed mode
-        browser = await p.chromium.launch(headless=False, slow_mo=1000)
-        context = await browser.new_context(viewport={'width': 1920, 'height': 1080})
+        browser = await p.chromium.launch(headless=False, slow_mo=args.slow_mo)
+        context = await browser.new_context(viewport=VIEWPORT)
+        await context.add_init_script(READINESS_SCRIPT)
         page = await context.new_page()
 
         results = {}
@@ -266,15 +266,21 @@ async def main():
         print(f"{'='*60}")
 
         # Keep browser open for manual inspection
-        print("\n🔍 Browser will remain open for manual inspection...")
-        print("Press Ctrl+C to close and exit.")
+        if args.keep_open:
+            print("\n🔍 Browser will remain open for manual inspection...")
+            print("Press Ctrl+C to close and exit.")
 
-        try:
-            await asyncio.sleep(300)  # Keep open for 5 minutes
-        except KeyboardInterrupt:
-            print("\n👋 Closing browser...")
+            try:
+                await asyncio.sleep(args.keep_open)
+            except KeyboardInterrupt:
+                print("\n👋 Closing browser...")
 
         await browser.close()
 
 if __name__ == "__main__":
-    asyncio.run(main())
+    parser = argparse.ArgumentParser(description="Interactive KAZI platform browser test with screenshots")
+    parser.add_argument("--slow-mo", type=int, default=0, metavar="MS",
+                        help="delay every browser action by MS milliseconds, for watching (default: 0)")
+    parser.add_argument("--keep-open", type=int, default=300, metavar="SECONDS",
+                        help="keep the browser open for manual inspection afterwards (default: 300, 0 to exit)")
+    asyncio.run(main(parser.parse_args()))
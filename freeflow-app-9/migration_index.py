@@ -0,0 +1,224 @@
+#!/usr/bin/env python3
+"""
+Index of CREATE TABLE statements across the Supabase migrations.
+
+The index is built in a single pass over the migrations directory and maps
+every table name to each place that creates it, so table lookups are
+dictionary hits instead of a re-scan of every migration file.
+
+Parsed spans are persisted in a SQLite cache under supabase/.cache, keyed by
+path, size, mtime and content hash, so re-runs only re-parse the migrations
+that changed since the last run. Files that do need parsing can be spread
+across a process pool; workers return compact per-file summaries.
+"""
+
+import os
+import re
+import glob
+import hashlib
+import sqlite3
+from collections import namedtuple
+from concurrent.futures import ProcessPoolExecutor
+
+from sql_tokenizer import iter_statements, open_sql
+
+ROOT_DIR = os.path.dirname(os.path.abspath(__file__))
+MIGRATIONS_DIR = os.path.join(ROOT_DIR, "supabase", "migrations")
+CACHE_FILE = os.path.join(ROOT_DIR, "supabase", ".cache", "migration_index.sqlite")
+
+# Bump whenever scan_content() output changes so stale caches are discarded
+INDEX_VERSION = "2"
+
+# A single CREATE TABLE statement: `start`/`end` are byte offsets into `path`
+# covering the statement up to and including its terminating semicolon.
+TableDefinition = namedtuple("TableDefinition", ["table", "path", "start", "end", "line"])
+
+CREATE_TABLE_RE = re.compile(
+    rb'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?'
+    rb'(?:"?(\w+)"?\.)?"?(\w+)"?\s*\(',
+    re.IGNORECASE
+)
+
+# Leading YYYYMMDD[hhmmss] of a migration file name
+MIGRATION_TIMESTAMP_RE = re.compile(r'(\d{8,14})_')
+
+
+def table_key(schema, name):
+    """Normalise a (schema, name) pair to the key used by the index."""
+    name = name.lower()
+    if schema and schema.lower() != "public":
+        return f"{schema.lower()}.{name}"
+    return name
+
+
+def scan_content(path, content):
+    """Return the TableDefinitions created by the bytes of one migration file."""
+    definitions = []
+    for statement in iter_statements(content):
+        if not statement.terminated:
+            continue
+        match = CREATE_TABLE_RE.match(content, statement.start)
+        if not match:
+            continue
+        definitions.append(TableDefinition(
+            table_key(match.group(1) and match.group(1).decode(), match.group(2).decode()),
+            path, statement.start, statement.end, statement.line
+        ))
+    return definitions
+
+
+def scan_file(path):
+    """Return the TableDefinitions created by one migration file."""
+    with open_sql(path) as buf:
+        return scan_content(path, buf)
+
+
+def open_cache(cache_file=CACHE_FILE):
+    """Open the on-disk index cache, discarding it if it was written by another version."""
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    conn = sqlite3.connect(cache_file)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if not row or row[0] != INDEX_VERSION:
+        conn.executescript("""
+            DROP TABLE IF EXISTS files;
+            DROP TABLE IF EXISTS definitions;
+            CREATE TABLE files (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT
+            );
+            CREATE TABLE definitions (
+                path TEXT, table_name TEXT, start INTEGER, end INTEGER, line INTEGER
+            );
+            CREATE INDEX definitions_path ON definitions (path);
+        """)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (INDEX_VERSION,))
+        conn.commit()
+    return conn
+
+
+def summarize_file(task):
+    """Hash and parse one migration in a worker process.
+
+    `task` is (path, known_sha256). Returns a compact, picklable summary
+    (size, mtime_ns, sha256, rows) where rows are (table, start, end, line)
+    tuples, or None when the content still matches `known_sha256`.
+    """
+    path, known_sha256 = task
+    st = os.stat(path)
+    with open_sql(path) as buf:
+        sha256 = hashlib.sha256(buf).hexdigest()
+        if sha256 == known_sha256:
+            return st.st_size, st.st_mtime_ns, sha256, None
+        rows = [(d.table, d.start, d.end, d.line) for d in scan_content(path, buf)]
+    return st.st_size, st.st_mtime_ns, sha256, rows
+
+
+def parallel_map(func, items, jobs=1):
+    """Map `func` over `items` on up to `jobs` processes, preserving input order."""
+    items = list(items)
+    if jobs == 0:
+        jobs = os.cpu_count() or 1
+    if jobs <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+    chunksize = max(1, len(items) // (jobs * 4))
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(func, items, chunksize=chunksize))
+
+
+def cached_rows(conn, path):
+    return conn.execute(
+        "SELECT table_name, start, end, line FROM definitions "
+        "WHERE path = ? ORDER BY start", (path,)
+    ).fetchall()
+
+
+def build_index(migrations_dir=MIGRATIONS_DIR, exclude=(), cache_file=CACHE_FILE,
+                stats=None, jobs=1):
+    """Scan every migration once and map table name -> [TableDefinition, ...].
+
+    With a `cache_file`, unchanged migrations are served from the cache. Files
+    that need hashing or parsing are spread over `jobs` worker processes
+    (0 = one per CPU); the result is identical to a serial run. When a
+    `stats` dict is given it is filled with the number of files seen and parsed.
+    """
+    exclude = {os.path.abspath(path) for path in exclude}
+    paths = [
+        path for path in sorted(glob.glob(os.path.join(migrations_dir, "*.sql")))
+        if os.path.abspath(path) not in exclude
+    ]
+    if stats is None:
+        stats = {}
+    stats.update(files=len(paths), parsed=0)
+
+    conn = open_cache(cache_file) if cache_file else None
+    try:
+        rows_by_path = {}
+        tasks = []
+        for path in paths:
+            row = conn and conn.execute(
+                "SELECT size, mtime_ns, sha256 FROM files WHERE path = ?", (path,)
+            ).fetchone()
+            st = os.stat(path)
+            if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                rows_by_path[path] = cached_rows(conn, path)
+            else:
+                tasks.append((path, row[2] if row else None))
+
+        for (path, _), (size, mtime_ns, sha256, rows) in zip(
+                tasks, parallel_map(summarize_file, tasks, jobs)):
+            if rows is None:
+                # Touched but unchanged: keep the parse, refresh the stat key
+                rows = cached_rows(conn, path)
+            else:
+                stats["parsed"] += 1
+                if conn:
+                    conn.execute("DELETE FROM definitions WHERE path = ?", (path,))
+                    conn.executemany(
+                        "INSERT INTO definitions VALUES (?, ?, ?, ?, ?)",
+                        [(path,) + row for row in rows]
+                    )
+            if conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?)",
+                    (path, size, mtime_ns, sha256)
+                )
+            rows_by_path[path] = rows
+
+        if conn:
+            placeholders = ",".join("?" * len(paths))
+            # Forget migrations that were deleted or renamed since the last run
+            conn.execute(f"DELETE FROM files WHERE path NOT IN ({placeholders})", paths)
+            conn.execute(f"DELETE FROM definitions WHERE path NOT IN ({placeholders})", paths)
+            conn.commit()
+    finally:
+        if conn:
+            conn.close()
+
+    index = {}
+    for path in paths:
+        for table, start, end, line in rows_by_path[path]:
+            index.setdefault(table, []).append(TableDefinition(table, path, start, end, line))
+    return index
+
+
+def migration_timestamp(path):
+    """Timestamp prefix of a migration file padded to 14 digits, or '' if undated."""
+    match = MIGRATION_TIMESTAMP_RE.match(os.path.basename(path))
+    return match.group(1).ljust(14, "0") if match else ""
+
+
+def definition_order(definition):
+    """Sort key placing definitions oldest first: undated files sort before dated ones."""
+    return migration_timestamp(definition.path), os.path.basename(definition.path), definition.start
+
+
+def latest_definition(definitions):
+    """The most recent of several definitions of the same table."""
+    return max(definitions, key=definition_order)
+
+
+def read_statement(definition):
+    """Read just the statement text for a definition from its migration file."""
+    with open(definition.path, 'rb') as f:
+        f.seek(definition.start)
+        return f.read(definition.end - definition.start).decode('utf-8')
@@ -0,0 +1,209 @@
+#!/usr/bin/env python3
+"""
+Performance budgets and regression gating for the per-route metrics.
+
+perf-budgets.json sets limits per route glob (fnmatch, so `*` also matches
+`/`); the first glob matching a route applies:
+
+    {
+      "tolerance": 0.15,
+      "budgets": [
+        {"route": "/dashboard/*", "lcp_ms": 4000, "js_bytes": 3000000, "requests": 150, "heap_bytes": 200000000},
+        {"route": "*", "lcp_ms": 3000}
+      ]
+    }
+
+A run's rows (route_metrics.py) are reduced to the median and p95 of every
+metric per route, so --samples N damps noise. A route fails when its median
+exceeds its budget, or when it regressed against the baseline, the medians
+of the last green run: more than `tolerance` above it and by more than the
+metric's MIN_DELTAS, so a 3 ms wobble on a 20 ms paint is no regression.
+Green runs refresh the baseline for the routes they measured. It lives in
+perf-baseline.json next to the budgets and is committed, so a fresh checkout
+(e.g. CI) gates against it too; commit it after a green run that should
+become the new reference. Routes without a baseline are only held to their
+budgets, and the gate says so.
+
+    python3 route_budgets.py test-results/metrics/run-*-shard*.json   # gate saved runs, e.g. all shards
+"""
+
+import os
+import sys
+import json
+import math
+import time
+import argparse
+import statistics
+from fnmatch import fnmatchcase
+from collections import namedtuple
+
+from migration_index import ROOT_DIR
+from route_metrics import METRIC_FIELDS
+
+BUDGET_FILE = os.path.join(ROOT_DIR, "perf-budgets.json")
+BASELINE_FILE = os.path.join(ROOT_DIR, "perf-baseline.json")
+DEFAULT_TOLERANCE = 0.15
+
+# Metrics compared against the baseline, and the smallest change that counts
+MIN_DELTAS = {
+    "lcp_ms": 100,
+    "ready_ms": 100,
+    "fcp_ms": 100,
+    "total_blocking_ms": 50,
+    "cls": 0.02,
+    "js_bytes": 10 * 1024,
+    "requests": 3,
+    "heap_bytes": 5 * 1024 * 1024,
+}
+
+# `kind` is "budget" or "regression"; `limit` is the budget or the baseline
+# median plus tolerance that `median` went over
+Finding = namedtuple("Finding", ["route", "metric", "kind", "baseline", "median", "p95", "limit"])
+
+
+def load_budgets(path=BUDGET_FILE):
+    """(tolerance, [(route glob, {metric: limit}), ...]); no budgets when the file is missing."""
+    if not os.path.exists(path):
+        return DEFAULT_TOLERANCE, []
+    with open(path, encoding='utf-8') as f:
+        config = json.load(f)
+    budgets = [
+        (entry["route"], {metric: limit for metric, limit in entry.items() if metric != "route"})
+        for entry in config.get("budgets", [])
+    ]
+    return config.get("tolerance", DEFAULT_TOLERANCE), budgets
+
+
+def budget_for(route, budgets):
+    """The limits of the first glob matching `route`, or {}."""
+    for pattern, limits in budgets:
+        if fnmatchcase(route, pattern):
+            return limits
+    return {}
+
+
+def percentile(values, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(values)
+    return ordered[max(0, math.ceil(fraction * len(ordered)) - 1)]
+
+
+def summarize(rows):
+    """{route: {metric: (median, p95, samples)}} over the measured METRIC_FIELDS of the rows."""
+    samples = {}
+    for row in rows:
+        if not row.get("route"):
+            continue
+        metrics = samples.setdefault(row["route"], {})
+        for metric in METRIC_FIELDS:
+            if row.get(metric) is not None:
+                metrics.setdefault(metric, []).append(row[metric])
+    return {
+        route: {metric: (statistics.median(values), percentile(values, 0.95), len(values))
+                for metric, values in metrics.items()}
+        for route, metrics in samples.items()
+    }
+
+
+def load_baseline(path=BASELINE_FILE):
+    """{route: {metric: median}} from the last green run, or {}."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f).get("routes", {})
+
+
+def update_baseline(summary, path=BASELINE_FILE):
+    """Store this run's medians as the baseline of the routes it measured, keeping the others."""
+    routes = load_baseline(path)
+    for route, metrics in summary.items():
+        routes[route] = {metric: stats[0] for metric, stats in metrics.items()}
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = path + ".tmp"
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        json.dump({"updated": time.strftime("%Y-%m-%dT%H:%M:%S"), "routes": routes}, f, indent=1, sort_keys=True)
+    os.replace(tmp_path, path)
+
+
+def check_budgets(summary, budgets, baseline, tolerance=DEFAULT_TOLERANCE):
+    """Findings for every route over budget or regressed against `baseline`, sorted by route."""
+    findings = []
+    for route in sorted(summary):
+        metrics = summary[route]
+        before = baseline.get(route, {})
+        for metric, limit in sorted(budget_for(route, budgets).items()):
+            if metric in metrics and metrics[metric][0] > limit:
+                median, p95, _ = metrics[metric]
+                findings.append(Finding(route, metric, "budget", before.get(metric), median, p95, limit))
+        for metric, min_delta in MIN_DELTAS.items():
+            if metric not in metrics or before.get(metric) is None:
+                continue
+            median, p95, _ = metrics[metric]
+            limit = before[metric] * (1 + tolerance)
+            if median > limit and median - before[metric] > min_delta:
+                findings.append(Finding(route, metric, "regression", before[metric], median, p95, limit))
+    return findings
+
+
+def print_baseline_gaps(summary, baseline, path=BASELINE_FILE):
+    """Warn about measured routes the baseline has no medians for; only their budgets are checked."""
+    missing = [route for route in summary if route not in baseline]
+    if not baseline:
+        print(f"\n⚠️  No baseline in {os.path.relpath(path, ROOT_DIR)}: regressions are not checked, only budgets")
+    elif missing:
+        print(f"\n⚠️  {len(missing)} routes have no baseline yet: only their budgets are checked")
+
+
+def format_value(metric, value):
+    if value is None:
+        return "-"
+    if metric.endswith("_bytes"):
+        return f"{value / 1024:.0f}KB"
+    if metric.endswith("_ms"):
+        return f"{value:.0f}ms"
+    return f"{value:.3g}"
+
+
+def print_findings(findings, samples=None):
+    """The diff table of budget overruns and regressions."""
+    if not findings:
+        print("\n✅ Every measured route is within budget and no worse than the baseline")
+        return
+    print(f"\n❌ {len(findings)} performance findings" + (f" (median/p95 of {samples} samples)" if samples and samples > 1 else "") + ":")
+    print(f"   {'kind':<10} {'metric':<18} {'baseline':>9} {'median':>9} {'p95':>9} {'limit':>9} {'change':>7}  route")
+    for finding in findings:
+        change = (f"{(finding.median / finding.baseline - 1) * 100:+.0f}%"
+                  if finding.baseline else "-")
+        print(f"   {finding.kind:<10} {finding.metric:<18} {format_value(finding.metric, finding.baseline):>9} "
+              f"{format_value(finding.metric, finding.median):>9} {format_value(finding.metric, finding.p95):>9} "
+              f"{format_value(finding.metric, finding.limit):>9} {change:>7}  {finding.route}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gate saved metrics runs on budgets and the stored baseline")
+    parser.add_argument("runs", nargs="+", help="run JSON files written by route_metrics.write_run()")
+    parser.add_argument("--budgets", default=BUDGET_FILE, help="budget file (default: perf-budgets.json)")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="baseline file (default: perf-baseline.json)")
+    parser.add_argument("--update-baseline", action="store_true", help="store these runs as the baseline if green")
+    args = parser.parse_args()
+
+    rows = []
+    for path in args.runs:
+        with open(path, encoding='utf-8') as f:
+            rows.extend(row for row in json.load(f)["routes"] if row.get("ok"))
+    tolerance, budgets = load_budgets(args.budgets)
+    summary = summarize(rows)
+    baseline = load_baseline(args.baseline)
+    findings = check_budgets(summary, budgets, baseline, tolerance)
+    print(f"📊 {len(summary)} routes from {len(args.runs)} runs, tolerance {tolerance:.0%}")
+    print_baseline_gaps(summary, baseline, args.baseline)
+    print_findings(findings)
+    if not findings and args.update_baseline:
+        update_baseline(summary, args.baseline)
+        print(f"📌 Baseline updated: {args.baseline}")
+    sys.exit(1 if findings else 0)
+
+
+if __name__ == "__main__":
+    main()
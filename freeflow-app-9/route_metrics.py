@@ -0,0 +1,167 @@
+#!/usr/bin/env python3
+"""
+Per-route performance metrics for the Playwright smoke tests.
+
+measure(page, run) wraps one browser check: before the check navigates it
+installs PerformanceObservers for Largest Contentful Paint, layout shifts
+and long tasks (buffered, so nothing before the observers is lost) and opens
+a CDP session; once the check is done it reads navigation and paint timing,
+resource sizes, performance.memory and the CDP Performance.getMetrics
+counters into one flat row of METRIC_FIELDS.
+
+Rows for a run are written as JSON and CSV under test-results/metrics/, one
+pair per run, so runs can be compared over time:
+
+    test-results/metrics/run-20261017-142501.json
+    test-results/metrics/run-20261017-142501.csv
+
+Routes are measured while the pool loads others in parallel, i.e. under the
+load --concurrency puts on the app, not in isolation.
+"""
+
+import os
+import csv
+import json
+import time
+from urllib.parse import urlsplit
+
+from migration_index import ROOT_DIR
+
+METRICS_DIR = os.path.join(ROOT_DIR, "test-results", "metrics")
+
+# Timings in ms from the start of navigation, sizes in bytes; ready_ms is
+# when browser_pool.wait_for_ready() first saw the page ready
+METRIC_FIELDS = [
+    "ttfb_ms", "dom_content_loaded_ms", "load_ms", "ready_ms", "fp_ms", "fcp_ms", "lcp_ms", "cls",
+    "long_tasks", "long_task_ms", "total_blocking_ms",
+    "requests", "transfer_bytes", "js_bytes", "heap_bytes",
+    "cdp_heap_bytes", "dom_nodes", "script_ms", "task_ms", "layout_count",
+]
+ROW_FIELDS = ["check", "route", "sample", "ok", "seconds"] + METRIC_FIELDS
+
+# CDP Performance.getMetrics counters: name -> (field, scale)
+CDP_METRICS = {
+    "JSHeapUsedSize": ("cdp_heap_bytes", 1),
+    "Nodes": ("dom_nodes", 1),
+    "ScriptDuration": ("script_ms", 1000),
+    "TaskDuration": ("task_ms", 1000),
+    "LayoutCount": ("layout_count", 1),
+}
+
+# Installed before any page script runs
+OBSERVER_SCRIPT = """
+(() => {
+  const metrics = window.__routeMetrics = {lcp: null, cls: 0, longTasks: 0, longTaskMs: 0, blockingMs: 0};
+  const observe = (type, callback) => {
+    try {
+      new PerformanceObserver(list => list.getEntries().forEach(callback)).observe({type, buffered: true});
+    } catch (e) {}
+  };
+  observe('largest-contentful-paint', entry => { metrics.lcp = entry.startTime; });
+  observe('layout-shift', entry => { if (!entry.hadRecentInput) metrics.cls += entry.value; });
+  observe('longtask', entry => {
+    metrics.longTasks += 1;
+    metrics.longTaskMs += entry.duration;
+    metrics.blockingMs += Math.max(0, entry.duration - 50);
+  });
+})();
+"""
+
+READ_SCRIPT = """
+() => {
+  const observed = window.__routeMetrics || {};
+  const nav = performance.getEntriesByType('navigation')[0];
+  const paint = name => {
+    const entry = performance.getEntriesByName(name)[0];
+    return entry ? entry.startTime : null;
+  };
+  const resources = performance.getEntriesByType('resource');
+  const isScript = entry => entry.initiatorType === 'script' || /\\.m?js(\\?|$)/.test(entry.name);
+  const sum = (entries, field) => entries.reduce((total, entry) => total + (entry[field] || 0), 0);
+  return {
+    ttfb_ms: nav ? nav.responseStart : null,
+    dom_content_loaded_ms: nav ? nav.domContentLoadedEventEnd : null,
+    load_ms: nav && nav.loadEventEnd ? nav.loadEventEnd : null,
+    ready_ms: window.__pageReadiness ? window.__pageReadiness.readyAt : null,
+    fp_ms: paint('first-paint'),
+    fcp_ms: paint('first-contentful-paint'),
+    lcp_ms: observed.lcp ?? null,
+    cls: observed.cls ?? null,
+    long_tasks: observed.longTasks ?? null,
+    long_task_ms: observed.longTaskMs ?? null,
+    total_blocking_ms: observed.blockingMs ?? null,
+    requests: resources.length + (nav ? 1 : 0),
+    transfer_bytes: sum(resources, 'transferSize') + (nav ? nav.transferSize : 0),
+    js_bytes: sum(resources.filter(isScript), 'transferSize'),
+    heap_bytes: performance.memory ? performance.memory.usedJSHeapSize : null,
+  };
+}
+"""
+
+
+async def measure(page, run):
+    """Await `run(page)` with metrics capture around it; returns (run's value, metrics row dict).
+
+    CDP counters are left None on browsers without CDP (Firefox, WebKit).
+    """
+    await page.add_init_script(OBSERVER_SCRIPT)
+    try:
+        cdp = await page.context.new_cdp_session(page)
+        await cdp.send("Performance.enable")
+    except Exception:
+        cdp = None
+    value = await run(page)
+
+    metrics = dict.fromkeys(METRIC_FIELDS)
+    metrics.update(await page.evaluate(READ_SCRIPT))
+    if cdp:
+        for entry in (await cdp.send("Performance.getMetrics"))["metrics"]:
+            if entry["name"] in CDP_METRICS:
+                field, scale = CDP_METRICS[entry["name"]]
+                metrics[field] = entry["value"] * scale
+        await cdp.detach()
+    for field, number in metrics.items():
+        if isinstance(number, float):
+            metrics[field] = round(number, 4 if field == "cls" else 1)
+    metrics["route"] = urlsplit(page.url).path or "/"
+    return value, metrics
+
+
+def write_run(rows, meta, out_dir=METRICS_DIR):
+    """Write one run's rows as run-<timestamp>[-shard<i>of<N>].json and .csv; returns the JSON path."""
+    os.makedirs(out_dir, exist_ok=True)
+    stem = os.path.join(out_dir, time.strftime("run-%Y%m%d-%H%M%S"))
+    if meta.get("shard"):
+        stem += "-shard" + meta["shard"].replace("/", "of")
+    with open(stem + ".json", 'w', encoding='utf-8') as f:
+        json.dump(dict(meta, routes=rows), f, indent=1)
+    with open(stem + ".csv", 'w', encoding='utf-8', newline='') as f:
+        writer = csv.DictWriter(f, ROW_FIELDS, extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+    return stem + ".json"
+
+
+def print_slowest(rows, field="lcp_ms", top=10):
+    """The `top` routes by `field`, each with its slowest sample."""
+    slowest = {}
+    for row in rows:
+        if row.get(field) is not None and (row["route"] not in slowest or row[field] > slowest[row["route"]][field]):
+            slowest[row["route"]] = row
+    measured = sorted(slowest.values(), key=lambda row: -row[field])
+    if not measured:
+        return
+    print(f"\n🐢 Slowest routes by {field}:")
+    print(f"   {'lcp':>8} {'fcp':>8} {'ttfb':>7} {'cls':>6} {'tbt':>6} {'js':>8} {'heap':>8}  route")
+    for row in measured[:top]:
+        print(f"   {_ms(row['lcp_ms']):>8} {_ms(row['fcp_ms']):>8} {_ms(row['ttfb_ms']):>7} "
+              f"{row['cls'] if row['cls'] is not None else '-':>6} {_ms(row['total_blocking_ms']):>6} "
+              f"{_kb(row['js_bytes']):>8} {_kb(row['heap_bytes'] or row['cdp_heap_bytes']):>8}  {row['route']}")
+
+
+def _ms(value):
+    return "-" if value is None else f"{value:.0f}ms"
+
+
+def _kb(value):
+    return "-" if value is None else f"{value / 1024:.0f}KB"
@@ -0,0 +1,118 @@
+#!/usr/bin/env python3
+"""
+Route list for the browser smoke tests, derived from the app/ tree.
+
+Every page.tsx below app/ serves one route (see source_index.page_route()).
+Static routes are tested as they are; a dynamic segment like [id] or
+[...slug] is filled from test-data/route-params.json, which maps a route
+pattern to the parameter sets to visit it with:
+
+    {"/projects/[id]": [{"id": "test-project-1"}]}
+
+Dynamic routes without fixtures are skipped. --shard i/N splits the sorted
+list round-robin into N deterministic, evenly sized shards, so a full crawl
+can be spread across CI workers:
+
+    python3 smoke_routes.py                  # every route, and what was skipped
+    python3 smoke_routes.py --shard 3/8      # the routes shard 3 of 8 visits
+"""
+
+import os
+import re
+import json
+import argparse
+
+from migration_index import ROOT_DIR
+from source_index import SKIP_DIRS, SOURCE_EXTENSIONS, page_route
+
+ROUTE_PARAMS_FILE = os.path.join(ROOT_DIR, "test-data", "route-params.json")
+PAGE_FILE_NAMES = tuple("page" + ext for ext in SOURCE_EXTENSIONS)
+
+# [id], [...slug] and [[...slug]]
+DYNAMIC_SEGMENT_RE = re.compile(r"\[\[?(?:\.\.\.)?([^\]]+)\]\]?")
+SHARD_RE = re.compile(r"(\d+)/(\d+)$")
+
+
+def page_patterns(root=ROOT_DIR):
+    """Sorted, distinct route patterns of every page below app/, dynamic segments as written."""
+    patterns = set()
+    for dirpath, dirnames, filenames in os.walk(os.path.join(root, "app")):
+        dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+        for name in filenames:
+            if name in PAGE_FILE_NAMES:
+                route = page_route(os.path.join(dirpath, name), root)
+                if route is not None:
+                    patterns.add(route)
+    return sorted(patterns)
+
+
+def load_route_params(path=ROUTE_PARAMS_FILE):
+    """{route pattern: [params, ...]} from the fixtures file; {} when there is none."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, encoding='utf-8') as f:
+        return json.load(f)
+
+
+def fill_route(pattern, params):
+    """The URL path for `pattern` with its dynamic segments taken from `params`.
+
+    Raises KeyError naming the first segment `params` has no value for.
+    """
+    def value(match):
+        param = params[match.group(1)]
+        return "/".join(param) if isinstance(param, list) else str(param)
+    return DYNAMIC_SEGMENT_RE.sub(value, pattern)
+
+
+def smoke_routes(root=ROOT_DIR, params_file=ROUTE_PARAMS_FILE):
+    """(routes, skipped): sorted URL paths to visit, and the dynamic patterns without fixtures."""
+    fixtures = load_route_params(params_file)
+    routes, skipped = set(), []
+    for pattern in page_patterns(root):
+        if not DYNAMIC_SEGMENT_RE.search(pattern):
+            routes.add(pattern)
+            continue
+        try:
+            routes.update(fill_route(pattern, params) for params in fixtures.get(pattern, ()))
+        except KeyError as e:
+            raise ValueError(f"{params_file}: {pattern} needs a value for {e}") from None
+        if pattern not in fixtures:
+            skipped.append(pattern)
+    return sorted(routes), skipped
+
+
+def parse_shard(value):
+    """argparse type for "i/N" with 1 <= i <= N; returns (i, N)."""
+    match = SHARD_RE.match(value)
+    if not match or not 1 <= int(match.group(1)) <= int(match.group(2)):
+        raise argparse.ArgumentTypeError(f"expected i/N with 1 <= i <= N, got {value!r}")
+    return int(match.group(1)), int(match.group(2))
+
+
+def shard_routes(routes, shard):
+    """The routes shard (i, N) visits: every N-th of the sorted list, starting at the i-th."""
+    index, count = shard
+    return sorted(routes)[index - 1::count]
+
+
+def main():
+    parser = argparse.ArgumentParser(description="List the routes the browser smoke tests visit")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N", help="only the routes of shard i of N")
+    parser.add_argument("--json", action="store_true", help="print the routes as a JSON array")
+    args = parser.parse_args()
+
+    routes, skipped = smoke_routes()
+    selected = shard_routes(routes, args.shard) if args.shard else routes
+    if args.json:
+        print(json.dumps(selected, indent=1))
+        return
+    for route in selected:
+        print(route)
+    shard = f" in shard {args.shard[0]}/{args.shard[1]}" if args.shard else ""
+    print(f"\n📋 {len(selected)} routes{shard} ({len(routes)} in all); "
+          f"{len(skipped)} dynamic routes skipped without fixtures in {os.path.relpath(ROUTE_PARAMS_FILE, ROOT_DIR)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Cached, parallel scanner for facts about the app's TypeScript sources.
+
+Every source file under the scanned directories is reduced to a small dict of
+facts: the Supabase tables it queries with `.from('table')` and the columns
+each query chain filters or sorts on (`.eq('user_id', ...)`), the route a
+Next.js page serves, its buttons and data-testid values, toast calls and
+imports. Facts are stored in a SQLite cache under .cache/, keyed by path,
+size, mtime and content hash, so only files that changed since the last run
+are re-read, and those are scanned on a process pool.
+
+Tables, filters and routes come from a few regex searches. Buttons, test
+IDs, toasts and imports need the file lexed (tsx_lexer.py), which costs
+about twenty times as much, so they are only extracted for scans that ask
+for them with `inventory=True` and are cached alongside the cheap facts.
+
+The cache doubles as an inventory of app/, components/ and hooks/ that other
+tools query instead of re-reading the tree:
+
+    python3 source_index.py --inventory         # totals and pages missing test IDs
+    python3 source_index.py --routes            # every page route with its counts
+    python3 source_index.py --show app/(app)/dashboard/page.tsx
+"""
+
+import os
+import re
+import json
+import time
+import hashlib
+import sqlite3
+import argparse
+
+from migration_index import ROOT_DIR, parallel_map
+from tsx_lexer import IDENTIFIER_CHARS, lex, string_attribute
+
+CACHE_FILE = os.path.join(ROOT_DIR, ".cache", "source_index.sqlite")
+SOURCE_DIRS = ("lib", "hooks", "app")
+INVENTORY_DIRS = ("app", "components", "hooks")
+SOURCE_EXTENSIONS = (".ts", ".tsx", ".js", ".jsx")
+SKIP_DIRS = {"node_modules", ".next", ".git", ".cache"}
+
+# Bump whenever extract_facts() output changes so stale caches are discarded
+FACTS_VERSION = "4"
+
+# `.from('table')` on a Supabase client. The pattern starts with a literal so
+# the regex engine can skip ahead quickly; `storage.from('bucket')` names a
+# storage bucket and is filtered out by looking just behind the match.
+FROM_CALL_RE = re.compile(r"""\.from\s*(?:<[^>()]*>)?\(\s*(['"`])([A-Za-z_][A-Za-z0-9_]*)\1\s*\)""")
+STORAGE_RECEIVER_RE = re.compile(r"storage\s*$")
+
+# Column filters and sorts in a query builder chain, e.g. `.eq('user_id', id)`
+FILTER_CALL_RE = re.compile(
+    r"""\.(eq|neq|gt|gte|lt|lte|in|is|like|ilike|contains|order)\(\s*(['"`])([A-Za-z_][A-Za-z0-9_]*)\2"""
+)
+# A chain ends at a semicolon or a blank line, and is never followed further than this
+CHAIN_END_RE = re.compile(r";|\n[ \t]*\n")
+MAX_CHAIN = 2000
+
+# toast('...') and toast.success('...') etc.
+TOAST_CALL_RE = re.compile(r"toast(?:\.\w+)?\(")
+
+# Module specifiers: `import x from 'm'` / `export { x } from 'm'` (type-only
+# when `import type` / `export type`), `import 'm'`, `import('m')` and
+# `require('m')`. One regex per keyword, each starting with it, so a file is
+# searched for the keyword instead of trying the pattern at every position.
+IMPORT_RES = [re.compile(pattern) for pattern in (
+    r"""import(?:\s+(?P<type>type\s+)?[^'";]*?\bfrom\s*|\s*|(?P<dynamic>\(\s*))"""
+    r"""(?P<quote>['"])(?P<spec>[^'"\n]+)(?P=quote)(?(dynamic)\s*\))""",
+    r"""export\s+(?P<type>type\s+)?[^'";]*?\bfrom\s*(?P<quote>['"])(?P<spec>[^'"\n]+)(?P=quote)""",
+    r"""require\(\s*(?P<quote>['"])(?P<spec>[^'"\n]+)(?P=quote)\s*\)""",
+)]
+BUTTON_TAGS = ("button", "Button")
+JSX_EXTENSIONS = (".tsx", ".jsx")
+PAGE_FILES = ("page", "route")
+# The facts only extracted with inventory=True
+INVENTORY_FACTS = ("buttons", "test_ids", "toasts", "imports")
+
+
+def extract_facts(text, path=None, inventory=False):
+    """Reduce one source file to the facts the tools query.
+
+    `filters` holds sorted [table, column, method] triples for the filter and
+    order calls chained onto each `.from('table')`. `route` is the URL of a
+    page.tsx and `api_route` that of a route.ts (see page_route()). With
+    `inventory`, the file is also lexed for the INVENTORY_FACTS: buttons,
+    static data-testid values, toast calls and `imports`, sorted [specifier,
+    kind] pairs with kind "static", "type" or "dynamic", which only count in
+    code, not in comments or strings.
+    """
+    calls = [
+        match for match in FROM_CALL_RE.finditer(text)
+        if not STORAGE_RECEIVER_RE.search(text, max(0, match.start() - 32), match.start())
+    ]
+    filters = set()
+    for i, call in enumerate(calls):
+        limit = min(len(text), call.end() + MAX_CHAIN)
+        if i + 1 < len(calls):
+            limit = min(limit, calls[i + 1].start())
+        end = CHAIN_END_RE.search(text, call.end(), limit)
+        for match in FILTER_CALL_RE.finditer(text, call.end(), end.start() if end else limit):
+            filters.add((call.group(2), match.group(3), match.group(1)))
+
+    route = page_route(path) if path else None
+    is_page = route is not None and os.path.basename(path).startswith("page.")
+    facts = {
+        "tables": sorted({call.group(2) for call in calls}),
+        "filters": [list(entry) for entry in sorted(filters)],
+        "route": route if is_page else None,
+        "api_route": route if route is not None and not is_page else None,
+    }
+    if not inventory:
+        return facts
+
+    scan = lex(text, jsx=path is None or path.endswith(JSX_EXTENSIONS))
+    buttons = [tag for tag in scan.tags.values() if tag.name in BUTTON_TAGS]
+    test_ids = [string_attribute(scan, tag, "data-testid") for tag in scan.tags.values()]
+    imports = set()
+    for import_re in IMPORT_RES:
+        for match in import_re.finditer(text):
+            start = match.start()
+            if text[start - 1:start] in IDENTIFIER_CHARS or not scan.in_code(start):
+                continue
+            groups = match.groupdict()
+            kind = "dynamic" if groups.get("dynamic") else "type" if groups.get("type") else "static"
+            imports.add((groups["spec"], kind))
+
+    facts.update({
+        "buttons": len(buttons),
+        "test_ids": sorted(test_id for test_id in test_ids if test_id),
+        "toasts": sum(1 for match in TOAST_CALL_RE.finditer(text)
+                      if text[match.start() - 1:match.start()] not in IDENTIFIER_CHARS and scan.in_code(match.start())),
+        "imports": [list(entry) for entry in sorted(imports)],
+    })
+    return facts
+
+
+def page_route(path, root=ROOT_DIR):
+    """The URL path a Next.js app/ page.tsx or route.ts serves, or None.
+
+    Route groups `(group)` and parallel-route slots `@slot` are left out,
+    private `_folders` serve nothing, and dynamic segments stay as written:
+    app/(app)/dashboard/projects/[id]/page.tsx -> /dashboard/projects/[id].
+    """
+    rel = os.path.relpath(path, os.path.join(root, "app"))
+    parts = rel.split(os.sep)
+    if parts[0] == ".." or os.path.splitext(parts[-1])[0] not in PAGE_FILES:
+        return None
+    segments = []
+    for part in parts[:-1]:
+        if part.startswith("_"):
+            return None
+        if not (part.startswith("(") and part.endswith(")")) and not part.startswith("@"):
+            segments.append(part)
+    return "/" + "/".join(segments)
+
+
+def scan_source(task):
+    """Hash and scan one source file in a worker process.
+
+    `task` is (path, known_sha256, inventory). Returns (size, mtime_ns,
+    sha256, facts), with facts None when the content still matches
+    `known_sha256`.
+    """
+    path, known_sha256, inventory = task
+    st = os.stat(path)
+    with open(path, 'rb') as f:
+        content = f.read()
+    sha256 = hashlib.sha256(content).hexdigest()
+    if sha256 == known_sha256:
+        return st.st_size, st.st_mtime_ns, sha256, None
+    return st.st_size, st.st_mtime_ns, sha256, extract_facts(content.decode('utf-8', errors='replace'), path, inventory)
+
+
+def discover_sources(dirs=SOURCE_DIRS, root=ROOT_DIR):
+    """Every source file below `dirs`, sorted, skipping build output and dependencies."""
+    paths = []
+    for directory in dirs:
+        for dirpath, dirnames, filenames in os.walk(os.path.join(root, directory)):
+            dirnames[:] = sorted(d for d in dirnames if d not in SKIP_DIRS)
+            paths.extend(
+                os.path.join(dirpath, name) for name in filenames
+                if name.endswith(SOURCE_EXTENSIONS)
+            )
+    return sorted(paths)
+
+
+def open_cache(cache_file=CACHE_FILE):
+    """Open the facts cache, discarding it if it was written by another version."""
+    os.makedirs(os.path.dirname(cache_file), exist_ok=True)
+    conn = sqlite3.connect(cache_file)
+    conn.execute("CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT)")
+    row = conn.execute("SELECT value FROM meta WHERE key = 'version'").fetchone()
+    if not row or row[0] != FACTS_VERSION:
+        conn.executescript("""
+            DROP TABLE IF EXISTS files;
+            CREATE TABLE files (
+                path TEXT PRIMARY KEY, size INTEGER, mtime_ns INTEGER, sha256 TEXT, facts TEXT,
+                inventory TEXT
+            );
+        """)
+        conn.execute("INSERT OR REPLACE INTO meta VALUES ('version', ?)", (FACTS_VERSION,))
+        conn.commit()
+    return conn
+
+
+def scan_tree(dirs=SOURCE_DIRS, cache_file=CACHE_FILE, jobs=1, stats=None, inventory=False):
+    """Return {path: facts} for every source file below `dirs`.
+
+    Unchanged files come from the cache; the rest are scanned on `jobs`
+    worker processes (0 = one per CPU). With `inventory`, facts include the
+    INVENTORY_FACTS, and files cached without them are lexed once to add
+    them. `stats`, if given, receives the number of files seen and scanned.
+    """
+    paths = discover_sources(dirs)
+    roots = tuple(os.path.join(ROOT_DIR, directory, "") for directory in dirs)
+    if stats is None:
+        stats = {}
+    stats.update(files=len(paths), scanned=0)
+
+    conn = open_cache(cache_file) if cache_file else None
+    try:
+        cached = {}
+        if conn:
+            for path, size, mtime_ns, sha256, facts, lexed in conn.execute("SELECT * FROM files"):
+                cached[path] = (size, mtime_ns, sha256, facts, lexed)
+
+        facts_by_path = {}
+        tasks = []
+        for path in paths:
+            row = cached.get(path)
+            if row and inventory and row[4] is None:
+                row = None   # cached without the lexed facts: scan again with them
+            st = os.stat(path)
+            if row and row[0] == st.st_size and row[1] == st.st_mtime_ns:
+                facts_by_path[path] = _cached_facts(row, inventory)
+            else:
+                tasks.append((path, row[2] if row else None, inventory))
+
+        for (path, _, _), (size, mtime_ns, sha256, facts) in zip(
+                tasks, parallel_map(scan_source, tasks, jobs)):
+            if facts is None:
+                # Touched but unchanged: keep the facts, refresh the stat key
+                row = cached[path]
+                basic, lexed = row[3], row[4]
+                facts = _cached_facts(row, inventory)
+            else:
+                stats["scanned"] += 1
+                basic = json.dumps({key: value for key, value in facts.items() if key not in INVENTORY_FACTS})
+                lexed = json.dumps({key: facts[key] for key in INVENTORY_FACTS}) if inventory else None
+            if conn:
+                conn.execute(
+                    "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?)",
+                    (path, size, mtime_ns, sha256, basic, lexed)
+                )
+            facts_by_path[path] = facts
+
+        if conn:
+            # Forget files below `dirs` that were deleted or moved since the last run
+            conn.executemany(
+                "DELETE FROM files WHERE path = ?",
+                [(path,) for path in cached if path.startswith(roots) and path not in facts_by_path]
+            )
+            conn.commit()
+    finally:
+        if conn:
+            conn.close()
+
+    return {path: facts_by_path[path] for path in paths}
+
+
+def _cached_facts(row, inventory):
+    facts = json.loads(row[3])
+    if inventory:
+        facts.update(json.loads(row[4]))
+    return facts
+
+
+def referenced_tables(facts_by_path):
+    """Map table name -> sorted list of files that query it."""
+    tables = {}
+    for path, facts in facts_by_path.items():
+        for table in facts["tables"]:
+            tables.setdefault(table, []).append(path)
+    return tables
+
+
+def referenced_filters(facts_by_path):
+    """Map (table, column) -> sorted list of (path, method) pairs filtering on it."""
+    filters = {}
+    for path, facts in facts_by_path.items():
+        for table, column, method in facts["filters"]:
+            filters.setdefault((table, column), []).append((path, method))
+    return {key: sorted(uses) for key, uses in filters.items()}
+
+
+def page_routes(facts_by_path):
+    """Sorted (route, path) pairs for every page.tsx among the scanned files."""
+    return sorted((facts["route"], path) for path, facts in facts_by_path.items() if facts["route"])
+
+
+def inventory(facts_by_path, root=ROOT_DIR):
+    """Totals per top-level directory: files, pages, buttons, test IDs, toasts, tables, imports."""
+    totals = {}
+    for path, facts in facts_by_path.items():
+        top = os.path.relpath(path, root).split(os.sep)[0]
+        entry = totals.setdefault(top, dict.fromkeys(
+            ("files", "pages", "buttons", "test_ids", "toasts", "tables", "imports"), 0))
+        entry["files"] += 1
+        entry["pages"] += facts["route"] is not None
+        entry["buttons"] += facts["buttons"]
+        entry["test_ids"] += len(facts["test_ids"])
+        entry["toasts"] += facts["toasts"]
+        entry["tables"] += len(facts["tables"])
+        entry["imports"] += len(facts["imports"])
+    return totals
+
+
+def missing_test_ids(facts_by_path):
+    """Pages by how many more buttons than data-testid values they have, most first."""
+    gaps = [
+        (facts["buttons"] - len(facts["test_ids"]), facts["route"], path)
+        for path, facts in facts_by_path.items()
+        if facts["route"] and facts["buttons"] > len(facts["test_ids"])
+    ]
+    return sorted(gaps, key=lambda gap: (-gap[0], gap[1]))
+
+
+def print_inventory(facts_by_path, top=15):
+    totals = inventory(facts_by_path)
+    columns = ("files", "pages", "buttons", "test_ids", "toasts", "tables", "imports")
+    print(f"{'':<12}" + "".join(f"{column:>10}" for column in columns))
+    for directory in sorted(totals):
+        print(f"{directory:<12}" + "".join(f"{totals[directory][column]:>10}" for column in columns))
+    gaps = missing_test_ids(facts_by_path)
+    if gaps:
+        print(f"\n⚠️  {len(gaps)} pages have more buttons than test IDs; the largest gaps:")
+        for gap, route, path in gaps[:top]:
+            print(f"  {gap:>4}  {route}  ({os.path.relpath(path, ROOT_DIR)})")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Scan app sources for the Supabase tables they query, "
+                                                 "and inventory pages, buttons, test IDs and toasts")
+    parser.add_argument("dirs", nargs="*",
+                        help="directories to scan (default: lib hooks app, or app components hooks "
+                             "for --inventory, --routes and --show)")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="scan on N worker processes (default: one per CPU)")
+    parser.add_argument("--no-cache", action="store_true", help="ignore the on-disk cache")
+    query = parser.add_mutually_exclusive_group()
+    query.add_argument("--inventory", action="store_true",
+                       help="print totals per directory and the pages missing the most test IDs")
+    query.add_argument("--routes", action="store_true", help="print every page route with its counts")
+    query.add_argument("--show", metavar="PATH", help="print the facts recorded for one file as JSON")
+    query.add_argument("--json", metavar="PATH", help="write the facts of every scanned file as JSON")
+    args = parser.parse_args()
+
+    inventory_query = args.inventory or args.routes or args.show or args.json
+    dirs = args.dirs or list(INVENTORY_DIRS if inventory_query else SOURCE_DIRS)
+    stats = {}
+    started = time.perf_counter()
+    facts = scan_tree(dirs, None if args.no_cache else CACHE_FILE, args.jobs, stats,
+                      inventory=bool(inventory_query))
+    summary = (f"{stats['files']} files in {', '.join(dirs)} ({stats['scanned']} scanned) "
+               f"in {(time.perf_counter() - started) * 1000:.0f} ms")
+
+    if args.show:
+        path = os.path.abspath(args.show)
+        if path not in facts:
+            parser.error(f"{args.show} is not a source file below {', '.join(dirs)}")
+        print(json.dumps(facts[path], indent=2))
+        return
+    if args.json:
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump({os.path.relpath(path, ROOT_DIR): entry for path, entry in facts.items()}, f, indent=1)
+        print(f"Wrote facts for {len(facts)} files to {args.json}; {summary}")
+        return
+    if args.routes:
+        print(f"{'buttons':>7} {'ids':>4} {'toasts':>6}  route")
+        for route, path in page_routes(facts):
+            entry = facts[path]
+            print(f"{entry['buttons']:>7} {len(entry['test_ids']):>4} {entry['toasts']:>6}  {route}")
+        print(f"\n{summary}")
+        return
+    if args.inventory:
+        print_inventory(facts)
+        print(f"\n{summary}")
+        return
+
+    tables = referenced_tables(facts)
+    for table in sorted(tables):
+        print(f"{table}: {len(tables[table])} files")
+    print(f"\n{len(tables)} tables referenced from {stats['files']} files "
+          f"({stats['scanned']} scanned)")
+
+
+if __name__ == "__main__":
+    main()
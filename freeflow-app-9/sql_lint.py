@@ -0,0 +1,272 @@
+#!/usr/bin/env python3
+"""
+Lock level and rewrite risk of migration statements.
+
+classify() maps one statement to the strongest table lock Postgres takes for
+it and to what the statement does to the rows already in that table:
+
+  none     catalog-only change, done in milliseconds
+  scan     every row is read while the lock is held (SET NOT NULL, CHECK, FK)
+  index    every row is read, sorted and written into a new index
+  rewrite  the whole table is copied (type change, volatile DEFAULT, VACUUM FULL)
+
+Given row counts per table, estimate_seconds() turns that into a rough
+apply-time estimate. The per-row costs are deliberately coarse; they are
+meant to tell a 10 ms migration from a 10 minute one.
+"""
+
+import re
+import csv
+import json
+from collections import namedtuple
+
+from migration_index import table_key
+from sql_schema import NAME, QUALIFIED_NAME, split_top_level, strip_comments, unquote
+
+# Postgres table lock modes, weakest first
+LOCK_LEVELS = [
+    "NONE", "ACCESS SHARE", "ROW SHARE", "ROW EXCLUSIVE", "SHARE UPDATE EXCLUSIVE",
+    "SHARE", "SHARE ROW EXCLUSIVE", "EXCLUSIVE", "ACCESS EXCLUSIVE",
+]
+RISKS = ["none", "scan", "index", "rewrite"]
+# From SHARE up, concurrent writes to the table wait for the statement
+BLOCKS_WRITES = LOCK_LEVELS.index("SHARE")
+
+# Seconds per million rows for each kind of work
+COST_PER_MILLION_ROWS = {"none": 0.0, "scan": 0.5, "index": 2.0, "rewrite": 5.0}
+
+# Supabase runs Postgres 15; below 11 any ADD COLUMN ... DEFAULT rewrites the table
+DEFAULT_PG_VERSION = 15
+
+# `table` is the index key of the locked table, or None for statements that
+# lock nothing that already exists
+LockInfo = namedtuple("LockInfo", ["table", "lock", "risk", "reason"])
+
+NO_LOCK = LockInfo(None, "NONE", "none", "")
+
+# Statement kinds whose text classify() needs; everything else is decided by kind
+TEXT_KINDS = {
+    "ALTER TABLE", "CREATE INDEX", "DROP INDEX", "CREATE TABLE", "DROP TABLE", "TRUNCATE",
+    "UPDATE", "DELETE", "CREATE POLICY", "ALTER POLICY", "DROP POLICY", "CREATE TRIGGER",
+    "DROP TRIGGER", "VACUUM", "CLUSTER", "REINDEX", "REFRESH",
+}
+
+def _re(pattern):
+    return re.compile(pattern, re.IGNORECASE | re.DOTALL)
+
+ALTER_TABLE_RE = _re(rf'\s*ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?{QUALIFIED_NAME}\s*(.*)')
+CREATE_INDEX_RE = _re(
+    rf'\s*CREATE\s+(?:UNIQUE\s+)?INDEX\s+(CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?(?:{NAME}\s+)?'
+    rf'ON\s+(?:ONLY\s+)?{QUALIFIED_NAME}'
+)
+DROP_INDEX_RE = _re(r'\s*DROP\s+INDEX\s+(CONCURRENTLY\s+)?')
+PARTITION_OF_RE = _re(rf'\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?{QUALIFIED_NAME}\s+PARTITION\s+OF\s+{QUALIFIED_NAME}')
+DROP_TABLE_RE = _re(rf'\s*DROP\s+TABLE\s+(?:IF\s+EXISTS\s+)?{QUALIFIED_NAME}')
+TRUNCATE_RE = _re(rf'\s*TRUNCATE\s+(?:TABLE\s+)?(?:ONLY\s+)?{QUALIFIED_NAME}')
+UPDATE_RE = _re(rf'\s*UPDATE\s+(?:ONLY\s+)?{QUALIFIED_NAME}')
+DELETE_RE = _re(rf'\s*DELETE\s+FROM\s+(?:ONLY\s+)?{QUALIFIED_NAME}')
+WHERE_RE = _re(r'\bWHERE\b')
+ON_TABLE_RE = _re(rf'\bON\s+{QUALIFIED_NAME}')
+VACUUM_FULL_RE = _re(
+    rf'\s*VACUUM\s+(?:\([^)]*\bFULL\b[^)]*\)|FULL\b(?:\s+(?:FREEZE|VERBOSE|ANALYZE)\b)*)\s*(?:{QUALIFIED_NAME})?'
+)
+CLUSTER_RE = _re(rf'\s*CLUSTER\s+(?:VERBOSE\s+)?{QUALIFIED_NAME}')
+REINDEX_RE = _re(rf'\s*REINDEX\s+(?:\([^)]*\)\s*)?(TABLE|INDEX)\s+(CONCURRENTLY\s+)?{QUALIFIED_NAME}')
+REFRESH_RE = _re(rf'\s*REFRESH\s+MATERIALIZED\s+VIEW\s+(CONCURRENTLY\s+)?{QUALIFIED_NAME}')
+
+# ALTER TABLE actions, matched at the start of each comma-separated action
+ADD_COLUMN_RE = _re(r'ADD\s+(?:COLUMN\s+)?(?!CONSTRAINT\b|PRIMARY\b|UNIQUE\b|FOREIGN\b|CHECK\b|EXCLUDE\b)')
+ADD_CONSTRAINT_RE = _re(rf'ADD\s+(?:CONSTRAINT\s+{NAME}\s+)?(PRIMARY\s+KEY|UNIQUE|FOREIGN\s+KEY|CHECK|EXCLUDE)\b')
+ALTER_TYPE_RE = _re(rf'ALTER\s+(?:COLUMN\s+)?{NAME}\s+(?:SET\s+DATA\s+)?TYPE\b')
+SET_NOT_NULL_RE = _re(rf'ALTER\s+(?:COLUMN\s+)?{NAME}\s+SET\s+NOT\s+NULL\b')
+VALIDATE_RE = _re(r'VALIDATE\s+CONSTRAINT\b')
+REWRITE_ACTION_RE = _re(r'SET\s+(?:UNLOGGED|LOGGED|TABLESPACE|ACCESS\s+METHOD)\b')
+WEAK_ACTION_RE = _re(r'(?:ENABLE|DISABLE)\s+(?:ALWAYS\s+|REPLICA\s+)?TRIGGER\b|SET\s+STATISTICS\b|ALTER\s+(?:COLUMN\s+)?\S+\s+SET\s+STATISTICS\b|CLUSTER\s+ON\b|SET\s+WITHOUT\s+CLUSTER\b|SET\s*\(')
+NOT_VALID_RE = _re(r'\bNOT\s+VALID\b')
+USING_INDEX_RE = _re(r'\bUSING\s+INDEX\s+(?!TABLESPACE)')
+DEFAULT_RE = _re(r'\bDEFAULT\s+(?!NULL\b)')
+VOLATILE_DEFAULT_RE = _re(
+    r'\bDEFAULT\s+[^,]*?\b(?:random|gen_random_uuid|uuid_generate_v[14]|clock_timestamp|timeofday|nextval)\s*\('
+)
+SERIAL_RE = _re(r'^\s*(?:IF\s+NOT\s+EXISTS\s+)?\S+\s+(?:small|big)?serial[248]?\b')
+STORED_GENERATED_RE = _re(r'\bGENERATED\s+ALWAYS\s+AS\s*\(.*\)\s*STORED\b')
+INLINE_KEY_RE = _re(r'\bPRIMARY\s+KEY\b|\bUNIQUE\b')
+INLINE_CHECK_RE = _re(r'\bCHECK\s*\(|\bREFERENCES\b')
+
+
+def _key(match, group):
+    return table_key(match.group(group) and unquote(match.group(group)), unquote(match.group(group + 1)))
+
+
+def _combine(infos, table):
+    """Combine several actions on one table: the strongest lock and worst risk win."""
+    lock = max((info.lock for info in infos), key=LOCK_LEVELS.index)
+    worst = max(infos, key=lambda info: RISKS.index(info.risk))
+    return LockInfo(table, lock, worst.risk, worst.reason)
+
+
+def classify_alter_action(action, pg_version):
+    """(lock, risk, reason) of one ALTER TABLE action."""
+    if ADD_CONSTRAINT_RE.match(action):
+        constraint = ADD_CONSTRAINT_RE.match(action).group(1).upper()
+        if constraint.startswith(("PRIMARY", "UNIQUE")):
+            if USING_INDEX_RE.search(action):
+                return "ACCESS EXCLUSIVE", "none", "constraint on an existing index"
+            return "ACCESS EXCLUSIVE", "index", f"ADD {constraint} builds an index"
+        if constraint == "EXCLUDE":
+            return "ACCESS EXCLUSIVE", "index", "ADD EXCLUDE builds an index"
+        lock = "SHARE ROW EXCLUSIVE" if constraint.startswith("FOREIGN") else "ACCESS EXCLUSIVE"
+        if NOT_VALID_RE.search(action):
+            return lock, "none", f"ADD {constraint} NOT VALID"
+        return lock, "scan", f"ADD {constraint} validates every row (use NOT VALID + VALIDATE)"
+    if ADD_COLUMN_RE.match(action):
+        column = action[ADD_COLUMN_RE.match(action).end():]
+        if STORED_GENERATED_RE.search(column):
+            return "ACCESS EXCLUSIVE", "rewrite", "ADD COLUMN ... GENERATED STORED rewrites the table"
+        if SERIAL_RE.match(column) or VOLATILE_DEFAULT_RE.search(column):
+            return "ACCESS EXCLUSIVE", "rewrite", "ADD COLUMN with a volatile DEFAULT rewrites the table"
+        if pg_version < 11 and DEFAULT_RE.search(column):
+            return "ACCESS EXCLUSIVE", "rewrite", "ADD COLUMN ... DEFAULT rewrites the table before Postgres 11"
+        if INLINE_KEY_RE.search(column):
+            return "ACCESS EXCLUSIVE", "index", "ADD COLUMN with PRIMARY KEY/UNIQUE builds an index"
+        if INLINE_CHECK_RE.search(column):
+            return "ACCESS EXCLUSIVE", "scan", "ADD COLUMN with CHECK/REFERENCES validates every row"
+        return "ACCESS EXCLUSIVE", "none", "ADD COLUMN"
+    if ALTER_TYPE_RE.match(action):
+        return "ACCESS EXCLUSIVE", "rewrite", "ALTER COLUMN TYPE rewrites the table and its indexes"
+    if SET_NOT_NULL_RE.match(action):
+        return "ACCESS EXCLUSIVE", "scan", "SET NOT NULL scans every row (add a CHECK NOT VALID first)"
+    if VALIDATE_RE.match(action):
+        return "SHARE UPDATE EXCLUSIVE", "scan", "VALIDATE CONSTRAINT"
+    if REWRITE_ACTION_RE.match(action):
+        return "ACCESS EXCLUSIVE", "rewrite", f"{' '.join(action.split()[:2]).upper()} rewrites the table"
+    if WEAK_ACTION_RE.match(action):
+        return "SHARE ROW EXCLUSIVE", "none", ""
+    return "ACCESS EXCLUSIVE", "none", ""
+
+
+def classify(kind, sql, pg_version=DEFAULT_PG_VERSION):
+    """LockInfo for one statement; `sql` may be empty for kinds not in TEXT_KINDS."""
+    if kind not in TEXT_KINDS:
+        if kind in ("INSERT", "COPY", "MERGE"):
+            return LockInfo(None, "ROW EXCLUSIVE", "none", "")
+        if kind in ("COMMENT", "ANALYZE"):
+            return LockInfo(None, "SHARE UPDATE EXCLUSIVE", "none", "")
+        return NO_LOCK
+    sql = strip_comments(sql).rstrip().rstrip(";")
+
+    if kind == "ALTER TABLE":
+        match = ALTER_TABLE_RE.match(sql)
+        if not match:
+            return NO_LOCK
+        actions = split_top_level("(" + match.group(3) + ")", 0) or [match.group(3)]
+        infos = [LockInfo(None, *classify_alter_action(action, pg_version)) for action in actions]
+        return _combine(infos, _key(match, 1))
+
+    if kind == "CREATE INDEX":
+        match = CREATE_INDEX_RE.match(sql)
+        if not match:
+            return NO_LOCK
+        if match.group(1):
+            return LockInfo(_key(match, 2), "SHARE UPDATE EXCLUSIVE", "index", "CREATE INDEX CONCURRENTLY")
+        return LockInfo(_key(match, 2), "SHARE", "index",
+                        "CREATE INDEX blocks writes while it builds (use CONCURRENTLY)")
+
+    if kind == "DROP INDEX":
+        concurrently = DROP_INDEX_RE.match(sql).group(1) if DROP_INDEX_RE.match(sql) else None
+        return LockInfo(None, "SHARE UPDATE EXCLUSIVE" if concurrently else "ACCESS EXCLUSIVE", "none", "")
+
+    if kind == "CREATE TABLE":
+        # A new table has no readers yet; only attaching a partition locks its parent
+        match = PARTITION_OF_RE.match(sql)
+        if match:
+            return LockInfo(_key(match, 3), "ACCESS EXCLUSIVE", "scan", "PARTITION OF checks every row")
+        return NO_LOCK
+
+    patterns = {
+        "DROP TABLE": (DROP_TABLE_RE, "ACCESS EXCLUSIVE", "none", ""),
+        "TRUNCATE": (TRUNCATE_RE, "ACCESS EXCLUSIVE", "none", ""),
+        "CREATE TRIGGER": (ON_TABLE_RE, "SHARE ROW EXCLUSIVE", "none", ""),
+        "DROP TRIGGER": (ON_TABLE_RE, "ACCESS EXCLUSIVE", "none", ""),
+        "CREATE POLICY": (ON_TABLE_RE, "ACCESS EXCLUSIVE", "none", ""),
+        "ALTER POLICY": (ON_TABLE_RE, "ACCESS EXCLUSIVE", "none", ""),
+        "DROP POLICY": (ON_TABLE_RE, "ACCESS EXCLUSIVE", "none", ""),
+        "CLUSTER": (CLUSTER_RE, "ACCESS EXCLUSIVE", "rewrite", "CLUSTER rewrites the table"),
+    }
+    if kind in patterns:
+        pattern, lock, risk, reason = patterns[kind]
+        match = pattern.search(sql) if pattern is ON_TABLE_RE else pattern.match(sql)
+        return LockInfo(_key(match, 1) if match else None, lock, risk, reason)
+
+    if kind in ("UPDATE", "DELETE"):
+        match = (UPDATE_RE if kind == "UPDATE" else DELETE_RE).match(sql)
+        table = _key(match, 1) if match else None
+        if WHERE_RE.search(sql):
+            return LockInfo(table, "ROW EXCLUSIVE", "none", "")
+        risk = "rewrite" if kind == "UPDATE" else "scan"
+        return LockInfo(table, "ROW EXCLUSIVE", risk, f"{kind} without WHERE touches every row")
+
+    if kind == "VACUUM":
+        match = VACUUM_FULL_RE.match(sql)
+        if match:
+            table = _key(match, 1) if match.group(2) else None
+            return LockInfo(table, "ACCESS EXCLUSIVE", "rewrite", "VACUUM FULL rewrites the table")
+        return LockInfo(None, "SHARE UPDATE EXCLUSIVE", "none", "")
+
+    if kind == "REINDEX":
+        match = REINDEX_RE.match(sql)
+        if not match:
+            return LockInfo(None, "ACCESS EXCLUSIVE", "index", "REINDEX")
+        if match.group(2):
+            return LockInfo(None, "SHARE UPDATE EXCLUSIVE", "index", "REINDEX CONCURRENTLY")
+        table = _key(match, 3) if match.group(1).upper() == "TABLE" else None
+        return LockInfo(table, "ACCESS EXCLUSIVE", "index", "REINDEX blocks the table (use CONCURRENTLY)")
+
+    if kind == "REFRESH":
+        match = REFRESH_RE.match(sql)
+        if match and match.group(1):
+            return LockInfo(_key(match, 2), "EXCLUSIVE", "rewrite", "REFRESH MATERIALIZED VIEW CONCURRENTLY")
+        return LockInfo(_key(match, 2) if match else None, "ACCESS EXCLUSIVE", "rewrite",
+                        "REFRESH MATERIALIZED VIEW blocks reads (use CONCURRENTLY)")
+
+    return NO_LOCK
+
+
+def strongest(infos):
+    """The LockInfo of a DO block: its strongest nested statement."""
+    infos = list(infos)
+    if not infos:
+        return NO_LOCK
+    worst = max(infos, key=lambda info: (LOCK_LEVELS.index(info.lock), RISKS.index(info.risk)))
+    return worst._replace(risk=max((info.risk for info in infos), key=RISKS.index))
+
+
+def blocks_writes(info):
+    return LOCK_LEVELS.index(info.lock) >= BLOCKS_WRITES
+
+
+def load_row_counts(path):
+    """Read {table: rows} from JSON ({"table": rows}) or CSV (table,rows per line).
+
+    For example, from production:
+        COPY (SELECT relname, reltuples::bigint FROM pg_class WHERE relkind = 'r') TO STDOUT WITH CSV
+    """
+    with open(path, encoding='utf-8') as f:
+        if path.endswith(".json"):
+            return {table_key(None, name): int(rows) for name, rows in json.load(f).items()}
+        rows = {}
+        for row in csv.reader(f):
+            try:
+                rows[table_key(None, row[0].strip())] = int(float(row[1]))
+            except (IndexError, ValueError):
+                continue   # header or blank line
+        return rows
+
+
+def estimate_seconds(info, rows):
+    """Rough seconds the statement holds its lock, or None if the table's size is unknown."""
+    if info.risk == "none":
+        return 0.0
+    if info.table is None or info.table not in rows:
+        return None
+    return max(rows[info.table], 0) / 1_000_000 * COST_PER_MILLION_ROWS[info.risk]
@@ -0,0 +1,341 @@
+#!/usr/bin/env python3
+"""
+Schema facts parsed from CREATE TABLE, ALTER TABLE, CREATE INDEX and CREATE
+POLICY statements, and the foreign-key dependency order between tables.
+
+The parser is deliberately small: it understands the shapes used in our
+migrations (inline and table-level REFERENCES, PRIMARY KEY, UNIQUE, plain
+column indexes and USING / WITH CHECK policy predicates) and ignores
+everything else in a statement.
+"""
+
+import re
+from collections import namedtuple
+
+from migration_index import table_key
+
+TableSchema = namedtuple("TableSchema", ["name", "columns", "foreign_keys", "primary_key", "unique"])
+ForeignKey = namedtuple("ForeignKey", ["columns", "table", "ref_columns"])
+# `columns` holds None for an expression key, e.g. lower(email)
+IndexDefinition = namedtuple("IndexDefinition", ["name", "table", "columns", "unique", "partial"])
+Policy = namedtuple("Policy", ["name", "table", "command", "predicates"])
+
+# Comments are blanked out while strings and quoted identifiers are kept intact
+COMMENT_OR_QUOTED_RE = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|--[^\n]*|/\*.*?\*/""", re.DOTALL)
+STRUCTURE_RE = re.compile(r"""'(?:[^']|'')*'|"(?:[^"]|"")*"|[(),]""")
+
+NAME = r'(?:"[^"]+"|\w+)'
+QUALIFIED_NAME = rf'(?:({NAME})\s*\.\s*)?({NAME})'
+COLUMN_LIST = r'\(([^)]*)\)'
+
+CREATE_TABLE_RE = re.compile(rf'\s*CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?{QUALIFIED_NAME}\s*\(', re.IGNORECASE)
+CONSTRAINT_PREFIX_RE = re.compile(rf'CONSTRAINT\s+{NAME}\s+', re.IGNORECASE)
+TABLE_CONSTRAINT_RE = re.compile(r'(PRIMARY\s+KEY|FOREIGN\s+KEY|UNIQUE|CHECK|EXCLUDE|LIKE)\b', re.IGNORECASE)
+REFERENCES_RE = re.compile(rf'REFERENCES\s+{QUALIFIED_NAME}\s*(?:{COLUMN_LIST})?', re.IGNORECASE)
+TABLE_FOREIGN_KEY_RE = re.compile(rf'FOREIGN\s+KEY\s*{COLUMN_LIST}\s*REFERENCES\s+{QUALIFIED_NAME}\s*(?:{COLUMN_LIST})?', re.IGNORECASE)
+TABLE_KEY_RE = re.compile(rf'(PRIMARY\s+KEY|UNIQUE)\s*(?:NULLS\s+(?:NOT\s+)?DISTINCT\s*)?{COLUMN_LIST}', re.IGNORECASE)
+COLUMN_RE = re.compile(
+    rf'({NAME})\s+(.*?)(?=\s+(?:NOT|NULL|DEFAULT|PRIMARY|REFERENCES|UNIQUE|CHECK|CONSTRAINT|GENERATED|COLLATE)\b|$)',
+    re.IGNORECASE | re.DOTALL
+)
+INLINE_PRIMARY_KEY_RE = re.compile(r'\bPRIMARY\s+KEY\b', re.IGNORECASE)
+INLINE_UNIQUE_RE = re.compile(r'\bUNIQUE\b', re.IGNORECASE)
+WHITESPACE_RE = re.compile(r'\s+')
+TYPE_PUNCTUATION_RE = re.compile(r'\s*([(),\[\]])\s*')
+
+# Postgres spellings of the same column type, by their canonical name
+TYPE_ALIASES = {
+    "int": "integer", "int4": "integer", "int2": "smallint", "int8": "bigint",
+    "bool": "boolean", "float4": "real", "float8": "double precision",
+    "decimal": "numeric", "character varying": "varchar", "character": "char", "bpchar": "char",
+    "timestamp with time zone": "timestamptz", "timestamp without time zone": "timestamp",
+    "time with time zone": "timetz", "time without time zone": "time",
+    "serial4": "serial", "serial2": "smallserial", "serial8": "bigserial", "bit varying": "varbit",
+}
+TYPE_ALIAS_RE = re.compile(
+    r'(?:pg_catalog\.)?(' + "|".join(sorted(map(re.escape, TYPE_ALIASES), key=len, reverse=True)) + r')\b'
+)
+
+ALTER_TABLE_RE = re.compile(
+    rf'\s*ALTER\s+TABLE\s+(?:IF\s+EXISTS\s+)?(?:ONLY\s+)?{QUALIFIED_NAME}\s+', re.IGNORECASE
+)
+ALTER_ACTION_RE = re.compile(r'ADD\s+(?:COLUMN\s+)?(?:IF\s+NOT\s+EXISTS\s+)?', re.IGNORECASE)
+CREATE_INDEX_RE = re.compile(
+    rf'\s*CREATE\s+(UNIQUE\s+)?INDEX\s+(?:CONCURRENTLY\s+)?(?:IF\s+NOT\s+EXISTS\s+)?({NAME}\s+)?'
+    rf'ON\s+(?:ONLY\s+)?{QUALIFIED_NAME}\s*(?:USING\s+\w+\s*)?\(',
+    re.IGNORECASE
+)
+INDEX_KEY_RE = re.compile(rf'({NAME})(?:\s+\w+)*$')
+PARTIAL_INDEX_RE = re.compile(r'\s*(?:INCLUDE\s*\([^)]*\)\s*)?(?:WITH\s*\([^)]*\)\s*)?WHERE\b', re.IGNORECASE)
+CREATE_POLICY_RE = re.compile(
+    rf'\s*CREATE\s+POLICY\s+({NAME})\s+ON\s+{QUALIFIED_NAME}'
+    r'(?:\s+AS\s+\w+)?(?:\s+FOR\s+(\w+))?',
+    re.IGNORECASE
+)
+POLICY_PREDICATE_RE = re.compile(r'\b(?:USING|WITH\s+CHECK)\s*\(', re.IGNORECASE)
+
+
+def unquote(name):
+    """Lower-case an identifier unless it was double-quoted."""
+    name = name.strip()
+    if name.startswith('"') and name.endswith('"'):
+        return name[1:-1].replace('""', '"')
+    return name.lower()
+
+
+def canonical_type(column_type):
+    """A parsed column type with its aliases spelled one way.
+
+    `timestamp with time zone` -> `timestamptz`, `int4` -> `integer`,
+    `decimal(10, 2)` -> `numeric(10,2)`.
+    """
+    column_type = TYPE_PUNCTUATION_RE.sub(r"\1", column_type)
+    alias = TYPE_ALIAS_RE.match(column_type)
+    if alias:
+        column_type = TYPE_ALIASES[alias.group(1)] + column_type[alias.end():]
+    return column_type
+
+
+def column_list(text):
+    return tuple(unquote(column) for column in text.split(",") if column.strip())
+
+
+def strip_comments(sql):
+    """Replace comments with a space, leaving strings and identifiers untouched."""
+    return COMMENT_OR_QUOTED_RE.sub(
+        lambda m: " " if m.group().startswith(("--", "/*")) else m.group(), sql
+    )
+
+
+def split_top_level(sql, open_paren):
+    """Split the parenthesised list starting at `open_paren` on its top-level commas."""
+    items = []
+    depth = 0
+    item_start = open_paren + 1
+    for match in STRUCTURE_RE.finditer(sql, open_paren):
+        token = match.group()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth == 0:
+                items.append(sql[item_start:match.start()])
+                break
+        elif token == "," and depth == 1:
+            items.append(sql[item_start:match.start()])
+            item_start = match.end()
+    return [item.strip() for item in items if item.strip()]
+
+
+def reference(match, name_group):
+    """Table key and referenced columns for a REFERENCES match."""
+    schema, name = match.group(name_group), match.group(name_group + 1)
+    ref_columns = match.group(name_group + 2)
+    return (
+        table_key(schema and unquote(schema), unquote(name)),
+        column_list(ref_columns) if ref_columns else ()
+    )
+
+
+def closing_paren(sql, open_paren):
+    """Offset of the `)` matching the `(` at `open_paren`, or None."""
+    depth = 0
+    for match in STRUCTURE_RE.finditer(sql, open_paren):
+        token = match.group()
+        if token == "(":
+            depth += 1
+        elif token == ")":
+            depth -= 1
+            if depth == 0:
+                return match.start()
+    return None
+
+
+def parse_table_item(item, columns, foreign_keys, unique):
+    """Fold one column or table constraint into the given collections.
+
+    Returns the primary key the item declares, or None.
+    """
+    body = CONSTRAINT_PREFIX_RE.sub("", item, count=1)
+    if TABLE_CONSTRAINT_RE.match(body):
+        fk = TABLE_FOREIGN_KEY_RE.match(body)
+        if fk:
+            ref_table, ref_columns = reference(fk, 2)
+            foreign_keys.append(ForeignKey(column_list(fk.group(1)), ref_table, ref_columns))
+        key = TABLE_KEY_RE.match(body)
+        if key and key.group(1).upper().startswith("PRIMARY"):
+            return column_list(key.group(2))
+        if key:
+            unique.append(column_list(key.group(2)))
+        return None
+
+    column = COLUMN_RE.match(item)
+    if not column:
+        return None
+    column_name = unquote(column.group(1))
+    columns[column_name] = WHITESPACE_RE.sub(" ", column.group(2).strip().lower())
+    ref = REFERENCES_RE.search(item, column.end(1))
+    if ref:
+        ref_table, ref_columns = reference(ref, 1)
+        foreign_keys.append(ForeignKey((column_name,), ref_table, ref_columns))
+    if INLINE_PRIMARY_KEY_RE.search(item):
+        return (column_name,)
+    if INLINE_UNIQUE_RE.search(item):
+        unique.append((column_name,))
+    return None
+
+
+def parse_create_table(statement):
+    """Parse a CREATE TABLE statement into a TableSchema, or None if it is not one."""
+    sql = strip_comments(statement)
+    match = CREATE_TABLE_RE.match(sql)
+    if not match:
+        return None
+    name = table_key(match.group(1) and unquote(match.group(1)), unquote(match.group(2)))
+    open_paren = match.end() - 1
+
+    columns = {}
+    foreign_keys = []
+    primary_key = ()
+    unique = []
+    for item in split_top_level(sql, open_paren):
+        primary_key = parse_table_item(item, columns, foreign_keys, unique) or primary_key
+
+    return TableSchema(name, columns, foreign_keys, primary_key, unique)
+
+
+def parse_alter_table(statement):
+    """Parse the ADD COLUMN / ADD CONSTRAINT actions of an ALTER TABLE statement.
+
+    Returns a TableSchema holding only what the statement adds, or None if it
+    is not an ALTER TABLE. Other actions are ignored.
+    """
+    sql = strip_comments(statement).rstrip().rstrip(";")
+    match = ALTER_TABLE_RE.match(sql)
+    if not match:
+        return None
+    name = table_key(match.group(1) and unquote(match.group(1)), unquote(match.group(2)))
+
+    columns = {}
+    foreign_keys = []
+    primary_key = ()
+    unique = []
+    # Wrap the actions so split_top_level() can cut them on top-level commas
+    actions = "(" + sql[match.end():] + ")"
+    for action in split_top_level(actions, 0):
+        add = ALTER_ACTION_RE.match(action)
+        if not add:
+            continue
+        primary_key = parse_table_item(action[add.end():], columns, foreign_keys, unique) or primary_key
+
+    return TableSchema(name, columns, foreign_keys, primary_key, unique)
+
+
+def parse_create_index(statement):
+    """Parse a CREATE INDEX statement into an IndexDefinition, or None if it is not one."""
+    sql = strip_comments(statement)
+    match = CREATE_INDEX_RE.match(sql)
+    if not match:
+        return None
+    table = table_key(match.group(3) and unquote(match.group(3)), unquote(match.group(4)))
+    open_paren = match.end() - 1
+    columns = []
+    for key in split_top_level(sql, open_paren):
+        column = INDEX_KEY_RE.match(key)
+        columns.append(unquote(column.group(1)) if column else None)
+    close = closing_paren(sql, open_paren)
+    partial = close is not None and bool(PARTIAL_INDEX_RE.match(sql, close + 1))
+    name = unquote(match.group(2)) if match.group(2) else None
+    return IndexDefinition(name, table, tuple(columns), bool(match.group(1)), partial)
+
+
+def parse_create_policy(statement):
+    """Parse a CREATE POLICY statement into a Policy, or None if it is not one.
+
+    `predicates` holds the text of its USING and WITH CHECK expressions.
+    """
+    sql = strip_comments(statement)
+    match = CREATE_POLICY_RE.match(sql)
+    if not match:
+        return None
+    table = table_key(match.group(2) and unquote(match.group(2)), unquote(match.group(3)))
+    command = (match.group(4) or "ALL").upper()
+    predicates = []
+    for predicate in POLICY_PREDICATE_RE.finditer(sql, match.end()):
+        close = closing_paren(sql, predicate.end() - 1)
+        if close is not None:
+            predicates.append(sql[predicate.end():close].strip())
+    return Policy(unquote(match.group(1)), table, command, tuple(predicates))
+
+
+def dependency_batches(dependencies):
+    """Order tables so every table comes after the tables it references.
+
+    `dependencies` maps table -> set of referenced tables; references to
+    tables outside the mapping and self-references are ignored. Returns
+    (batches, cycles): batches is a list of sorted table lists where no table
+    depends on another table in the same or a later batch, so each batch can
+    be applied in parallel transactions. The exception is tables on a
+    reference cycle: they are kept together in one batch, reference each
+    other there, and each cycle is reported as a sorted list.
+    """
+    graph = {
+        table: {dep for dep in deps if dep in dependencies and dep != table}
+        for table, deps in dependencies.items()
+    }
+
+    # Tarjan's strongly connected components, iteratively to avoid recursion limits
+    index_of = {}
+    lowlink = {}
+    on_stack = set()
+    stack = []
+    components = []
+    counter = 0
+    for root in sorted(graph):
+        if root in index_of:
+            continue
+        work = [(root, iter(sorted(graph[root])))]
+        index_of[root] = lowlink[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack.add(root)
+        while work:
+            node, children = work[-1]
+            for child in children:
+                if child not in index_of:
+                    index_of[child] = lowlink[child] = counter
+                    counter += 1
+                    stack.append(child)
+                    on_stack.add(child)
+                    work.append((child, iter(sorted(graph[child]))))
+                    break
+                if child in on_stack:
+                    lowlink[node] = min(lowlink[node], index_of[child])
+            else:
+                work.pop()
+                if work:
+                    parent = work[-1][0]
+                    lowlink[parent] = min(lowlink[parent], lowlink[node])
+                if lowlink[node] == index_of[node]:
+                    component = []
+                    while True:
+                        member = stack.pop()
+                        on_stack.discard(member)
+                        component.append(member)
+                        if member == node:
+                            break
+                    components.append(sorted(component))
+
+    # Tarjan emits components dependencies-first; a component's batch is one
+    # past the deepest batch it depends on
+    component_of = {table: i for i, component in enumerate(components) for table in component}
+    level = {}
+    for i, component in enumerate(components):
+        deps = {component_of[dep] for table in component for dep in graph[table]} - {i}
+        level[i] = 1 + max((level[dep] for dep in deps), default=-1)
+
+    batches = [[] for _ in range(1 + max(level.values(), default=-1))]
+    for i, component in enumerate(components):
+        batches[level[i]].extend(component)
+    cycles = [component for component in components if len(component) > 1]
+    return [sorted(batch) for batch in batches], sorted(cycles)
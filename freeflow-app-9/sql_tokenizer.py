@@ -0,0 +1,323 @@
+#!/usr/bin/env python3
+"""
+Linear-time SQL statement splitter for the Supabase migrations.
+
+A single compiled master regex jumps between the only bytes that matter to
+statement boundaries: quotes, comment openers, dollar-quote tags, parentheses
+and semicolons. Everything in between is skipped inside the regex engine, so a
+migration is split into statements in one pass without a Python-level loop
+over every character.
+
+Understands `--` and nested `/* */` comments, '' doubled quotes, E'' strings
+with backslash escapes, "quoted identifiers" and $tag$ dollar-quoted bodies.
+Works on bytes or any buffer and reports byte offsets; open_sql() maps a
+file read-only so even multi-hundred-MB dumps are scanned with a few hundred
+bytes of scanner state instead of a copy of the whole file.
+
+Run directly to benchmark against the old char-by-char parenthesis walker:
+
+    python3 sql_tokenizer.py --benchmark [files...]
+"""
+
+import os
+import re
+import glob
+import mmap
+import time
+import argparse
+from contextlib import contextmanager
+from collections import namedtuple
+
+# One statement of a migration. `start`/`end` are byte offsets (end is just
+# past the `;` when `terminated`), `line` is the 1-based line of `start`,
+# `depth` the net parenthesis depth, `balanced` False if a `)` ever closed
+# nothing, and `unclosed` names a string/comment still open at end of file.
+Statement = namedtuple(
+    "Statement", ["start", "end", "line", "depth", "balanced", "terminated", "unclosed"]
+)
+
+# The only bytes that can hide a `;` or a parenthesis. Search stops on these
+# alone (no named groups, so the regex engine can use its literal prefilter);
+# quoted bodies are then consumed with a dedicated pattern and parentheses in
+# between are counted in bulk.
+TOKEN_RE = re.compile(rb"--|/\*|['\";]|\$(?:[A-Za-z_\x80-\xff][A-Za-z0-9_\x80-\xff]*)?\$")
+LINE_END_RE = re.compile(rb"[^\n]*")
+
+# Bodies of quoted constructs, matched from just after the opening quote
+STRING_BODY_RE = re.compile(rb"[^']*(?:''[^']*)*'")
+ESTRING_BODY_RE = re.compile(rb"[^'\\]*(?:(?:''|\\.)[^'\\]*)*'", re.DOTALL)
+IDENTIFIER_BODY_RE = re.compile(rb'[^"]*(?:""[^"]*)*"')
+ESTRING_PREFIX_RE = re.compile(rb"(?<![\w$])[eE]")
+
+PAREN_RE = re.compile(rb"[()]")
+KIND_RE = re.compile(
+    rb"([A-Za-z]+)(?:\s+(?:OR\s+REPLACE\s+|UNIQUE\s+|TEMP(?:ORARY)?\s+|UNLOGGED\s+|MATERIALIZED\s+)*([A-Za-z]+))?"
+)
+TWO_WORD_KINDS = {b"CREATE", b"ALTER", b"DROP", b"COMMENT"}
+COMMENT_DELIMITER_RE = re.compile(rb"/\*|\*/")
+# DDL nested in the dollar-quoted body of a DO block, e.g.
+# DO $$ BEGIN CREATE INDEX ...; EXCEPTION WHEN OTHERS THEN NULL; END $$;
+DOLLAR_BODY_RE = re.compile(rb"\$(\w*)\$(.*?)\$\1\$", re.DOTALL)
+NESTED_DDL_RE = re.compile(rb"(?<![\w'])(?:CREATE|ALTER|DROP)\s", re.IGNORECASE)
+WHITESPACE_RE = re.compile(rb"\s*")
+
+# mmap has no count(); larger spans are counted through slices of this size
+COUNT_CHUNK = 1 << 20
+# Scanned pages of a mapping are handed back to the OS in steps of this size
+RELEASE_STEP = 16 << 20
+
+
+@contextmanager
+def open_sql(path):
+    """Map `path` read-only for iter_statements(); yields b"" for an empty file.
+
+    Pages are faulted in as the scanner reaches them and, being backed by the
+    file, can be dropped again by the OS, so memory stays flat however large
+    the file is. Match objects over the buffer must not outlive the block.
+    """
+    with open(path, 'rb') as f:
+        if not os.fstat(f.fileno()).st_size:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            if hasattr(buf, "madvise") and hasattr(mmap, "MADV_SEQUENTIAL"):
+                buf.madvise(mmap.MADV_SEQUENTIAL)
+            yield buf
+
+
+def release_pages(buf, upto):
+    """Drop the mapped pages of `buf` before offset `upto` from this process.
+
+    The mapping is read-only and file-backed, so a page touched again later
+    (e.g. to read a statement's first keywords) is simply faulted back in.
+    """
+    if isinstance(buf, mmap.mmap) and hasattr(mmap, "MADV_DONTNEED"):
+        upto -= upto % mmap.PAGESIZE
+        if upto > 0:
+            buf.madvise(mmap.MADV_DONTNEED, 0, upto)
+
+
+def _count(buf, needle, begin, end):
+    """buf.count(needle, begin, end) for a single-byte needle on bytes or mmap."""
+    if isinstance(buf, bytes):
+        return buf.count(needle, begin, end)
+    total = 0
+    while begin < end:
+        stop = min(end, begin + COUNT_CHUNK)
+        total += buf[begin:stop].count(needle)
+        begin = stop
+    return total
+
+
+def _skip_block_comment(buf, pos):
+    """Return the offset past the `*/` closing a (possibly nested) comment, or None."""
+    depth = 1
+    while depth:
+        match = COMMENT_DELIMITER_RE.search(buf, pos)
+        if not match:
+            return None
+        depth += 1 if match.group() == b"/*" else -1
+        pos = match.end()
+    return pos
+
+
+def _count_parens(buf, begin, end, depth):
+    """Return (depth, underflowed) after the parentheses in buf[begin:end]."""
+    closes = _count(buf, b")", begin, end)
+    if not closes:
+        return depth + _count(buf, b"(", begin, end), False
+    if closes <= depth:
+        return depth + _count(buf, b"(", begin, end) - closes, False
+    # A `)` might close nothing: walk this stretch in order to find out
+    underflowed = False
+    for paren in PAREN_RE.finditer(buf, begin, end):
+        depth += 1 if paren.group() == b"(" else -1
+        underflowed = underflowed or depth < 0
+    return depth, underflowed
+
+
+def iter_statements(buf):
+    """Yield a Statement for every statement in `buf`, in order."""
+    size = len(buf)
+    pos = 0
+    mark = 0             # end of the last statement or of a comment between statements
+    start = None         # start of the current statement, once non-blank text is seen
+    line = 1
+    counted = 0          # newlines have been counted up to this offset
+    depth = 0
+    balanced = True
+
+    def first_text(limit):
+        # First non-blank byte between `mark` and `limit`, or None
+        first = WHITESPACE_RE.match(buf, mark, limit).end()
+        return first if first < limit else None
+
+    while True:
+        match = TOKEN_RE.search(buf, pos)
+        limit = match.start() if match else size
+        token = match.group() if match else b""
+        comment = token == b"--" or token == b"/*"
+        if start is None:
+            start = first_text(limit)
+            if start is None and match and not comment:
+                start = limit
+            if start is not None:
+                line += _count(buf, b"\n", counted, start)
+                counted = start
+        if start is not None and pos < limit:
+            depth, underflowed = _count_parens(buf, pos, limit, depth)
+            balanced = balanced and not underflowed
+        if not match:
+            break
+
+        if token == b";":
+            yield Statement(start, match.end(), line, depth, balanced and depth == 0, True, None)
+            pos = mark = match.end()
+            start = None
+            depth = 0
+            balanced = True
+            continue
+
+        if token == b"--":
+            end = LINE_END_RE.match(buf, limit).end()
+        elif token == b"/*":
+            end = _skip_block_comment(buf, match.end())
+            unclosed = "comment"
+        elif token == b'"':
+            body = IDENTIFIER_BODY_RE.match(buf, match.end())
+            end = body.end() if body else None
+            unclosed = "identifier"
+        elif token == b"'":
+            if limit and ESTRING_PREFIX_RE.match(buf, limit - 1):
+                body = ESTRING_BODY_RE.match(buf, match.end())
+            else:
+                body = STRING_BODY_RE.match(buf, match.end())
+            end = body.end() if body else None
+            unclosed = "string"
+        else:
+            end = buf.find(token, match.end())
+            end = None if end < 0 else end + len(token)
+            unclosed = "dollar-quote"
+        if end is None:
+            if start is None:
+                start = limit
+                line += _count(buf, b"\n", counted, start)
+            yield Statement(start, size, line, depth, False, False, unclosed)
+            return
+
+        pos = end
+        if start is None:
+            mark = pos
+
+    if start is not None:
+        yield Statement(start, size, line, depth, balanced and depth == 0, False, None)
+
+
+def statement_kind(buf, statement):
+    """Leading keywords of a statement, e.g. 'CREATE TABLE', 'ALTER TABLE' or 'INSERT'."""
+    match = KIND_RE.match(buf, statement.start, min(statement.end, statement.start + 128))
+    if not match:
+        return "UNKNOWN"
+    first = match.group(1).upper()
+    if first in TWO_WORD_KINDS and match.group(2):
+        return f"{first.decode()} {match.group(2).upper().decode()}"
+    return first.decode()
+
+
+def nested_statements(buf, statement):
+    """Yield (block, Statement) for each DDL statement inside a DO block's body.
+
+    Offsets of the yielded statements are relative to `block`, a bytes copy
+    of the body starting at that statement.
+    """
+    for body in DOLLAR_BODY_RE.finditer(buf[statement.start:statement.end]):
+        for ddl in NESTED_DDL_RE.finditer(body.group(2)):
+            block = body.group(2)[ddl.start():]
+            yield block, next(iter_statements(block))
+
+
+def split_statements(buf):
+    """Return the list of Statements in `buf`."""
+    return list(iter_statements(buf))
+
+
+def _legacy_paren_walk(content, open_paren):
+    """The char-by-char walker extract_create_table() used before this module."""
+    paren_count = 0
+    in_string = False
+    string_char = None
+    i = open_paren
+    while i < len(content):
+        char = content[i]
+        if char in ('"', "'") and (i == 0 or content[i - 1] != '\\'):
+            if not in_string:
+                in_string = True
+                string_char = char
+            elif char == string_char:
+                in_string = False
+                string_char = None
+        if not in_string:
+            if char == '(':
+                paren_count += 1
+            elif char == ')':
+                paren_count -= 1
+                if paren_count == 0:
+                    return i
+        i += 1
+    return None
+
+
+def benchmark(paths):
+    """Compare tokenizer throughput in MB/s with the legacy walker over every CREATE TABLE."""
+    create_table_re = re.compile(r'CREATE\s+TABLE\s+(?:IF\s+NOT\s+EXISTS\s+)?[\w."]+\s*\(', re.IGNORECASE)
+    blobs = []
+    for path in paths:
+        with open(path, 'rb') as f:
+            blobs.append(f.read())
+    total = sum(len(blob) for blob in blobs)
+    texts = [blob.decode('utf-8', errors='replace') for blob in blobs]
+
+    started = time.perf_counter()
+    statements = sum(len(split_statements(blob)) for blob in blobs)
+    tokenizer_s = time.perf_counter() - started
+
+    started = time.perf_counter()
+    walked = 0
+    walked_bytes = 0
+    for text in texts:
+        for match in create_table_re.finditer(text):
+            end = _legacy_paren_walk(text, match.end() - 1)
+            walked += 1
+            walked_bytes += (end if end is not None else len(text)) - match.end()
+    legacy_s = time.perf_counter() - started
+
+    mb = total / (1024 * 1024)
+    legacy_mb = walked_bytes / (1024 * 1024)
+    print(f"Input: {len(paths)} files, {mb:.2f} MB")
+    print(f"Tokenizer:     {tokenizer_s:.3f}s  {mb / tokenizer_s:8.1f} MB/s"
+          f"  ({statements} statements, whole files)")
+    print(f"Legacy walker: {legacy_s:.3f}s  {legacy_mb / legacy_s:8.1f} MB/s"
+          f"  ({walked} CREATE TABLE bodies, {legacy_mb:.2f} MB walked)")
+    print(f"Throughput ratio: {(mb / tokenizer_s) / (legacy_mb / legacy_s):.1f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Split SQL files into statements")
+    parser.add_argument("files", nargs="*", help="SQL files (default: all migrations)")
+    parser.add_argument("--benchmark", action="store_true",
+                        help="measure throughput against the legacy parenthesis walker")
+    args = parser.parse_args()
+    files = args.files or sorted(glob.glob(os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "supabase", "migrations", "*.sql")))
+    if args.benchmark:
+        benchmark(files)
+    else:
+        for path in files:
+            with open_sql(path) as buf:
+                for statement in iter_statements(buf):
+                    status = "ok" if statement.terminated and statement.balanced else "!!"
+                    print(f"{path}:{statement.line}: {status} bytes {statement.start}-{statement.end}")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,14 +2,183 @@
 """
 KAZI Platform Comprehensive Browser Testing
 Using Playwright for interactive testing
+
+Every check runs on a pool of browser contexts (browser_pool.py), so the
+routes load --concurrency at a time. --all-routes checks every page in the
+app/ tree instead of the major pages (smoke_routes.py), and --shard i/N
+only the i-th of N slices of it; the feature checks run in shard 1. Each
+route's timings, paint metrics, bytes and heap are written to
+test-results/metrics/ as JSON and CSV per run and gated on perf-budgets.json
+and perf-baseline.json, the committed medians of the last green run
+(route_budgets.py):
+
+    python3 test-browser-mcp.py --concurrency 6
+    python3 test-browser-mcp.py --shard 3/8
+    python3 test-browser-mcp.py --samples 5
 """
 
-import asyncio
 import sys
+import time
+import asyncio
+import argparse
+from functools import partial
 from playwright.async_api import async_playwright
 
-async def test_kazi_platform():
-    """Comprehensive browser test for KAZI platform"""
+from browser_pool import (
+    BASE_URL, DEFAULT_CONCURRENCY, Check, add_pool_arguments, goto_ready, run_checks, wait_for_ready
+)
+from route_budgets import (
+    BASELINE_FILE, BUDGET_FILE, check_budgets, load_baseline, load_budgets, print_baseline_gaps, print_findings,
+    summarize, update_baseline
+)
+from route_metrics import METRICS_DIR, measure, print_slowest, write_run
+from smoke_routes import parse_shard, shard_routes, smoke_routes
+
+# Test 6: All major pages load
+PAGES_TO_TEST = [
+    ("/dashboard/projects-hub", "Projects Hub"),
+    ("/dashboard/video-studio", "Video Studio"),
+    ("/dashboard/financial", "Financial Hub"),
+    ("/dashboard/community-hub", "Community Hub"),
+    ("/dashboard/analytics", "Analytics"),
+    ("/dashboard/my-day", "My Day"),
+    ("/dashboard/canvas", "Canvas"),
+    ("/dashboard/bookings", "Bookings"),
+]
+
+
+async def check_homepage(page, base_url):
+    """Test 1: Homepage"""
+    await goto_ready(page, f"{base_url}/", timeout=10000, required=True)
+
+    title = await page.title()
+    has_kazi = "KAZI" in await page.content()
+
+    return "✅ PASS" if has_kazi else "❌ FAIL", [
+        f"Title: {title}",
+        f"Contains KAZI branding: {has_kazi}"
+    ]
+
+
+async def check_dashboard(page, base_url):
+    """Test 2: Dashboard with micro-features"""
+    await goto_ready(page, f"{base_url}/dashboard", required=True)
+    await page.wait_for_selector('h1', timeout=15000)
+
+    welcome_text = await page.locator('h1:has-text("Welcome to KAZI")').count()
+    stats_cards = await page.locator('text="Total Earnings"').count()
+
+    return "✅ PASS" if welcome_text > 0 else "❌ FAIL", [
+        f"Welcome heading visible: {welcome_text > 0}",
+        f"Stats cards present: {stats_cards > 0}"
+    ]
+
+
+async def check_ai_create(page, base_url):
+    """Test 3: AI Create Studio with 12 models"""
+    await goto_ready(page, f"{base_url}/dashboard/ai-create", required=True)
+
+    content = await page.content()
+    has_ai_create = "AI Create" in content or "GPT" in content
+
+    # Check for model mentions
+    model_checks = {
+        "GPT-4o": "GPT-4o" in content or "gpt-4o" in content,
+        "Claude": "Claude" in content,
+        "Gemini": "Gemini" in content,
+        "DALL-E": "DALL-E" in content or "dall-e" in content,
+        "Midjourney": "Midjourney" in content or "midjourney" in content,
+    }
+
+    models_found = sum(1 for found in model_checks.values() if found)
+
+    return "✅ PASS" if has_ai_create else "❌ FAIL", [
+        f"AI Create page loaded: {has_ai_create}",
+        f"Models found: {models_found}/5 key models",
+    ] + [f"{model}: {'✅' if found else '❌'}" for model, found in model_checks.items()]
+
+
+async def check_ups_system(page, base_url):
+    """Test 4: Universal Pinpoint System"""
+    await goto_ready(page, f"{base_url}/dashboard/collaboration", required=True)
+
+    # Click Feedback tab
+    feedback_tab = page.locator('button:has-text("Feedback")')
+    if await feedback_tab.count() > 0:
+        await feedback_tab.click()
+        await wait_for_ready(page)
+
+    has_ups = await page.locator('text="Universal Pinpoint System"').count()
+    has_stats = await page.locator('text="97.3%"').count()
+    has_response_time = await page.locator('text="18s"').count()
+    has_satisfaction = await page.locator('text="9.1/10"').count()
+
+    return "✅ PASS" if has_ups > 0 else "❌ FAIL", [
+        f"UPS title visible: {has_ups > 0}",
+        f"AI Accuracy stat (97.3%): {has_stats > 0}",
+        f"Response time stat (18s): {has_response_time > 0}",
+        f"Satisfaction stat (9.1/10): {has_satisfaction > 0}"
+    ]
+
+
+async def check_micro_features(page, base_url):
+    """Test 5: Micro Features Showcase"""
+    await goto_ready(page, f"{base_url}/dashboard/micro-features-showcase", required=True)
+
+    has_title = await page.locator('text=/Micro.*Features/i').count()
+    has_animations_tab = await page.locator('button:has-text("Animations")').count()
+    has_interactions_tab = await page.locator('button:has-text("Interactions")').count()
+    has_feedback_tab = await page.locator('button:has-text("Feedback")').count()
+    has_accessibility_tab = await page.locator('button:has-text("Accessibility")').count()
+
+    # Test tab interaction
+    if has_interactions_tab > 0:
+        await page.locator('button:has-text("Interactions")').click()
+        await wait_for_ready(page)
+        has_magnetic_btn = await page.locator('text="Magnetic"').count()
+    else:
+        has_magnetic_btn = 0
+
+    return "✅ PASS" if has_title > 0 else "❌ FAIL", [
+        f"Page loaded: {has_title > 0}",
+        f"Animations tab: {has_animations_tab > 0}",
+        f"Interactions tab: {has_interactions_tab > 0}",
+        f"Feedback tab: {has_feedback_tab > 0}",
+        f"Accessibility tab: {has_accessibility_tab > 0}",
+        f"Interactive buttons: {has_magnetic_btn > 0}"
+    ]
+
+
+async def check_major_page(page, base_url, test_page):
+    """One of the major pages loads with content and without errors"""
+    await goto_ready(page, f"{base_url}{test_page}", timeout=12000, required=True)
+
+    # Check for errors
+    has_error = await page.locator('text=/error|failed/i').count()
+    has_content = len(await page.content()) > 1000
+
+    return has_error == 0 and has_content
+
+
+SUITE_CHECKS = [
+    ("homepage", "Homepage", check_homepage),
+    ("dashboard", "Dashboard", check_dashboard),
+    ("ai_create", "AI Create", check_ai_create),
+    ("ups_system", "UPS System", check_ups_system),
+    ("micro_features", "Micro Features", check_micro_features),
+]
+
+
+async def test_kazi_platform(base_url=BASE_URL, concurrency=DEFAULT_CONCURRENCY,
+                             pages_to_test=PAGES_TO_TEST, features=True, metrics=None, samples=1):
+    """Comprehensive browser test for KAZI platform
+
+    `pages_to_test` are the (path, name) pairs of the all_pages check, each
+    loaded `samples` times; a page passes when every sample does.
+    features=False leaves out the feature checks and their results. Every
+    check is measured (route_metrics.py); pass a list as `metrics` to
+    receive one row per check and sample.
+    """
     results = {
         "homepage": {"status": "pending", "details": []},
         "dashboard": {"status": "pending", "details": []},
@@ -18,185 +187,89 @@ async def test_kazi_platform():
         "micro_features": {"status": "pending", "details": []},
         "all_pages": {"status": "pending", "details": []}
     }
-
+    if not features:
+        results = {"all_pages": results["all_pages"]}
+
+    checks = [Check(key, partial(measure, run=partial(check, base_url=base_url)))
+              for key, _, check in SUITE_CHECKS if key in results]
+    # Samples of one page are a whole pass apart, never loaded side by side
+    checks += [Check(test_page, partial(measure, run=partial(check_major_page, base_url=base_url, test_page=test_page)))
+               for _ in range(samples) for test_page, _ in pages_to_test]
+    labels = {key: label for key, label, _ in SUITE_CHECKS}
+    labels.update((test_page, page_name) for test_page, page_name in pages_to_test)
+
+    def report(outcome):
+        if outcome.error:
+            print(f"   ❌ {labels[outcome.name]} - Error: {outcome.error}")
+        elif outcome.name in results:
+            print(f"   {labels[outcome.name]}: {outcome.value[0][0]} ({outcome.seconds:.1f}s)")
+        else:
+            print(f"      {'✅' if outcome.value[0] else '❌'} {labels[outcome.name]} ({outcome.seconds:.1f}s)")
+
+    print(f"🧪 Testing {len(checks)} routes, {concurrency} at a time...")
     async with async_playwright() as p:
         browser = await p.chromium.launch(headless=True)
-        context = await browser.new_context(viewport={'width': 1920, 'height': 1080})
-        page = await context.new_page()
-
-        BASE_URL = "http://localhost:9323"
-
         try:
-            # Test 1: Homepage
-            print("🧪 Testing Homepage...")
-            await page.goto(f"{BASE_URL}/")
-            await page.wait_for_load_state('networkidle', timeout=10000)
-
-            title = await page.title()
-            has_kazi = "KAZI" in await page.content()
-
-            results["homepage"]["status"] = "✅ PASS" if has_kazi else "❌ FAIL"
-            results["homepage"]["details"] = [
-                f"Title: {title}",
-                f"Contains KAZI branding: {has_kazi}"
-            ]
-            print(f"   Homepage: {results['homepage']['status']}")
-
-            # Test 2: Dashboard with micro-features
-            print("🧪 Testing Dashboard...")
-            await page.goto(f"{BASE_URL}/dashboard")
-            await page.wait_for_selector('h1', timeout=15000)
-
-            welcome_text = await page.locator('h1:has-text("Welcome to KAZI")').count()
-            stats_cards = await page.locator('text="Total Earnings"').count()
-
-            results["dashboard"]["status"] = "✅ PASS" if welcome_text > 0 else "❌ FAIL"
-            results["dashboard"]["details"] = [
-                f"Welcome heading visible: {welcome_text > 0}",
-                f"Stats cards present: {stats_cards > 0}"
-            ]
-            print(f"   Dashboard: {results['dashboard']['status']}")
-
-            # Test 3: AI Create Studio with 12 models
-            print("🧪 Testing AI Create Studio (12 AI Models)...")
-            await page.goto(f"{BASE_URL}/dashboard/ai-create")
-            await page.wait_for_load_state('networkidle', timeout=15000)
-
-            content = await page.content()
-            has_ai_create = "AI Create" in content or "GPT" in content
-
-            # Check for model mentions
-            model_checks = {
-                "GPT-4o": "GPT-4o" in content or "gpt-4o" in content,
-                "Claude": "Claude" in content,
-                "Gemini": "Gemini" in content,
-                "DALL-E": "DALL-E" in content or "dall-e" in content,
-                "Midjourney": "Midjourney" in content or "midjourney" in content,
-            }
-
-            models_found = sum(1 for found in model_checks.values() if found)
-
-            results["ai_create"]["status"] = "✅ PASS" if has_ai_create else "❌ FAIL"
-            results["ai_create"]["details"] = [
-                f"AI Create page loaded: {has_ai_create}",
-                f"Models found: {models_found}/5 key models",
-            ] + [f"{model}: {'✅' if found else '❌'}" for model, found in model_checks.items()]
-            print(f"   AI Create: {results['ai_create']['status']}")
-
-            # Test 4: Universal Pinpoint System
-            print("🧪 Testing Universal Pinpoint System (UPS)...")
-            await page.goto(f"{BASE_URL}/dashboard/collaboration")
-            await page.wait_for_load_state('networkidle', timeout=15000)
-
-            # Click Feedback tab
-            feedback_tab = page.locator('button:has-text("Feedback")')
-            if await feedback_tab.count() > 0:
-                await feedback_tab.click()
-                await page.wait_for_timeout(1000)
-
-            has_ups = await page.locator('text="Universal Pinpoint System"').count()
-            has_stats = await page.locator('text="97.3%"').count()
-            has_response_time = await page.locator('text="18s"').count()
-            has_satisfaction = await page.locator('text="9.1/10"').count()
-
-            results["ups_system"]["status"] = "✅ PASS" if has_ups > 0 else "❌ FAIL"
-            results["ups_system"]["details"] = [
-                f"UPS title visible: {has_ups > 0}",
-                f"AI Accuracy stat (97.3%): {has_stats > 0}",
-                f"Response time stat (18s): {has_response_time > 0}",
-                f"Satisfaction stat (9.1/10): {has_satisfaction > 0}"
-            ]
-            print(f"   UPS System: {results['ups_system']['status']}")
-
-            # Test 5: Micro Features Showcase
-            print("🧪 Testing Micro Features Showcase...")
-            await page.goto(f"{BASE_URL}/dashboard/micro-features-showcase")
-            await page.wait_for_load_state('networkidle', timeout=15000)
-
-            has_title = await page.locator('text=/Micro.*Features/i').count()
-            has_animations_tab = await page.locator('button:has-text("Animations")').count()
-            has_interactions_tab = await page.locator('button:has-text("Interactions")').count()
-            has_feedback_tab = await page.locator('button:has-text("Feedback")').count()
-            has_accessibility_tab = await page.locator('button:has-text("Accessibility")').count()
-
-            # Test tab interaction
-            if has_interactions_tab > 0:
-                await page.locator('button:has-text("Interactions")').click()
-                await page.wait_for_timeout(500)
-                has_magnetic_btn = await page.locator('text="Magnetic"').count()
-            else:
-                has_magnetic_btn = 0
-
-            results["micro_features"]["status"] = "✅ PASS" if has_title > 0 else "❌ FAIL"
-            results["micro_features"]["details"] = [
-                f"Page loaded: {has_title > 0}",
-                f"Animations tab: {has_animations_tab > 0}",
-                f"Interactions tab: {has_interactions_tab > 0}",
-                f"Feedback tab: {has_feedback_tab > 0}",
-                f"Accessibility tab: {has_accessibility_tab > 0}",
-                f"Interactive buttons: {has_magnetic_btn > 0}"
-            ]
-            print(f"   Micro Features: {results['micro_features']['status']}")
-
-            # Test 6: All major pages load
-            print("🧪 Testing All Major Pages...")
-            pages_to_test = [
-                ("/dashboard/projects-hub", "Projects Hub"),
-                ("/dashboard/video-studio", "Video Studio"),
-                ("/dashboard/financial", "Financial Hub"),
-                ("/dashboard/community-hub", "Community Hub"),
-                ("/dashboard/analytics", "Analytics"),
-                ("/dashboard/my-day", "My Day"),
-                ("/dashboard/canvas", "Canvas"),
-                ("/dashboard/bookings", "Bookings"),
-            ]
-
-            pages_passed = 0
-            page_results = []
-
-            for test_page, page_name in pages_to_test:
-                try:
-                    await page.goto(f"{BASE_URL}{test_page}", timeout=12000)
-                    await page.wait_for_load_state('networkidle', timeout=10000)
-
-                    # Check for errors
-                    has_error = await page.locator('text=/error|failed/i').count()
-                    has_content = len(await page.content()) > 1000
-
-                    passed = has_error == 0 and has_content
-
-                    if passed:
-                        pages_passed += 1
-
-                    status = "✅" if passed else "❌"
-                    page_results.append(f"{status} {page_name}")
-                    print(f"      {status} {page_name}")
-
-                except Exception as e:
-                    page_results.append(f"❌ {page_name} - Timeout/Error")
-                    print(f"      ❌ {page_name} - Error")
-
-            results["all_pages"]["status"] = f"{'✅ PASS' if pages_passed >= 6 else '⚠️  PARTIAL'} ({pages_passed}/{len(pages_to_test)})"
-            results["all_pages"]["details"] = page_results
-            print(f"   All Pages: {results['all_pages']['status']}")
-
-        except Exception as e:
-            print(f"❌ Test error: {str(e)}")
-            import traceback
-            traceback.print_exc()
-
+            outcomes = await run_checks(browser, checks, concurrency, on_done=report)
         finally:
             await browser.close()
 
+    page_samples = {}
+    for outcome in outcomes:
+        value, row = outcome.value or (None, {"route": None if outcome.name in results else outcome.name})
+        if outcome.name in results:
+            if outcome.error:
+                results[outcome.name]["status"] = "❌ FAIL"
+                results[outcome.name]["details"] = [f"Error: {outcome.error}"]
+            else:
+                results[outcome.name]["status"], results[outcome.name]["details"] = value
+            ok = outcome.error is None and "PASS" in value[0]
+        else:
+            ok = outcome.error is None and bool(value)
+            page_samples.setdefault(outcome.name, []).append(None if outcome.error else ok)
+        if metrics is not None:
+            metrics.append(dict(row, check=labels[outcome.name], sample=len(page_samples.get(outcome.name, ())),
+                                ok=ok, seconds=round(outcome.seconds, 2)))
+
+    pages_passed = 0
+    page_results = []
+    for test_page, page_name in pages_to_test:
+        oks = page_samples[test_page]
+        counts = f" ({sum(1 for ok in oks if ok)}/{len(oks)} samples)" if len(oks) > 1 else ""
+        if all(oks):
+            pages_passed += 1
+            page_results.append(f"✅ {page_name}{counts}")
+        elif all(ok is None for ok in oks):
+            page_results.append(f"❌ {page_name} - Timeout/Error")
+        else:
+            page_results.append(f"❌ {page_name}{counts}")
+
+    # At least three in four pages (6 of the 8 major ones) must pass
+    passed = pages_passed * 4 >= len(pages_to_test) * 3
+    results["all_pages"]["status"] = f"{'✅ PASS' if passed else '⚠️  PARTIAL'} ({pages_passed}/{len(pages_to_test)})"
+    results["all_pages"]["details"] = page_results
+    print(f"   All Pages: {results['all_pages']['status']}")
+
     return results
 
-async def main():
+async def main(args):
     """Main test runner"""
     print("\n" + "="*70)
     print("🚀 KAZI PLATFORM - COMPREHENSIVE BROWSER TEST SUITE")
     print("="*70 + "\n")
 
-    results = await test_kazi_platform()
+    pages_to_test, features = PAGES_TO_TEST, True
+    if args.all_routes or args.shard:
+        routes, skipped = smoke_routes()
+        if args.shard:
+            routes = shard_routes(routes, args.shard)
+            features = args.shard[0] == 1
+        pages_to_test = [(route, route) for route in routes]
+        print(f"📋 {len(routes)} routes from app/ ({len(skipped)} dynamic routes without fixtures skipped)\n")
+
+    started = time.perf_counter()
+    metrics = []
+    results = await test_kazi_platform(args.base_url, args.concurrency, pages_to_test, features, metrics, args.samples)
 
     # Print detailed summary
     print("\n" + "="*70)
@@ -214,12 +287,53 @@ async def main():
     total = len(results)
 
     print("\n" + "="*70)
-    print(f"🏆 FINAL SCORE: {full_passes}/{total} fully passed, {partial_passes} partial")
+    print(f"🏆 FINAL SCORE: {full_passes}/{total} fully passed, {partial_passes} partial "
+          f"in {time.perf_counter() - started:.1f}s")
     print("="*70)
 
+    # A shard without the feature checks only has all_pages
+    functional_ok = full_passes >= (4 if features else 1)
+    findings = []
+    if args.metrics_dir:
+        print_slowest(metrics)
+        path = write_run(metrics, {
+            "started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+            "base_url": args.base_url,
+            "concurrency": args.concurrency,
+            "shard": f"{args.shard[0]}/{args.shard[1]}" if args.shard else None,
+            "samples": args.samples,
+        }, args.metrics_dir)
+        print(f"\n📊 Metrics for {len(metrics)} checks: {path} (and .csv)")
+
+        # Slower than budget or than the last green run is a failure too
+        tolerance, budgets = load_budgets(args.budgets)
+        summary = summarize(row for row in metrics if row["ok"])
+        baseline = load_baseline(args.baseline)
+        findings = check_budgets(summary, budgets, baseline, tolerance)
+        print_baseline_gaps(summary, baseline, args.baseline)
+        print_findings(findings, args.samples)
+        if functional_ok and not findings:
+            update_baseline(summary, args.baseline)
+            print(f"📌 Baseline updated for {len(summary)} routes: {args.baseline}")
+
     # Return exit code
-    return 0 if full_passes >= 4 else 1
+    return 0 if functional_ok and not findings else 1
 
 if __name__ == "__main__":
-    exit_code = asyncio.run(main())
+    parser = argparse.ArgumentParser(description="KAZI platform browser smoke tests")
+    add_pool_arguments(parser)
+    parser.add_argument("--all-routes", action="store_true",
+                        help="check every page route in app/ instead of the major pages")
+    parser.add_argument("--shard", type=parse_shard, metavar="i/N",
+                        help="check only shard i of N of every page route (implies --all-routes)")
+    parser.add_argument("--metrics-dir", default=METRICS_DIR,
+                        help="where each run's metrics JSON and CSV go (default: test-results/metrics)")
+    parser.add_argument("--no-metrics", dest="metrics_dir", action="store_const", const=None,
+                        help="do not write metrics files or check budgets")
+    parser.add_argument("--samples", type=int, default=1,
+                        help="load every page N times and gate on the median (default: 1)")
+    parser.add_argument("--budgets", default=BUDGET_FILE, help="budget file (default: perf-budgets.json)")
+    parser.add_argument("--baseline", default=BASELINE_FILE,
+                        help="medians of the last green run (default: perf-baseline.json)")
+    exit_code = asyncio.run(main(parser.parse_args()))
     sys.exit(exit_code)
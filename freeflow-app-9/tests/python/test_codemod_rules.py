@@ -0,0 +1,116 @@
+import pytest
+
+import codemod_rules
+from codemod import RuleSet
+from codemod_rules import build_rule_set, enhance_rules
+
+SONNER_IMPORT = "import { toast } from 'sonner'\n"
+REMOVED_IMPORT = "// import { toast } from 'sonner' // Removed - using alert() for user feedback\n"
+
+
+def enhance(text):
+    return enhance_rules().apply(text, "app/(app)/dashboard/x/page.tsx")
+
+
+def test_toast_calls_become_console_log_and_alert():
+    text = SONNER_IMPORT + (
+        "toast.success('Saved')\n"
+        "toast(`Hi ${name}`)\n"
+        "toast.error(\"Name is required\")\n"
+        "toast.error('Upload failed')\n"
+    )
+    new_text, counts = enhance(text)
+    assert new_text == REMOVED_IMPORT + (
+        "console.log('✅ Saved')\n"
+        "console.log(`📢 Hi ${name}`)\n"
+        "alert('❌ Error\\n\\nName is required')\n"
+        "console.log('❌ Upload failed')\n"
+    )
+    assert counts == {"toast-import-sonner": 1, "toast-success": 1, "toast-default": 1, "toast-error": 2}
+
+
+def test_calls_with_options_are_left_alone():
+    text = "toast.success('Saved', { description: 'Done' })\ntoast.promise(save())\n"
+    assert enhance(text) == (text, {})
+
+
+@pytest.mark.parametrize("usage", [
+    "toast.success('Saved', { description: 'Done' })",
+    "toast.promise(save(), { loading: 'Saving' })",
+    "const notify = toast",
+    "toast.success(message)",
+])
+def test_toast_import_stays_while_toast_is_used(usage):
+    text = SONNER_IMPORT + "toast.info('Loaded')\n" + usage + "\n"
+    new_text, counts = enhance(text)
+    assert new_text.startswith(SONNER_IMPORT)
+    assert "toast-import-sonner" not in counts
+    assert "console.log('ℹ️ Loaded')" in new_text
+
+
+def test_toast_in_comments_and_strings_is_not_a_use():
+    text = SONNER_IMPORT + "// toast.success('old', {})\nconst s = \"toast(x)\"\ntoast.warning('Careful')\n"
+    new_text, counts = enhance(text)
+    assert new_text == REMOVED_IMPORT + "// toast.success('old', {})\nconst s = \"toast(x)\"\nconsole.log('⚠️ Careful')\n"
+    assert counts == {"toast-import-sonner": 1, "toast-warning": 1}
+
+
+def test_lookalike_calls_are_left_alone():
+    text = "mytoast('a')\nobj.toast('b')\n"
+    assert enhance(text) == (text, {})
+
+
+def test_action_buttons_get_unique_test_ids():
+    text = (
+        '<div>\n'
+        '  <Button onClick={() => save()}>Save</Button>\n'
+        '  <button className="x">Export Report</button>\n'
+        '  <Button>Save</Button>\n'
+        '  <Button data-testid="kept">Delete</Button>\n'
+        '  <Button aria-label="Close" />\n'
+        '  <Button>Address</Button>\n'
+        '</div>\n'
+    )
+    new_text, counts = codemod_rules.test_id_rules().apply(text, "app/page.tsx")
+    assert '<Button onClick={() => save()} data-testid="save-btn">Save</Button>' in new_text
+    assert '<button className="x" data-testid="export-report-btn">Export Report</button>' in new_text
+    assert '<Button data-testid="save-btn-2">Save</Button>' in new_text
+    assert '<Button data-testid="kept">Delete</Button>' in new_text
+    assert '<Button aria-label="Close" data-testid="cancel-btn" />' in new_text
+    assert '<Button>Address</Button>' in new_text
+    assert counts == {"save-btn": 2, "export-btn": 1, "cancel-btn": 1}
+
+
+def test_plugin_marketplace_buttons_only_in_their_page():
+    text = ('<div>\n'
+            '  <button onClick={() => uninstallPlugin(p.id)}>Remove</button>\n'
+            '  <button onClick={() => installPlugin(p.id)}>Get</button>\n'
+            '</div>\n')
+    path = "app/(app)/dashboard/plugin-marketplace/page.tsx"
+    new_text, counts = codemod_rules.test_id_rules().apply(text, path)
+    assert 'uninstallPlugin(p.id)} data-testid="uninstall-plugin-btn">' in new_text
+    assert 'installPlugin(p.id)} data-testid="install-plugin-btn">' in new_text
+    assert counts == {"uninstall-plugin-btn": 1, "install-plugin-btn": 1}
+    assert "plugin-btn" not in codemod_rules.test_id_rules().apply(text, "app/page.tsx")[0]
+
+
+def test_first_registered_rule_wins_and_rules_never_see_each_others_output():
+    rules = RuleSet("t")
+    rules.add("ab", r"ab", "X")
+    rules.add("a", r"a", "ab")
+    rules.add("b", r"b(\d)", r"<\1>")
+    assert rules.apply("ab a b7", None) == ("X ab <7>", {"ab": 1, "a": 1, "b": 1})
+
+
+def test_rules_skip_matches_outside_code():
+    rules = RuleSet("t")
+    rules.add("x", r"foo", "bar")
+    text = "foo('foo') // foo\n`foo ${foo}`"
+    assert rules.apply(text, None)[0] == "bar('foo') // foo\n`foo ${bar}`"
+
+
+def test_build_rule_set_rejects_unknown_names():
+    assert len(build_rule_set(["enhance", "test-ids"]).rules) == len(enhance_rules().rules) + len(
+        codemod_rules.test_id_rules().rules)
+    with pytest.raises(ValueError):
+        build_rule_set(["enhance", "nope"])
@@ -0,0 +1,53 @@
+import io
+
+from extract_tables import extract_records, order_records, write_consolidated
+from migration_index import TableDefinition
+
+RECORDS = [
+    ("a", "1.sql", "CREATE TABLE a (id int PRIMARY KEY, b_id int REFERENCES b(id));"),
+    ("b", "1.sql", "CREATE TABLE b (id int PRIMARY KEY, a_id int REFERENCES a(id));"),
+    ("c", "1.sql", "CREATE TABLE c (id int PRIMARY KEY);"),
+    ("d", "2.sql", "CREATE TABLE d (id int PRIMARY KEY, c_id int REFERENCES c(id), u uuid REFERENCES users(id));"),
+    ("e", None, None),
+]
+
+
+def consolidated(records):
+    ordered, batch_of, cycles, external = order_records(records)
+    out = io.StringIO()
+    found, missing = write_consolidated(out, ordered, len(records), batch_of, cycles, external)
+    return out.getvalue(), found, missing
+
+
+def test_tables_follow_the_tables_they_reference():
+    ordered, batch_of, cycles, external = order_records(RECORDS)
+    assert [record[0] for record in ordered] == ["a", "b", "c", "d", "e"]
+    assert batch_of == {"a": 1, "b": 1, "c": 1, "d": 2}
+    assert cycles == [["a", "b"]]
+    assert external == {"d": ["users"]}
+
+
+def test_batch_headers_name_foreign_key_cycles():
+    text, found, missing = consolidated(RECORDS)
+    assert (found, missing) == (4, ["e"])
+    first, second = text.split("-- BATCH ")[1:]
+    assert first.startswith("1/2: 3 tables\n-- Depends only on earlier batches, but contains foreign key cycles:\n"
+                            "-- - a <-> b\n")
+    assert "tables in this batch are independent" not in first
+    assert first.count("WARNING: part of a foreign key cycle") == 2
+    assert second.startswith("2/2: 1 tables\n-- Depends only on earlier batches; tables in this batch are independent\n")
+    assert "-- - d -> users" in second
+
+
+def test_consolidation_uses_the_latest_definition(tmp_path):
+    index = {}
+    for name, sql in (("20240101_old.sql", "CREATE TABLE t (id int);"),
+                      ("20241201_new.sql", "CREATE TABLE IF NOT EXISTS t (id int, name text);"),
+                      ("20240601_mid.sql", "CREATE TABLE t (id int, note text);")):
+        path = tmp_path / name
+        path.write_text(sql)
+        index.setdefault("t", []).append(TableDefinition("t", str(path), 0, len(sql), 1))
+    assert list(extract_records(["T", "missing"], index, log=lambda *values: None)) == [
+        ("T", "20241201_new.sql", "CREATE TABLE IF NOT EXISTS t (id int, name text);"),
+        ("missing", None, None),
+    ]
@@ -0,0 +1,72 @@
+import json
+
+from route_budgets import (
+    Finding, budget_for, check_budgets, load_baseline, load_budgets, percentile, print_baseline_gaps, summarize,
+    update_baseline
+)
+
+
+def row(route, **metrics):
+    return dict(route=route, ok=True, **metrics)
+
+
+def test_summarize_takes_median_and_nearest_rank_p95_per_route():
+    rows = [row("/a", lcp_ms=value) for value in (100, 300, 200, 1000)] + [
+        row("/b", lcp_ms=50, cls=None),
+        row("", lcp_ms=1),
+    ]
+    summary = summarize(rows)
+    assert summary == {"/a": {"lcp_ms": (250, 1000, 4)}, "/b": {"lcp_ms": (50, 50, 1)}}
+    assert percentile(list(range(1, 21)), 0.95) == 19
+
+
+def test_first_matching_glob_sets_the_budget():
+    budgets = [("/dashboard/*", {"lcp_ms": 4000}), ("*", {"lcp_ms": 3000})]
+    assert budget_for("/dashboard/files/upload", budgets) == {"lcp_ms": 4000}
+    assert budget_for("/", budgets) == {"lcp_ms": 3000}
+    assert budget_for("/", budgets[:1]) == {}
+
+
+def test_load_budgets(tmp_path):
+    assert load_budgets(str(tmp_path / "missing.json")) == (0.15, [])
+    path = tmp_path / "perf-budgets.json"
+    path.write_text(json.dumps({"tolerance": 0.1, "budgets": [{"route": "*", "lcp_ms": 3000}]}))
+    assert load_budgets(str(path)) == (0.1, [("*", {"lcp_ms": 3000})])
+
+
+def test_median_over_budget_fails():
+    summary = summarize([row("/a", lcp_ms=value) for value in (2000, 2500, 9000)])
+    assert check_budgets(summary, [("*", {"lcp_ms": 3000})], {}) == []
+    assert check_budgets(summary, [("*", {"lcp_ms": 2400})], {"/a": {"lcp_ms": 2450}}) == [
+        Finding("/a", "lcp_ms", "budget", 2450, 2500, 9000, 2400)
+    ]
+
+
+def test_regression_needs_tolerance_and_min_delta():
+    baseline = {"/a": {"lcp_ms": 1000, "fcp_ms": 20}}
+    summary = summarize([row("/a", lcp_ms=1140, fcp_ms=40)])
+    assert check_budgets(summary, [], baseline) == []
+
+    summary = summarize([row("/a", lcp_ms=1200, fcp_ms=40, js_bytes=10 ** 6)])
+    assert check_budgets(summary, [], baseline) == [
+        Finding("/a", "lcp_ms", "regression", 1000, 1200, 1200, 1000 * 1.15)
+    ]
+    assert check_budgets(summary, [], baseline, tolerance=0.25) == []
+
+
+def test_green_runs_refresh_only_the_routes_they_measured(tmp_path):
+    path = str(tmp_path / "metrics" / "baseline.json")
+    assert load_baseline(path) == {}
+    update_baseline(summarize([row("/a", lcp_ms=100), row("/b", lcp_ms=200)]), path)
+    update_baseline(summarize([row("/a", lcp_ms=300, cls=0.1)]), path)
+    assert load_baseline(path) == {"/a": {"lcp_ms": 300, "cls": 0.1}, "/b": {"lcp_ms": 200}}
+
+
+def test_routes_without_a_baseline_are_reported(tmp_path, capsys):
+    summary = summarize([row("/a", lcp_ms=100), row("/b", lcp_ms=200)])
+    print_baseline_gaps(summary, {}, str(tmp_path / "perf-baseline.json"))
+    assert "regressions are not checked" in capsys.readouterr().out
+    print_baseline_gaps(summary, {"/a": {"lcp_ms": 100}})
+    assert "1 routes have no baseline yet" in capsys.readouterr().out
+    print_baseline_gaps(summary, {"/a": {}, "/b": {}})
+    assert capsys.readouterr().out == ""
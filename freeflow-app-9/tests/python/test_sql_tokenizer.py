@@ -0,0 +1,60 @@
+from sql_tokenizer import nested_statements, split_statements, statement_kind
+
+
+def texts(sql):
+    return [sql[s.start:s.end].decode() for s in split_statements(sql)]
+
+
+def test_splits_on_top_level_semicolons():
+    sql = b"CREATE TABLE a (id int);\n\nINSERT INTO a VALUES (1);  "
+    assert texts(sql) == ["CREATE TABLE a (id int);", "INSERT INTO a VALUES (1);"]
+    assert [s.line for s in split_statements(sql)] == [1, 3]
+
+
+def test_semicolons_inside_strings_and_identifiers():
+    sql = b"""INSERT INTO t VALUES ('a;b', 'it''s;', "col;name");SELECT 1;"""
+    assert texts(sql) == ["""INSERT INTO t VALUES ('a;b', 'it''s;', "col;name");""", "SELECT 1;"]
+
+
+def test_escape_strings_keep_backslash_quotes():
+    sql = b"SELECT E'it\\'s; fine', 'plain\\';SELECT 2;"
+    assert texts(sql) == ["SELECT E'it\\'s; fine', 'plain\\';", "SELECT 2;"]
+
+
+def test_nested_block_comments():
+    sql = b"/* outer /* inner; */ still comment; */ SELECT 1; -- trailing; comment\nSELECT 2;"
+    assert texts(sql) == ["SELECT 1;", "SELECT 2;"]
+
+
+def test_dollar_quoted_bodies():
+    function = (b"CREATE FUNCTION f() RETURNS void AS $body$ BEGIN PERFORM 1; $inner$;$inner$; END $body$ "
+                b"LANGUAGE plpgsql;")
+    block = b"DO $$ BEGIN CREATE INDEX i ON t (a); END $$;"
+    sql = function + b"\n" + block
+    statements = split_statements(sql)
+    assert texts(sql) == [function.decode(), block.decode()]
+    assert [statement_kind(sql, s) for s in statements] == ["CREATE FUNCTION", "DO"]
+    assert all(s.terminated and s.balanced for s in statements)
+    nested = list(nested_statements(sql, statements[1]))
+    assert [statement_kind(body, s) for body, s in nested] == ["CREATE INDEX"]
+
+
+def test_parenthesis_depth():
+    statement, = split_statements(b"CREATE TABLE t (a int, CHECK ((a > 0));")
+    assert statement.depth == 1 and not statement.balanced
+    statement, = split_statements(b"SELECT ')' , (1));")
+    assert not statement.balanced
+
+
+def test_unclosed_constructs_end_the_file():
+    for sql, unclosed in ((b"SELECT 'open;", "string"), (b"SELECT 1; /* open", "comment"),
+                          (b'SELECT "open', "identifier"), (b"DO $x$ BEGIN;", "dollar-quote")):
+        last = split_statements(sql)[-1]
+        assert (last.terminated, last.unclosed, last.end) == (False, unclosed, len(sql))
+
+
+def test_statement_kind_skips_modifiers():
+    sql = b"CREATE OR REPLACE FUNCTION f();CREATE UNIQUE INDEX i ON t (a);ALTER TABLE t ADD b int;"
+    assert [statement_kind(sql, s) for s in split_statements(sql)] == [
+        "CREATE FUNCTION", "CREATE INDEX", "ALTER TABLE"
+    ]
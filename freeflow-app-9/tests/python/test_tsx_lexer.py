@@ -0,0 +1,71 @@
+import time
+
+from tsx_lexer import attribute, lex, string_attribute
+
+
+def kinds(scan):
+    return [(token.kind, scan.text[token.start:token.end]) for token in scan.tokens]
+
+
+def test_regex_literal_with_slash_in_class():
+    scan = lex("const re = /a[/]b\\/c/gi; x")
+    assert kinds(scan) == [("regex", "/a[/]b\\/c/gi")]
+
+
+def test_slash_after_operand_divides():
+    scan = lex("const half = total / 2 / count")
+    assert kinds(scan) == []
+
+
+def test_unterminated_character_class_is_linear():
+    text = "const x = /[" + "a" * 50000
+    started = time.perf_counter()
+    scan = lex(text)
+    assert time.perf_counter() - started < 1.0
+    assert not any(token.kind == "regex" for token in scan.tokens)
+
+
+def test_many_unterminated_classes_on_one_line_are_linear():
+    text = "x = (" + "/[" * 20000 + "\ny = /a/g"
+    started = time.perf_counter()
+    scan = lex(text)
+    assert time.perf_counter() - started < 1.0
+    assert kinds(scan) == [("regex", "/a/g")]
+
+
+def test_strings_and_comments_are_not_code():
+    text = "a('<b>') // c\n/* d */ e"
+    scan = lex(text)
+    assert kinds(scan) == [("string", "'<b>'"), ("comment", "// c"), ("comment", "/* d */")]
+    assert scan.in_code(text.index("a"))
+    assert not scan.in_code(text.index("<b>"))
+    assert scan.in_code(text.index("e"))
+
+
+def test_template_expressions_are_code():
+    text = "`sum ${a + `${b}`} done`"
+    scan = lex(text)
+    template = scan.token_at(0)
+    assert template.kind == "template"
+    assert template.end == len(text)
+    assert [text[start:end] for start, end in template.parts] == ["${a + `${b}`}"]
+    assert scan.in_code(text.index("a +"))
+    assert not scan.in_code(text.index("done"))
+
+
+def test_jsx_tag_ends_after_nested_braces():
+    text = '<Button title="Go" onClick={() => { if (a > b) save() }}>Save <b>all</b></Button>'
+    scan = lex(text)
+    tag = scan.tag_at(0)
+    assert tag.name == "Button"
+    assert text[tag.close] == ">" and text[tag.end:].startswith("Save")
+    assert string_attribute(scan, tag, "title") == "Go"
+    on_click = attribute(tag, "onClick")
+    assert text[on_click.value_start:on_click.value_end].endswith("save() }}")
+    assert scan.jsx_text(*scan.children(tag)) == "Save all"
+    assert scan.unclosed == 0
+
+
+def test_generic_arrow_is_not_jsx():
+    scan = lex("const id = <T,>(value: T) => value")
+    assert scan.tags == {}
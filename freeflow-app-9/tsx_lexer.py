@@ -0,0 +1,399 @@
+#!/usr/bin/env python3
+"""
+Linear-time lexer for the app's TSX sources.
+
+lex() makes one forward pass over a file and records the spans codemods must
+not treat as code: comments, string and template literal text, regex
+literals and JSX text. It also records every JSX tag with its attributes,
+so rules can find an element's real end even when attribute values hold
+nested braces, arrow functions or strings containing `>`.
+
+Runs of ordinary code are skipped with one regex step each, and the lexer
+stops only at quotes, braces, `/` and `<`. No regex it uses can match the
+same text in two ways under a repeat, so none backtracks more than linearly
+and a file is lexed in O(n) time whatever it contains.
+Like any TSX tool without a type checker it has to guess in two places, the
+same way editors do:
+
+  /    starts a regex literal only where an expression may start, and not
+       after a `/` on the same line that failed to start one
+  <    starts a JSX tag only where an expression may start and a tag name or
+       `>` follows (`<T,>`, `<T = any>`, `<T extends ...>` and `<T>(`
+       stay generics)
+
+    python3 tsx_lexer.py app/(app)/dashboard/page.tsx      # token summary
+    python3 tsx_lexer.py --bench 10                        # the largest pages
+"""
+
+import os
+import re
+import sys
+import time
+import argparse
+from bisect import bisect_right
+from collections import Counter, namedtuple
+
+# Bump whenever lex() output changes, so codemod manifests re-process files
+LEXER_VERSION = "2"
+
+# `parts` are the (start, end) spans of a template literal's ${...} expressions
+Token = namedtuple("Token", ["kind", "start", "end", "parts"])
+
+# `value_start`/`value_end` span the value with its quotes or braces; None
+# for a boolean attribute. Spread attributes ({...props}) are named "...".
+Attribute = namedtuple("Attribute", ["name", "start", "end", "value_start", "value_end"])
+
+# `end` is just past the closing `>`; `close` is where `>` or `/>` begins
+JsxTag = namedtuple("JsxTag", ["name", "start", "end", "close", "attributes", "self_closing"])
+
+CODE_RUN_RE = re.compile(r"[^'\"`/<{}]+")
+STRING_RE = re.compile(r"""'(?:[^'\\\n]|\\[\s\S])*'?|"(?:[^"\\\n]|\\[\s\S])*"?""")
+TEMPLATE_TEXT_RE = re.compile(r"(?:[^`\\$]|\\[\s\S]|\$(?!\{))*")
+LINE_COMMENT_RE = re.compile(r"//[^\n]*")
+BLOCK_COMMENT_RE = re.compile(r"/\*[\s\S]*?(?:\*/|\Z)")
+# A character class must be closed: an optional `]` would let the outer loop
+# split an unclosed class in quadratically many ways before failing
+REGEX_LITERAL_RE = re.compile(r"/(?:[^/\\\[\n]|\\.|\[(?:[^\]\\\n]|\\.)*\])+/[A-Za-z]*")
+SPACE_RE = re.compile(r"\s*")
+JSX_NAME_RE = re.compile(r"[A-Za-z_$][\w$.:-]*")
+JSX_GENERIC_RE = re.compile(r"\s*(?:[,=]|extends\b)")
+TYPE_PARAMETER_RE = re.compile(r"[A-Z]>\s*\(")
+# An attribute with its `=` and a quoted value or the `{` opening an expression
+JSX_ATTRIBUTE_RE = re.compile(r"""([A-Za-z_$][\w$:-]*)(?:\s*(=)\s*(?:("[^"]*"?|'[^']*'?)|(\{))?)?""")
+JSX_TEXT_RE = re.compile(r"[^<{]+")
+JSX_CLOSE_RE = re.compile(r"</\s*([\w$.:-]*)\s*>")
+
+# Words after which `/` and `<` start an expression rather than divide or compare
+EXPRESSION_KEYWORDS = {
+    "return", "typeof", "instanceof", "in", "of", "new", "delete", "void", "throw",
+    "case", "do", "else", "yield", "await",
+}
+IDENTIFIER_CHARS = frozenset("abcdefghijklmnopqrstuvwxyzABCDEFGHIJKLMNOPQRSTUVWXYZ0123456789_$")
+
+
+class Scan:
+    """The result of lex(): tokens, JSX tags and the spans that are not code."""
+
+    def __init__(self, text, tokens, tags, opaque, closing, unclosed=0):
+        self.text = text
+        # Scratch space for rules that work out something once per file
+        self.memo = {}
+        # Frames (templates, tags, elements, braces) still open at the end of
+        # the file; anything but 0 means the file was not lexed as intended
+        self.unclosed = unclosed
+        self.tokens = tokens
+        self.tags = tags
+        self._token_starts = {token.start: token for token in tokens}
+        self._opaque_starts = [start for start, _ in opaque]
+        self._opaque = opaque
+        self._closing = closing
+        self._texts = [token for token in tokens if token.kind == "jsx-text"]
+        self._text_starts = [token.start for token in self._texts]
+
+    def in_code(self, pos):
+        """False inside a comment, string, template text, regex literal or JSX text."""
+        i = bisect_right(self._opaque_starts, pos) - 1
+        return i < 0 or pos >= self._opaque[i][1]
+
+    def token_at(self, pos):
+        """The comment, string, template, regex or JSX text token starting at `pos`, or None."""
+        return self._token_starts.get(pos)
+
+    def tag_at(self, pos):
+        """The JSX opening tag whose `<` is at `pos`, or None."""
+        return self.tags.get(pos)
+
+    def children(self, tag):
+        """The (start, end) span between an element's tags, or None if it has no closing tag."""
+        close = self._closing.get(tag.start)
+        return None if close is None else (tag.end, close)
+
+    def jsx_text(self, start, end):
+        """The JSX text between `start` and `end`, nested elements included, whitespace collapsed."""
+        i = bisect_right(self._text_starts, start - 1)
+        parts = []
+        while i < len(self._texts) and self._texts[i].end <= end:
+            parts.append(self.text[self._texts[i].start:self._texts[i].end])
+            i += 1
+        return " ".join(" ".join(parts).split())
+
+
+def lex(text, jsx=True):
+    """Lex TSX source in one pass; returns a Scan. Pass jsx=False for plain .ts files."""
+    tokens = []
+    tags = {}
+    closing = {}
+    opaque = []
+    n = len(text)
+    pos = 0
+    expression = True   # may an expression start here?
+    regex_from = 0      # no regex literal starts before this offset
+    # Frames: ["js", owner, brace depth], ["template", start, parts],
+    # ["tag", start, name, attributes], ["children", tag start]. A "js" frame's owner
+    # is None at top level, else the frame its closing `}` returns to.
+    stack = [["js", None, 0]]
+
+    def opaque_token(kind, start, end, parts=()):
+        tokens.append(Token(kind, start, end, parts))
+        opaque.append((start, end))
+
+    def close_expression(frame, end):
+        # A `}` ended a ${...}, an attribute value or a child expression
+        owner = frame[1]
+        if owner[0] == "template":
+            owner[2][-1] = (owner[2][-1][0], end)
+        elif owner[0] == "tag" and owner[3]:
+            attribute = owner[3][-1]
+            owner[3][-1] = attribute._replace(end=end, value_end=end)
+
+    while pos < n:
+        frame = stack[-1]
+        kind = frame[0]
+
+        if kind == "js":
+            match = CODE_RUN_RE.match(text, pos)
+            if match:
+                run = text[pos:match.end()].rstrip()
+                if run:
+                    last = run[-1]
+                    if last in IDENTIFIER_CHARS:
+                        i = len(run) - 1
+                        while i > 0 and run[i - 1] in IDENTIFIER_CHARS:
+                            i -= 1
+                        expression = run[i:] in EXPRESSION_KEYWORDS
+                    else:
+                        expression = last not in ")]"
+                pos = match.end()
+                if pos >= n:
+                    break
+            char = text[pos]
+            if char in "'\"":
+                end = STRING_RE.match(text, pos).end()
+                opaque_token("string", pos, end)
+                pos, expression = end, False
+            elif char == "`":
+                stack.append(["template", pos, []])
+                pos += 1
+            elif char == "/":
+                following = text[pos + 1:pos + 2]
+                if following == "/":
+                    end = LINE_COMMENT_RE.match(text, pos).end()
+                    opaque_token("comment", pos, end)
+                    pos = end
+                elif following == "*":
+                    end = BLOCK_COMMENT_RE.match(text, pos).end()
+                    opaque_token("comment", pos, end)
+                    pos = end
+                else:
+                    match = None
+                    if expression and pos >= regex_from:
+                        match = REGEX_LITERAL_RE.match(text, pos)
+                        if not match:
+                            # A failed scan has run to the end of the line; retrying at
+                            # every later `/` there would make lexing the line quadratic
+                            line_end = text.find("\n", pos)
+                            regex_from = n if line_end < 0 else line_end
+                    if match:
+                        opaque_token("regex", pos, match.end())
+                        pos, expression = match.end(), False
+                    else:
+                        pos, expression = pos + 1, True
+            elif char == "<":
+                name = _jsx_tag_name(text, pos) if expression and jsx else None
+                if name is None:
+                    pos, expression = pos + 1, True
+                else:
+                    stack.append(["tag", pos, name, []])
+                    pos += 1 + len(name)
+            elif char == "{":
+                frame[2] += 1
+                pos, expression = pos + 1, True
+            else:   # "}"
+                pos += 1
+                if frame[2] == 0 and frame[1] is not None:
+                    stack.pop()
+                    close_expression(frame, pos)
+                    expression = False
+                else:
+                    frame[2] = max(0, frame[2] - 1)
+                    expression = True
+
+        elif kind == "template":
+            end = TEMPLATE_TEXT_RE.match(text, pos).end()
+            if end > pos:
+                opaque.append((pos, end))
+            pos = end
+            if text.startswith("${", pos):
+                frame[2].append((pos, None))
+                stack.append(["js", frame, 0])
+                pos, expression = pos + 2, True
+            else:
+                pos = min(pos + 1, n)
+                stack.pop()
+                tokens.append(Token("template", frame[1], pos, tuple(frame[2])))
+                expression = False
+
+        elif kind == "tag":
+            pos = SPACE_RE.match(text, pos).end()
+            if pos >= n:
+                break
+            char = text[pos]
+            if char == ">" or text.startswith("/>", pos):
+                self_closing = char == "/"
+                end = pos + (2 if self_closing else 1)
+                stack.pop()
+                tags[frame[1]] = JsxTag(frame[2], frame[1], end, pos, tuple(frame[3]), self_closing)
+                if not self_closing:
+                    stack.append(["children", frame[1]])
+                elif stack[-1][0] == "js":
+                    expression = False
+                pos = end
+            elif char == "{":
+                frame[3].append(Attribute("...", pos, None, pos, None))
+                stack.append(["js", frame, 0])
+                pos, expression = pos + 1, True
+            elif char == "/" and text[pos + 1:pos + 2] in ("/", "*"):
+                comment_re = LINE_COMMENT_RE if text[pos + 1] == "/" else BLOCK_COMMENT_RE
+                end = comment_re.match(text, pos).end()
+                opaque_token("comment", pos, end)
+                pos = end
+            else:
+                match = JSX_ATTRIBUTE_RE.match(text, pos)
+                if not match:
+                    pos += 1
+                    continue
+                name, start, pos = match.group(1), pos, match.end()
+                if match.group(2) is None:
+                    frame[3].append(Attribute(name, start, match.end(1), None, None))
+                elif match.group(4):
+                    frame[3].append(Attribute(name, start, None, match.start(4), None))
+                    stack.append(["js", frame, 0])
+                    expression = True
+                elif match.group(3):
+                    opaque_token("string", match.start(3), pos)
+                    frame[3].append(Attribute(name, start, pos, match.start(3), pos))
+                else:
+                    frame[3].append(Attribute(name, start, pos, pos, pos))
+
+        else:   # "children"
+            char = text[pos]
+            if char == "{":
+                stack.append(["js", frame, 0])
+                pos, expression = pos + 1, True
+            elif char == "<" and text.startswith("</", pos):
+                match = JSX_CLOSE_RE.match(text, pos)
+                if match:
+                    tokens.append(Token("jsx-close", pos, match.end(), ()))
+                    closing[frame[1]] = pos
+                    stack.pop()
+                    pos = match.end()
+                    if stack[-1][0] == "js":
+                        expression = False
+                else:
+                    opaque_token("jsx-text", pos, pos + 1)
+                    pos += 1
+            else:
+                name = _jsx_tag_name(text, pos) if char == "<" else None
+                if name is not None:
+                    stack.append(["tag", pos, name, []])
+                    pos += 1 + len(name)
+                else:
+                    match = JSX_TEXT_RE.match(text, pos + 1)
+                    end = match.end() if match else pos + 1
+                    opaque_token("jsx-text", pos, end)
+                    pos = end
+
+    unclosed = len(stack) - 1 + stack[0][2]
+    return Scan(text, tokens, tags, opaque, closing, unclosed)
+
+
+def _jsx_tag_name(text, pos):
+    """The tag name if the `<` at `pos` opens a JSX element ("" for a fragment), else None."""
+    following = text[pos + 1:pos + 2]
+    if following == ">":
+        return ""
+    match = JSX_NAME_RE.match(text, pos + 1)
+    if not match or JSX_GENERIC_RE.match(text, match.end()) or TYPE_PARAMETER_RE.match(text, pos + 1):
+        return None
+    return match.group()
+
+
+def attribute(tag, name):
+    """The attribute of `tag` called `name`, or None."""
+    for attr in tag.attributes:
+        if attr.name == name:
+            return attr
+    return None
+
+
+def string_attribute(scan, tag, name):
+    """The value of a quoted attribute of `tag`, or None (also for {expression} values)."""
+    attr = attribute(tag, name)
+    if attr is None or attr.value_end is None or scan.text[attr.value_start] not in "'\"":
+        return None
+    return scan.text[attr.value_start + 1:attr.value_end - 1]
+
+
+def largest_pages(count):
+    from codemod import discover_files
+    paths = discover_files(components=False)
+    return sorted(paths, key=os.path.getsize, reverse=True)[:count]
+
+
+def bench(paths, repeat=3):
+    """Time lex() per file (best of `repeat`) and check the time grows linearly with size."""
+    total_bytes = total_seconds = 0
+    print(f"{'ms':>8}  {'MB/s':>6}  {'tokens':>7}  {'tags':>5}  file")
+    for path in paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            text = f.read()
+        seconds = min(_time(lex, text) for _ in range(repeat))
+        scan = lex(text)
+        total_bytes += len(text)
+        total_seconds += seconds
+        print(f"{seconds * 1000:8.1f}  {len(text) / seconds / 1e6:6.2f}  {len(scan.tokens):>7}  "
+              f"{len(scan.tags):>5}  {os.path.relpath(path)}")
+    if total_seconds:
+        print(f"\nTotal: {total_bytes / 1e6:.1f} MB in {total_seconds:.3f}s "
+              f"({total_bytes / total_seconds / 1e6:.2f} MB/s)")
+
+    if paths:
+        with open(paths[0], 'r', encoding='utf-8') as f:
+            text = f.read()
+        base = min(_time(lex, text) for _ in range(repeat))
+        print("Scaling (largest file repeated):", end="")
+        for factor in (2, 4, 8):
+            seconds = min(_time(lex, text * factor) for _ in range(repeat))
+            print(f"  x{factor}: {seconds / base:.1f}x time", end="")
+        print()
+
+
+def _time(func, *args):
+    started = time.perf_counter()
+    func(*args)
+    return time.perf_counter() - started
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Lex TSX files and summarize their tokens, or benchmark the lexer")
+    parser.add_argument("paths", nargs="*", help="files to lex")
+    parser.add_argument("--bench", type=int, metavar="N", nargs="?", const=10,
+                        help="benchmark the N largest app/**/page.tsx files (default: 10), or the given paths")
+    args = parser.parse_args()
+
+    if args.bench is not None:
+        bench(args.paths or largest_pages(args.bench))
+        return
+    if not args.paths:
+        parser.error("give files to lex, or --bench")
+    for path in args.paths:
+        with open(path, 'r', encoding='utf-8') as f:
+            scan = lex(f.read())
+        kinds = Counter(token.kind for token in scan.tokens)
+        print(f"{path}: {len(scan.tags)} JSX tags, "
+              + ", ".join(f"{kind} {count}" for kind, count in sorted(kinds.items()))
+              + (f" ⚠️  {scan.unclosed} unclosed" if scan.unclosed else ""))
+
+
+if __name__ == "__main__":
+    sys.exit(main())
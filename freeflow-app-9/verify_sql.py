@@ -1,56 +1,163 @@
 #!/usr/bin/env python3
-"""Verify the SQL file has valid syntax and structure"""
+"""Verify SQL migration files have valid syntax and structure"""
 
-import re
-from pathlib import Path
+import os
+import sys
+import glob
+import json
+import argparse
+from functools import partial
 
-SQL_FILE = "/Users/thabonyembe/Documents/freeflow-app-9/supabase/migrations/20241216000010_all_missing_tables.sql"
+from migration_index import CREATE_TABLE_RE as TABLE_NAME_RE, MIGRATIONS_DIR, ROOT_DIR, parallel_map, table_key
+from sql_lint import (
+    DEFAULT_PG_VERSION, LOCK_LEVELS, RISKS, TEXT_KINDS, blocks_writes, classify, estimate_seconds,
+    LockInfo, load_row_counts, strongest
+)
+from sql_tokenizer import (
+    RELEASE_STEP, iter_statements, nested_statements, open_sql, release_pages, statement_kind
+)
 
-def verify_sql_file():
-    with open(SQL_FILE, 'r') as f:
-        content = f.read()
+SQL_FILE = os.path.join(MIGRATIONS_DIR, "20241216000010_all_missing_tables.sql")
+
+# Object types a CREATE statement may name; anything else is a typo Postgres rejects
+CREATE_OBJECTS = {
+    "AGGREGATE", "CAST", "COLLATION", "DOMAIN", "EXTENSION", "FUNCTION", "INDEX",
+    "OPERATOR", "POLICY", "PROCEDURE", "PUBLICATION", "ROLE", "RULE", "SCHEMA",
+    "SEQUENCE", "SERVER", "STATISTICS", "SUBSCRIPTION", "TABLE", "TRIGGER", "TYPE",
+    "USER", "VIEW",
+}
 
-    # Count CREATE TABLE statements
-    create_table_count = len(re.findall(r'CREATE TABLE IF NOT EXISTS', content, re.IGNORECASE))
+def statement_issues(statement, kind):
+    """Problems with one statement as (code, message) pairs."""
+    issues = []
+    if statement.unclosed:
+        issues.append((f"unterminated-{statement.unclosed}",
+                       f"Unterminated {statement.unclosed} runs to end of file"))
+    elif not statement.balanced:
+        issues.append(("unbalanced-parens", f"Unbalanced parentheses: {statement.depth:+d}"))
+    if not statement.terminated and not statement.unclosed:
+        issues.append(("missing-semicolon", "Statement is not terminated by a semicolon"))
+    if kind.startswith("CREATE ") and kind.split()[1] not in CREATE_OBJECTS:
+        issues.append(("unknown-statement", f"Unknown statement '{kind}'"))
+    return issues
 
-    # Check for balanced parentheses
-    paren_balance = content.count('(') - content.count(')')
+def summarize_sql_file(path, include_statements=False, lint=False, pg_version=DEFAULT_PG_VERSION):
+    """Tokenize one file and return a compact, JSON-ready summary of what verification needs.
 
-    # Check for statements ending with semicolon
-    table_statements = re.findall(r'CREATE TABLE IF NOT EXISTS.*?;', content, re.DOTALL | re.IGNORECASE)
+    The file is memory-mapped and scanned in a single streaming pass, so
+    memory stays flat however large the migration is. With `lint`, every
+    statement is also classified by lock level and rewrite risk.
+    """
+    summary = {
+        "path": path,
+        "size": os.path.getsize(path),
+        "statement_count": 0,
+        "create_table_count": 0,
+        "closed": [],
+        "unclosed": [],
+        "issues": [],
+    }
+    if include_statements:
+        summary["statements"] = []
+    if lint:
+        summary["locks"] = {}
+        summary["lint"] = []
+    # Tables created earlier in this file: nothing can be waiting on them yet
+    created = set()
+    # Split into statements; strings, comments and dollar-quoted bodies are
+    # skipped so their parentheses and semicolons are never counted
+    with open_sql(path) as buf:
+        released = 0
+        for statement in iter_statements(buf):
+            add_statement(summary, buf, statement, include_statements)
+            if lint:
+                lint_statement(summary, buf, statement, created, pg_version)
+            if statement.start - released >= RELEASE_STEP:
+                release_pages(buf, statement.start)
+                released = statement.start
+    return summary
 
-    # Find potential syntax issues
-    issues = []
+def created_table(buf, statement):
+    """Index key of the table a CREATE TABLE statement creates, e.g. 'public.Foo' -> 'foo', or None."""
+    match = TABLE_NAME_RE.match(buf, statement.start)
+    if not match:
+        return None
+    return table_key(match.group(1) and match.group(1).decode(), match.group(2).decode())
 
-    # Check each table has closing semicolon
-    unclosed = re.findall(r'CREATE TABLE IF NOT EXISTS ([a-z_]+)', content, re.IGNORECASE)
-    closed = [re.search(r'CREATE TABLE IF NOT EXISTS ([a-z_]+)', stmt, re.IGNORECASE).group(1) 
-              for stmt in table_statements]
+def add_statement(summary, buf, statement, include_statements):
+    """Fold one statement into a file summary."""
+    summary["statement_count"] += 1
+    kind = statement_kind(buf, statement)
+    name = created_table(buf, statement)
+    if name:
+        summary["create_table_count"] += 1
+        summary["closed" if statement.terminated else "unclosed"].append(name)
+    issues = statement_issues(statement, kind)
+    for code, message in issues:
+        summary["issues"].append({"line": statement.line, "code": code, "message": message})
+    if include_statements:
+        summary["statements"].append({
+            "line": statement.line,
+            "kind": kind,
+            "start": statement.start,
+            "end": statement.end,
+            "ok": not issues,
+        })
 
-    missing_semicolons = set(unclosed) - set(closed)
+def classify_statement(buf, statement, created, pg_version):
+    """LockInfo for one statement, recording tables it creates in `created`."""
+    kind = statement_kind(buf, statement)
+    if kind == "DO":
+        return strongest(
+            classify_statement(block, nested, created, pg_version)
+            for block, nested in nested_statements(buf, statement)
+        )
+    if kind == "CREATE TABLE":
+        name = created_table(buf, statement)
+        if name:
+            created.add(name)
+    sql = buf[statement.start:statement.end].decode('utf-8', errors='replace') if kind in TEXT_KINDS else ""
+    return classify(kind, sql, pg_version)
 
-    if paren_balance != 0:
-        issues.append(f"⚠️  Unbalanced parentheses: {paren_balance}")
+def lint_statement(summary, buf, statement, created, pg_version):
+    """Count one statement's lock level and record it if it is risky on an existing table."""
+    info = classify_statement(buf, statement, created, pg_version)
+    summary["locks"][info.lock] = summary["locks"].get(info.lock, 0) + 1
+    if "statements" in summary:
+        summary["statements"][-1].update(lock=info.lock, risk=info.risk, table=info.table)
+    if info.risk != "none" and info.table not in created:
+        summary["lint"].append({
+            "line": statement.line,
+            "kind": statement_kind(buf, statement),
+            "table": info.table,
+            "lock": info.lock,
+            "risk": info.risk,
+            "blocks_writes": blocks_writes(info),
+            "message": info.reason,
+        })
 
-    if missing_semicolons:
-        issues.append(f"⚠️  Tables possibly missing semicolons: {missing_semicolons}")
+def report(summary):
+    closed = summary["closed"]
+    issues = summary["issues"]
+    unbalanced = [issue for issue in issues if issue["code"] == "unbalanced-parens"]
 
     # Report
     print("=" * 60)
     print("SQL FILE VERIFICATION")
     print("=" * 60)
-    print(f"File: {SQL_FILE}")
-    print(f"Size: {Path(SQL_FILE).stat().st_size / 1024:.2f} KB")
+    print(f"File: {summary['path']}")
+    print(f"Size: {summary['size'] / 1024:.2f} KB")
     print()
-    print(f"✓ CREATE TABLE statements found: {create_table_count}")
-    print(f"✓ Complete table definitions: {len(table_statements)}")
-    print(f"✓ Parentheses balance: {'OK' if paren_balance == 0 else f'FAIL ({paren_balance})'}")
+    print(f"✓ Statements found: {summary['statement_count']}")
+    print(f"✓ CREATE TABLE statements found: {summary['create_table_count']}")
+    print(f"✓ Complete table definitions: {len(closed)}")
+    print(f"✓ Parentheses balance: {'OK' if not unbalanced else f'FAIL ({len(unbalanced)} statements)'}")
     print()
 
     if issues:
         print("Issues Found:")
         for issue in issues:
-            print(f"  {issue}")
+            print(f"  ⚠️  {summary['path']}:{issue['line']}: {issue['message']}")
     else:
         print("✅ No syntax issues detected!")
 
@@ -58,10 +165,157 @@ def verify_sql_file():
     print("Sample table names:")
     for name in closed[:10]:
         print(f"  - {name}")
-    print(f"  ... and {len(closed) - 10} more")
+    if len(closed) > 10:
+        print(f"  ... and {len(closed) - 10} more")
 
     return len(issues) == 0
 
+def report_tree(summaries):
+    """One line per issue plus totals, for runs over many files."""
+    issue_count = 0
+    for summary in summaries:
+        for issue in summary["issues"]:
+            issue_count += 1
+            print(f"⚠️  {os.path.relpath(summary['path'], ROOT_DIR)}:{issue['line']}: "
+                  f"{issue['message']} [{issue['code']}]")
+
+    failed = sum(1 for summary in summaries if summary["issues"])
+    print("=" * 60)
+    print(f"Files verified: {len(summaries)} ({sum(s['size'] for s in summaries) / 1024 / 1024:.2f} MB)")
+    print(f"Statements: {sum(s['statement_count'] for s in summaries)}")
+    print(f"CREATE TABLE statements: {sum(s['create_table_count'] for s in summaries)}")
+    print(f"Issues: {issue_count} in {failed} files")
+    if not issue_count:
+        print("✅ No syntax issues detected!")
+    return issue_count == 0
+
+def report_lint(summaries, rows=None, budget=None):
+    """Print risky statements, lock levels and the apply-time estimate.
+
+    Fails on any table rewrite, and on any statement estimated to hold a
+    write-blocking lock for longer than `budget` seconds.
+    """
+    rows = rows or {}
+    print()
+    print("=" * 60)
+    print("LOCK AND REWRITE RISK")
+    print("=" * 60)
+    failures = 0
+    total = 0.0
+    unknown = 0
+    for summary in summaries:
+        for entry in summary["lint"]:
+            info_rows = rows.get(entry["table"]) if entry["table"] else None
+            seconds = estimate_seconds(_lock_info(entry), rows)
+            if seconds is None:
+                unknown += 1
+                estimate = ""
+            else:
+                total += seconds
+                estimate = f" ~{seconds:.1f}s for {info_rows:,} rows"
+            over_budget = budget is not None and seconds is not None and entry["blocks_writes"] \
+                and seconds > budget
+            failed = entry["risk"] == "rewrite" or over_budget
+            failures += failed
+            print(f"{'❌' if failed else '⚠️ '} {os.path.relpath(summary['path'], ROOT_DIR)}:{entry['line']}: "
+                  f"{entry['kind']} {entry['table'] or ''} [{entry['lock']}, {entry['risk']}] "
+                  f"{entry['message']}{estimate}")
+
+    locks = {}
+    for summary in summaries:
+        for lock, count in summary["locks"].items():
+            locks[lock] = locks.get(lock, 0) + count
+    print()
+    print("Statements by lock level:")
+    for lock in reversed(LOCK_LEVELS):
+        if lock in locks:
+            print(f"  {lock:<24} {locks[lock]:>7}")
+    entries = [entry for summary in summaries for entry in summary["lint"]]
+    by_risk = ", ".join(
+        f"{risk} {sum(1 for entry in entries if entry['risk'] == risk)}" for risk in reversed(RISKS[1:])
+    )
+    print(f"Risky statements on existing tables: {len(entries)} ({by_risk})")
+    print(f"  blocking writes: {sum(1 for entry in entries if entry['blocks_writes'])}")
+    if rows:
+        print(f"Estimated apply time: {total:.1f}s"
+              + (f" (+{unknown} statements on tables without row counts)" if unknown else ""))
+    if failures:
+        print(f"❌ {failures} statements rewrite a table or exceed the {budget}s lock budget")
+    else:
+        print("✅ No table rewrites or over-budget locks!")
+    return failures == 0
+
+def _lock_info(entry):
+    return LockInfo(entry["table"], entry["lock"], entry["risk"], entry["message"])
+
+def expand_paths(patterns):
+    """Resolve files, directories (their *.sql) and glob patterns to a sorted, de-duplicated list."""
+    paths = []
+    for pattern in patterns:
+        if os.path.isdir(pattern):
+            paths.extend(glob.glob(os.path.join(pattern, "*.sql")))
+        elif glob.has_magic(pattern):
+            paths.extend(glob.glob(pattern, recursive=True))
+        else:
+            paths.append(pattern)
+    return sorted(set(paths))
+
+def verify_sql_files(paths, jobs=1, json_path=None, include_statements=False,
+                     lint=False, rows=None, budget=None, pg_version=DEFAULT_PG_VERSION):
+    """Verify every file, tokenizing on up to `jobs` processes; reports keep input order."""
+    summarize = partial(summarize_sql_file, include_statements=include_statements,
+                        lint=lint, pg_version=pg_version)
+    summaries = parallel_map(summarize, paths, jobs)
+
+    if json_path:
+        document = {
+            "files": len(summaries),
+            "issues": sum(len(summary["issues"]) for summary in summaries),
+            "results": summaries,
+        }
+        if json_path == "-":
+            json.dump(document, sys.stdout, indent=2)
+            sys.stdout.write("\n")
+            return document["issues"] == 0
+        with open(json_path, 'w', encoding='utf-8') as f:
+            json.dump(document, f, indent=2)
+
+    if len(summaries) == 1:
+        success = report(summaries[0])
+    else:
+        success = report_tree(summaries)
+    if lint:
+        success = report_lint(summaries, rows, budget) and success
+    return success
+
+def verify_sql_file():
+    return verify_sql_files([SQL_FILE])
+
 if __name__ == "__main__":
-    success = verify_sql_file()
+    parser = argparse.ArgumentParser(description="Verify SQL migration files")
+    parser.add_argument("paths", nargs="*", default=[MIGRATIONS_DIR],
+                        help="SQL files, directories or glob patterns (default: supabase/migrations)")
+    parser.add_argument("-j", "--jobs", type=int, default=0,
+                        help="tokenize files on N worker processes (default: one per CPU)")
+    parser.add_argument("--json", metavar="PATH",
+                        help="also write a machine-readable report to PATH (- for stdout only)")
+    parser.add_argument("--statements", action="store_true",
+                        help="include every statement (line, kind, byte span) in the JSON report")
+    parser.add_argument("--lint", action="store_true",
+                        help="classify every statement by lock level and rewrite risk")
+    parser.add_argument("--rows", metavar="FILE",
+                        help="with --lint, table row counts (JSON object or table,rows CSV) to estimate apply time")
+    parser.add_argument("--budget", type=float, default=30.0,
+                        help="with --rows, fail statements that block writes for longer than this many seconds (default: 30)")
+    parser.add_argument("--pg-version", type=int, default=DEFAULT_PG_VERSION,
+                        help=f"target Postgres major version (default: {DEFAULT_PG_VERSION})")
+    args = parser.parse_args()
+
+    paths = expand_paths(args.paths)
+    if not paths:
+        print(f"No SQL files match: {' '.join(args.paths)}")
+        exit(1)
+    rows = load_row_counts(args.rows) if args.rows else None
+    success = verify_sql_files(paths, args.jobs, args.json, args.statements,
+                               args.lint or bool(args.rows), rows, args.budget, args.pg_version)
     exit(0 if success else 1)